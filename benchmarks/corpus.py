@@ -0,0 +1,86 @@
+"""Sample counting-channel messages shared by the counting benchmarks."""
+
+# Counts as people actually type them: mostly plain numbers, some arithmetic
+# and the odd showing-off with math functions
+COUNT_EXPRESSIONS = [
+    "1",
+    "42",
+    "137",
+    "1000",
+    "6*7",
+    "(3+4)*6",
+    "100-1",
+    "999+1",
+    "10//3",
+    "2*3*7",
+    "7**2+1",
+    "2**10",
+    "1e3",
+    "sqrt(144)",
+    "factorial(5)",
+    "abs(-17)",
+    "floor(pi*10)",
+    "ceil(e*10)",
+    "log2(1024)",
+    "cos(0)",
+    "gcd(12, 18)",
+    "comb(10, 3)",
+    "isqrt(1000)",
+    "(2+3)*(4+5)-(6/2)",
+    "((1+2)*3+4)*5-6",
+    "numpysqrt(49)",
+    "hypot(3, 4)",
+    "-(-8)",
+    "2**3**2",
+    "100 % 7",
+]
+
+# Chat that ends up in counting channels between counts
+CHAT_MESSAGES = [
+    "lol",
+    "nice",
+    "who ruined it",
+    "gg",
+    "bruh",
+    "we were so close to 1000",
+    "ok who's next",
+    "wait what number are we on",
+    "no counting twice!",
+    "i think it was 42",
+    "lmao",
+    "f",
+    "hi everyone",
+    "why is the bot so slow today",
+    "brb",
+    "that's a prime right?",
+    "sqrt of what",
+    "can someone explain factorial",
+    "good morning",
+    "nooooo",
+    "one more and we beat the record",
+    "is 1 prime?",
+    ":)",
+    "the count is 57 btw",
+    "I'm going to sleep",
+    "math is hard",
+    "ur wrong",
+    "oops",
+    "twenty one? you stupid",
+    "?",
+]
+
+# Counts spelled out, and chat words that only look like they might be
+NUMBER_WORD_COUNTS = [
+    "seven",
+    "twelve",
+    "forty two",
+    "twenty one",
+    "ninety nine",
+    "one hundred",
+    "one hundred and five",
+    "three hundred forty seven",
+    "one thousand",
+    "two thousand and twenty four",
+    "one million two hundred thousand",
+]
+NUMBER_WORD_MISSES = ["lol", "nice", "gg", "nope", "hello there", "one more"]
@@ -0,0 +1,114 @@
+"""Counts per second through the counting database, before and after.
+
+"before" is the old CounterUtils, which opened a connection and committed
+for every count on the event loop. "after" is the current one: counts are
+applied in memory and written behind by the writer thread. A ticker task
+measures how long the event loop is held up while counting.
+
+    python benchmarks/counting_db.py [--counts 5000] [--flush-interval 5]
+"""
+
+import argparse
+import asyncio
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.legacy_counter import CounterUtils as LegacyCounterUtils  # noqa: E402
+from utils.counter import PRIMES, CounterUtils  # noqa: E402
+
+GUILD_ID = "1"
+USERS = [str(user_id) for user_id in range(100, 105)]
+
+
+async def watch_loop(stalls: list, interval: float = 0.001):
+    """Record how late each tick of a short sleep wakes up."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def run_legacy(counter: LegacyCounterUtils, counts: int) -> float:
+    start = time.perf_counter()
+    for number in range(1, counts + 1):
+        counter.validate_count(str(number), GUILD_ID, USERS[number % len(USERS)])
+        # The old handler yielded to the loop between messages
+        await asyncio.sleep(0)
+    return time.perf_counter() - start
+
+
+async def run_current(
+    counter: CounterUtils, counts: int, flush_interval: float
+) -> float:
+    async def flush_periodically():
+        while True:
+            await asyncio.sleep(flush_interval)
+            await counter.flush()
+
+    flusher = asyncio.create_task(flush_periodically())
+    start = time.perf_counter()
+    try:
+        for number in range(1, counts + 1):
+            await counter.validate_count(
+                counter.evaluate(str(number)), GUILD_ID, USERS[number % len(USERS)]
+            )
+            await asyncio.sleep(0)
+        # Everything is on disk before the clock stops
+        await counter.flush()
+        return time.perf_counter() - start
+    finally:
+        flusher.cancel()
+
+
+async def measure(run, *args):
+    stalls = []
+    watcher = asyncio.create_task(watch_loop(stalls))
+    await asyncio.sleep(0)
+    try:
+        elapsed = await run(*args)
+    finally:
+        watcher.cancel()
+    stalls.sort()
+    return elapsed, stalls[int(len(stalls) * 0.99)], stalls[-1]
+
+
+def report(name: str, counts: int, elapsed: float, p99: float, worst: float):
+    print(
+        f"{name:<8} {counts / elapsed:>10.0f} counts/s"
+        f" {elapsed / counts * 1e6:>9.1f} us/count"
+        f"   loop stall p99 {p99 * 1000:.2f} ms, worst {worst * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, default=5000)
+    parser.add_argument("--flush-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # The prime sieve is built once per process; keep it out of the timings
+    PRIMES.build()
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_counter = LegacyCounterUtils(os.path.join(directory, "legacy.db"))
+        legacy = asyncio.run(measure(run_legacy, legacy_counter, args.counts))
+
+        counter = CounterUtils(os.path.join(directory, "current.db"))
+        try:
+            current = asyncio.run(
+                measure(run_current, counter, args.counts, args.flush_interval)
+            )
+        finally:
+            counter.close()
+    report("before", args.counts, *legacy)
+    report("after", args.counts, *current)
+    print(f"speedup  {legacy[0] / current[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
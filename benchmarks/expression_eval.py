@@ -0,0 +1,78 @@
+"""Per-expression latency of counting expressions, before and after.
+
+"before" walks the parsed tree with the old isinstance chain on every
+evaluation. "after" calls the closures the tree is compiled into once.
+Both sides start from an already parsed tree, so only evaluation is
+compared; the end-to-end rows include parsing (and, after, the cache).
+
+    python benchmarks/expression_eval.py [--repeat 2000]
+"""
+
+import argparse
+import ast
+import pathlib
+import sys
+import timeit
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.corpus import COUNT_EXPRESSIONS  # noqa: E402
+from benchmarks.legacy_counter import CounterUtils as LegacyCounterUtils  # noqa: E402
+from utils.counter import ExpressionEvaluator  # noqa: E402
+
+
+def per_call(stmt, repeat: int) -> float:
+    """Best-of-five time per call, in microseconds."""
+    return min(timeit.repeat(stmt, number=repeat, repeat=5)) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    legacy = LegacyCounterUtils.__new__(LegacyCounterUtils)
+    legacy.max_digits = 20
+    evaluator = ExpressionEvaluator()
+
+    print(f"{'expression':<24} {'walk us':>9} {'closure us':>11} {'speedup':>8}")
+    walk_total = closure_total = 0.0
+    for expression in COUNT_EXPRESSIONS:
+        tree = ast.parse(expression, mode="eval").body
+        evaluator._check_node(tree)
+        closure = evaluator._compile_node(tree)
+        assert legacy._eval_node(tree) == closure()
+
+        walk = per_call(lambda: legacy._eval_node(tree), args.repeat)
+        compiled = per_call(closure, args.repeat)
+        walk_total += walk
+        closure_total += compiled
+        print(
+            f"{expression:<24} {walk:>9.2f} {compiled:>11.2f} {walk / compiled:>7.1f}x"
+        )
+
+    count = len(COUNT_EXPRESSIONS)
+    print(
+        f"{'mean':<24} {walk_total / count:>9.2f} {closure_total / count:>11.2f}"
+        f" {walk_total / closure_total:>7.1f}x"
+    )
+
+    def legacy_corpus():
+        for expression in COUNT_EXPRESSIONS:
+            legacy._evaluate_expression(expression)
+
+    def current_corpus():
+        for expression in COUNT_EXPRESSIONS:
+            evaluator.evaluate(expression)
+
+    before = per_call(legacy_corpus, args.repeat // 10) / count
+    after = per_call(current_corpus, args.repeat // 10) / count
+    print(
+        f"end to end: before {before:.2f} us, after {after:.2f} us per message"
+        f" ({before / after:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""The hot paths of CounterUtils as it was before the counting rewrite.
+
+The "before" side of the counting benchmarks: evaluating a message,
+validating a count against SQLite and the trial-division prime check,
+unchanged from the old utils/counter.py. Everything the benchmarks never
+call is left out. The bot itself never imports it.
+"""
+
+from typing import Any, Optional, Tuple
+import time
+import ast
+import math
+import numpy
+import operator
+import sqlite3
+
+try:
+    from word2number import w2n
+except ImportError as e:
+    raise ImportError(
+        "The word2number comparison needs the bench extra: "
+        "uv sync --extra bench, or pip install word2number==1.1"
+    ) from e
+
+
+class CounterUtils:
+    """Safe mathematical expression evaluator."""
+
+    # Supported operators
+    OPERATORS = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.FloorDiv: operator.floordiv,
+        ast.Pow: operator.pow,
+        ast.Mod: operator.mod,
+        ast.USub: operator.neg,
+        ast.UAdd: operator.pos,
+    }
+
+    # The old table had about 150 math and NumPy entries; a dict lookup
+    # costs the same either way, so only the names the corpus uses are kept
+    SAFE_FUNCTIONS = {
+        "pi": lambda: math.pi,
+        "e": lambda: math.e,
+        "ceil": math.ceil,
+        "floor": math.floor,
+        "abs": abs,
+        "sqrt": math.sqrt,
+        "factorial": math.factorial,
+        "gcd": math.gcd,
+        "isqrt": math.isqrt,
+        "comb": math.comb,
+        "log2": math.log2,
+        "cos": lambda x: math.cos(math.radians(x)),
+        "hypot": math.hypot,
+        "numpysqrt": numpy.sqrt,
+    }
+
+    def __init__(self, db_path: str = "counting.db", max_digits: int = 20):
+        self.db_path = db_path
+        self.max_digits = max_digits
+        self.init_database()
+
+    def init_database(self) -> None:
+        """Initialize the database with required tables."""
+        with sqlite3.connect(self.db_path) as db:
+            cursor = db.cursor()
+
+            # Create server settings table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS server (
+                    serverID TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL DEFAULT 1,
+                    last_counter TEXT,
+                    high_score INTEGER NOT NULL DEFAULT 0,
+                    fails INTEGER NOT NULL DEFAULT 0,
+                    counts INTEGER NOT NULL DEFAULT 0,
+                    primes INTEGER NOT NULL DEFAULT 0
+                )
+            """
+            )
+
+            # Create user stats table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS mathematicians (
+                    ID TEXT,
+                    serverID TEXT,
+                    fails INTEGER DEFAULT 0,
+                    counts INTEGER DEFAULT 0,
+                    high_score INTEGER DEFAULT 0,
+                    last_fail INTEGER DEFAULT 0,
+                    last_fail_date TEXT,
+                    last_count INTEGER DEFAULT 0,
+                    delta_fail INTEGER DEFAULT 0,
+                    primes INTEGER DEFAULT 0,
+                    PRIMARY KEY (ID, serverID)
+                )
+            """
+            )
+            db.commit()
+
+    def _eval_node(self, node: ast.AST) -> Any:
+        """Safely evaluate an AST node."""
+
+        # Numeric values
+        if isinstance(node, ast.Num):
+            return node.n
+
+        # Names (functions and constants)
+        elif isinstance(node, ast.Name):
+            if node.id in self.SAFE_FUNCTIONS:
+                return self.SAFE_FUNCTIONS[node.id]()
+            raise ValueError(f"Unknown identifier: {node.id}")
+
+        # Mathematical operations
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in self.OPERATORS:
+                raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+            left = self._eval_node(node.left)
+            right = self._eval_node(node.right)
+            return self.OPERATORS[type(node.op)](left, right)
+
+        # Unary operations (like -5)
+        elif isinstance(node, ast.UnaryOp):
+            if type(node.op) not in self.OPERATORS:
+                raise ValueError(
+                    f"Unsupported unary operator: {type(node.op).__name__}"
+                )
+            operand = self._eval_node(node.operand)
+            return self.OPERATORS[type(node.op)](operand)
+
+        # Function calls
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name):
+                raise ValueError("Invalid function call")
+            if node.func.id not in self.SAFE_FUNCTIONS:
+                raise ValueError(f"Unknown function: {node.func.id}")
+
+            args = [self._eval_node(arg) for arg in node.args]
+            return self.SAFE_FUNCTIONS[node.func.id](*args)
+
+        # Everything else is not allowed
+        raise ValueError(f"Unsupported expression type: {type(node).__name__}")
+
+    def _evaluate_expression(self, expression: str) -> Optional[int]:
+        """Safely evaluate a mathematical expression."""
+        try:
+            # Try word to number first
+            if len(expression.split()) == 1:
+                try:
+                    result = w2n.word_to_num(expression)
+                    return result if len(str(abs(result))) <= self.max_digits else None
+                except ValueError:
+                    pass
+
+            # Parse and evaluate mathematical expression
+            tree = ast.parse(expression, mode="eval")
+            result = self._eval_node(tree.body)
+
+            # Enhanced validation for trigonometric and other float results
+            if isinstance(result, (int, float)):
+                # If result is a float, round it if it's very close to an integer
+                if abs(result - round(result)) < 1e-10:
+                    result_int = round(result)
+                    if len(str(abs(result_int))) <= self.max_digits:
+                        return result_int
+                elif isinstance(result, int):
+                    if len(str(abs(result))) <= self.max_digits:
+                        return result
+            return None
+
+        except (
+            SyntaxError,
+            ValueError,
+            TypeError,
+            ZeroDivisionError,
+            OverflowError,
+            MemoryError,
+            RecursionError,
+        ):
+            return None
+
+    def validate_count(
+        self, expression: str, guild_id: str, user_id: str
+    ) -> Tuple[bool, bool, bool]:
+        """
+        Validate a count attempt and update statistics.
+        Returns: (is_valid, is_prime, should_remove_role)
+        """
+        try:
+            # Try to evaluate the expression
+            number = self._evaluate_expression(expression)
+            if number is None:
+                return False, False, False
+
+            with sqlite3.connect(self.db_path) as db:
+                cursor = db.cursor()
+
+                # Ensure server exists in database
+                cursor.execute(
+                    "INSERT OR IGNORE INTO server (serverID, count) VALUES (?, 1)",
+                    (guild_id,),
+                )
+
+                # Ensure user exists in database
+                cursor.execute(
+                    "INSERT OR IGNORE INTO mathematicians (ID, serverID) VALUES (?, ?)",
+                    (user_id, guild_id),
+                )
+
+                # Get current count and last counter
+                cursor.execute(
+                    "SELECT count, last_counter FROM server WHERE serverID = ?",
+                    (guild_id,),
+                )
+                current_count, last_counter = cursor.fetchone()
+
+                # Check if count is valid and user isn't counting twice
+                if number != current_count or user_id == last_counter:
+                    self._handle_failed_count(cursor, guild_id, user_id, current_count)
+                    return False, False, False
+
+                # Handle successful count
+                is_prime = self.is_prime(number)
+                self._handle_successful_count(
+                    cursor, guild_id, user_id, number, is_prime
+                )
+
+                db.commit()
+                return True, is_prime, False
+
+        except Exception as e:
+            print(f"Error validating count: {e}")
+            return False, False, False
+
+    def _handle_failed_count(
+        self, cursor: sqlite3.Cursor, guild_id: str, user_id: str, current_count: int
+    ) -> None:
+        """Handle a failed count attempt."""
+        # Update user stats
+        cursor.execute(
+            """
+            UPDATE mathematicians 
+            SET fails = fails + 1,
+                last_fail = ?,
+                last_fail_date = ?,
+                delta_fail = 0
+            WHERE ID = ? AND serverID = ?
+        """,
+            (current_count, time.time(), user_id, guild_id),
+        )
+
+        # Update server stats
+        cursor.execute(
+            """
+            UPDATE server 
+            SET count = 1,
+                fails = fails + 1,
+                last_counter = ?
+            WHERE serverID = ?
+        """,
+            (user_id, guild_id),
+        )
+
+    def _handle_successful_count(
+        self,
+        cursor: sqlite3.Cursor,
+        guild_id: str,
+        user_id: str,
+        number: int,
+        is_prime: bool,
+    ) -> None:
+        """Handle a successful count."""
+        # Update user stats
+        cursor.execute(
+            """
+            UPDATE mathematicians 
+            SET counts = counts + 1,
+                high_score = MAX(high_score, ?),
+                last_count = ?,
+                primes = primes + ?
+            WHERE ID = ? AND serverID = ?
+        """,
+            (number, number, 1 if is_prime else 0, user_id, guild_id),
+        )
+
+        # Update server stats
+        cursor.execute(
+            """
+            UPDATE server 
+            SET count = ?,
+                high_score = MAX(high_score, ?),
+                counts = counts + 1,
+                primes = primes + ?,
+                last_counter = ?
+            WHERE serverID = ?
+        """,
+            (number + 1, number, 1 if is_prime else 0, user_id, guild_id),
+        )
+
+    @staticmethod
+    def is_prime(n: int) -> bool:
+        """Check if a number is prime."""
+        if n < 2:
+            return False
+        for i in range(2, int(math.sqrt(n)) + 1):
+            if n % i == 0:
+                return False
+        return True
@@ -0,0 +1,93 @@
+"""Number-word parsing speed and allocations, word2number against ours.
+
+Each phrase is converted with w2n.word_to_num, as the old evaluator did,
+and with NumberWordParser.replace. Misses are chat that reaches the
+parser: word2number raises ValueError for them, ours returns without a
+value. Allocations are the peak memory tracemalloc sees for one call.
+
+    python benchmarks/number_words.py [--repeat 20000]
+"""
+
+import argparse
+import pathlib
+import sys
+import timeit
+import tracemalloc
+
+try:
+    from word2number import w2n
+except ImportError as e:
+    raise ImportError(
+        "The word2number comparison needs the bench extra: "
+        "uv sync --extra bench, or pip install word2number==1.1"
+    ) from e
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.corpus import NUMBER_WORD_COUNTS, NUMBER_WORD_MISSES  # noqa: E402
+from utils.counter import NumberWordParser  # noqa: E402
+
+
+def word_to_num(phrase: str):
+    try:
+        return w2n.word_to_num(phrase)
+    except ValueError:
+        return None
+
+
+def per_call(stmt, repeat: int) -> float:
+    """Best-of-five time per call, in microseconds."""
+    return min(timeit.repeat(stmt, number=repeat, repeat=5)) / repeat * 1e6
+
+
+def peak_bytes(stmt) -> int:
+    stmt()
+    tracemalloc.start()
+    try:
+        stmt()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    words = NumberWordParser()
+    print(
+        f"{'phrase':<34} {'w2n us':>7} {'ours us':>8} {'speedup':>8}"
+        f" {'w2n B':>7} {'ours B':>7}"
+    )
+    totals = {}
+    for group, phrases in (
+        ("hits", NUMBER_WORD_COUNTS),
+        ("misses", NUMBER_WORD_MISSES),
+    ):
+        old_total = new_total = 0.0
+        for phrase in phrases:
+            if group == "hits" and words.replace(phrase)[1] != word_to_num(phrase):
+                print(
+                    f"{phrase}: w2n says {word_to_num(phrase)},"
+                    f" ours says {words.replace(phrase)[1]}"
+                )
+
+            old = per_call(lambda: word_to_num(phrase), args.repeat)
+            new = per_call(lambda: words.replace(phrase), args.repeat)
+            old_total += old
+            new_total += new
+            print(
+                f"{phrase:<34} {old:>7.2f} {new:>8.2f} {old / new:>7.1f}x"
+                f" {peak_bytes(lambda: word_to_num(phrase)):>7}"
+                f" {peak_bytes(lambda: words.replace(phrase)):>7}"
+            )
+        totals[group] = (old_total / len(phrases), new_total / len(phrases))
+
+    for group, (old, new) in totals.items():
+        print(f"mean {group}: w2n {old:.2f} us, ours {new:.2f} us ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
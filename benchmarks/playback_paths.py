@@ -0,0 +1,119 @@
+"""CPU per second of audio for each playback path, before and after.
+
+"pcm" is how every track used to play, and still how non-Opus ones do:
+ffmpeg decodes to PCM, PCMVolumeTransformer scales it in Python and the
+player thread encodes it to Opus again. "passthrough" remuxes an Opus
+stream at 100% volume; "opus_filter" lets ffmpeg apply the volume.
+
+A generated Opus/WebM tone stands in for a YouTube stream. Each source is
+built with open_stream, wrapped in TimedAudio and read to the end the way
+discord.py's player thread reads it, encoding frames that are not Opus
+yet. Sending is left out, since it costs the same on every path. "bot" is
+the player thread's CPU as TimedAudio measures it; "ffmpeg" is the
+subprocess's. Needs ffmpeg with libopus on PATH and the Opus library.
+
+    python benchmarks/playback_paths.py [--seconds 120] [--volume 0.5]
+        [--opus-library /path/to/libopus.so]
+"""
+
+import argparse
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import discord
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.audio import TimedAudio, open_stream  # noqa: E402
+
+# MusicFeature.ffmpeg_opts["options"], used by the PCM path
+PCM_OPTIONS = "-vn -b:a 192k"
+
+
+def make_tone(directory: str, seconds: int) -> str:
+    """A stereo 48 kHz Opus tone in WebM, like YouTube's audio formats."""
+    path = os.path.join(directory, "tone.webm")
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-loglevel", "error",
+            "-f", "lavfi",
+            "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+            "-ac", "2",
+            "-c:a", "libopus",
+            "-b:a", "128k",
+            path,
+        ],
+        check=True,
+    )  # fmt: skip
+    return path
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def play(path: str, codec: str, volume: float) -> tuple:
+    """Read one stream to the end; returns its path, audio and CPU seconds."""
+    finished = []
+    ffmpeg_before = children_cpu()
+    name, source = open_stream(path, codec, volume, "", PCM_OPTIONS)
+    audio = TimedAudio(
+        source,
+        time.perf_counter(),
+        lambda seconds: None,
+        on_finished=lambda audio_seconds, cpu: finished.append((audio_seconds, cpu)),
+    )
+    encoder = None if audio.is_opus() else discord.opus.Encoder()
+    while True:
+        data = audio.read()
+        if not data:
+            break
+        if encoder is not None:
+            encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+    # Waits for ffmpeg, so its CPU time is counted
+    audio.cleanup()
+    audio_seconds, bot_cpu = finished[0]
+    return name, audio_seconds, bot_cpu, children_cpu() - ffmpeg_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=120)
+    parser.add_argument("--volume", type=float, default=0.5)
+    parser.add_argument("--opus-library")
+    args = parser.parse_args()
+
+    if args.opus_library:
+        discord.opus.load_opus(args.opus_library)
+    elif not discord.opus._load_default():
+        parser.error("the Opus library was not found; pass --opus-library")
+
+    with tempfile.TemporaryDirectory() as directory:
+        tone = make_tone(directory, args.seconds)
+        runs = [
+            play(tone, "webm", args.volume),
+            play(tone, "opus", 1.0),
+            play(tone, "opus", args.volume),
+        ]
+
+    print(f"{'path':<12} {'audio':>8} {'bot':>8} {'ffmpeg':>8} {'total':>8}")
+    for name, audio_seconds, bot_cpu, ffmpeg_cpu in runs:
+        print(
+            f"{name:<12} {audio_seconds:>7.0f}s"
+            f" {bot_cpu / audio_seconds * 100:>7.2f}%"
+            f" {ffmpeg_cpu / audio_seconds * 100:>7.2f}%"
+            f" {(bot_cpu + ffmpeg_cpu) / audio_seconds * 100:>7.2f}%"
+        )
+    print("(CPU as a share of one core while the stream plays)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Prime checks and next-prime lookups, trial division against PrimeIndex.
+
+"before" is the old CounterUtils.is_prime (trial division up to sqrt(n))
+and its get_next_prime loop, minus the database query. "after" is
+PrimeIndex: the sieve below SIEVE_LIMIT, Miller-Rabin above it. Counts
+are sampled from the range real channels reach and from the large
+numbers the 20-digit limit still allows.
+
+    python benchmarks/primes.py [--samples 2000]
+"""
+
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.legacy_counter import CounterUtils as LegacyCounterUtils  # noqa: E402
+from utils.counter import PrimeIndex  # noqa: E402
+
+
+def legacy_next_prime(n: int) -> int:
+    while not LegacyCounterUtils.is_prime(n):
+        n += 1
+    return n
+
+
+def per_call(fn, numbers) -> float:
+    """Mean time per number, in microseconds."""
+    start = time.perf_counter()
+    for n in numbers:
+        fn(n)
+    return (time.perf_counter() - start) / len(numbers) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    primes = PrimeIndex()
+    start = time.perf_counter()
+    primes.build()
+    print(f"sieve build: {(time.perf_counter() - start) * 1000:.1f} ms, once")
+
+    rng = random.Random(1)
+    ranges = [
+        ("counts < 10k", 1, 10_000, args.samples),
+        ("counts < 4M", 10_000, PrimeIndex.SIEVE_LIMIT, args.samples),
+        # Trial division takes ~sqrt(n) steps, so keep these samples few
+        ("10-12 digits", 10**9, 10**12, max(1, args.samples // 100)),
+    ]
+    for name, low, high, samples in ranges:
+        numbers = [rng.randrange(low, high) for _ in range(samples)]
+        for label, old_fn, new_fn in (
+            ("is_prime", LegacyCounterUtils.is_prime, primes.is_prime),
+            ("next_prime", legacy_next_prime, primes.next_prime),
+        ):
+            old = per_call(old_fn, numbers)
+            new = per_call(new_fn, numbers)
+            print(
+                f"{name:<13} {label:<10} before {old:>10.2f} us"
+                f"   after {new:>6.2f} us   ({old / new:,.0f}x)"
+            )
+
+    # Only the new path can answer these in reasonable time
+    numbers = [rng.randrange(10**18, 10**20) for _ in range(args.samples)]
+    print(
+        f"{'19-20 digits':<13} {'is_prime':<10} after"
+        f" {per_call(primes.is_prime, numbers):.2f} us;"
+        f" next_prime after {per_call(primes.next_prime, numbers):.2f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Music queue speed and memory, the old queue.Queue of dicts against TrackQueue.
+
+"before" keeps each queued track as the dict MusicFeature.queue_entry built
+and edits the queue the way the old commands did: removing a track copied
+the queue to a list and put every other track back, and showing the queue
+copied it to a list first. The old queue had no move or shuffle; they are
+done the same way /remove was. "after" is TrackQueue holding slotted
+Tracks.
+Memory is what tracemalloc sees for a queue built from a playlist's
+entries, once those entries are gone.
+
+    python benchmarks/track_queue.py [--tracks 10000]
+"""
+
+import argparse
+import gc
+import pathlib
+import queue
+import random
+import sys
+import timeit
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.player import WATCH_URL, Track, TrackQueue  # noqa: E402
+
+
+def playlist(tracks: int) -> list:
+    """Flat playlist entries shaped like the ones yt-dlp returns."""
+    return [
+        {
+            "id": f"v{number:010d}",
+            "title": f"Some Artist - Song number {number} (Official Video)",
+            "duration": 180 + number % 120,
+            "webpage_url": f"{WATCH_URL}v{number:010d}",
+            "url": f"{WATCH_URL}v{number:010d}",
+            "ie_key": "Youtube",
+            "channel": "Some Artist",
+        }
+        for number in range(tracks)
+    ]
+
+
+def queue_entry(track: dict) -> dict:
+    """The old MusicFeature.queue_entry."""
+    video = track.get("id")
+    return {
+        "id": video,
+        "title": track.get("title"),
+        "duration": track.get("duration"),
+        "webpage_url": track.get("webpage_url") or f"{WATCH_URL}{video}",
+    }
+
+
+def build_legacy(entries: list) -> queue.Queue:
+    tracks = queue.Queue()
+    for entry in entries:
+        tracks.put(queue_entry(entry))
+    return tracks
+
+
+def build_current(entries: list) -> TrackQueue:
+    return TrackQueue(Track.from_info(entry) for entry in entries)
+
+
+def legacy_remove(tracks: queue.Queue, position: int) -> dict:
+    """The old /remove: copy out, pop, clear and put the rest back."""
+    queue_list = list(tracks.queue)
+    removed = queue_list.pop(position - 1)
+    with tracks.mutex:
+        tracks.queue.clear()
+    for track in queue_list:
+        tracks.put(track)
+    return removed
+
+
+def legacy_rebuild(tracks: queue.Queue, edit) -> None:
+    """Copy the queue out, edit the list and put it all back."""
+    queue_list = list(tracks.queue)
+    edit(queue_list)
+    with tracks.mutex:
+        tracks.queue.clear()
+    for track in queue_list:
+        tracks.put(track)
+
+
+def legacy_move(tracks: queue.Queue, position: int, target: int) -> None:
+    legacy_rebuild(
+        tracks, lambda queue_list: queue_list.insert(target, queue_list.pop(position))
+    )
+
+
+def legacy_page(tracks: queue.Queue, number: int, size: int = 10) -> list:
+    start = (number - 1) * size
+    return list(tracks.queue)[start : start + size]
+
+
+def memory_kib(build, tracks: int) -> float:
+    entries = playlist(tracks)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build(entries)
+    del entries
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del built
+    return used / 1024
+
+
+def per_call(stmt, number: int) -> float:
+    """Best-of-five time per call, in microseconds."""
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=10000)
+    args = parser.parse_args()
+
+    middle = args.tracks // 2
+    last_page = -(-args.tracks // 10)
+    legacy = build_legacy(playlist(args.tracks))
+    current = build_current(playlist(args.tracks))
+
+    # Play the next track and queue it again, as loop mode does
+    def legacy_cycle():
+        legacy.put(legacy.get())
+
+    def current_cycle():
+        current.append(current.pop())
+
+    rows = [
+        (
+            f"memory, {args.tracks} tracks",
+            "KiB",
+            memory_kib(build_legacy, args.tracks),
+            memory_kib(build_current, args.tracks),
+        ),
+        (
+            "queue and play a track",
+            "us",
+            per_call(legacy_cycle, 20000),
+            per_call(current_cycle, 20000),
+        ),
+        (
+            "remove from the middle",
+            "us",
+            per_call(lambda: legacy.put(legacy_remove(legacy, middle)), 20),
+            per_call(lambda: current.append(current.remove(middle - 1)), 2000),
+        ),
+        (
+            "move to the front",
+            "us",
+            per_call(lambda: legacy_move(legacy, middle, 0), 20),
+            per_call(lambda: current.move(middle, 0), 2000),
+        ),
+        (
+            "shuffle",
+            "us",
+            per_call(lambda: legacy_rebuild(legacy, random.shuffle), 20),
+            per_call(current.shuffle, 20),
+        ),
+        (
+            "first page",
+            "us",
+            per_call(lambda: legacy_page(legacy, 1), 200),
+            per_call(lambda: current.page(1), 20000),
+        ),
+        (
+            "last page",
+            "us",
+            per_call(lambda: legacy_page(legacy, last_page), 200),
+            per_call(lambda: current.page(last_page), 2000),
+        ),
+    ]
+    print(f"{'':<24} {'before':>12} {'after':>12}")
+    for name, unit, before, after in rows:
+        print(
+            f"{name:<24} {before:>9.1f} {unit:<3}{after:>9.1f} {unit:<3}"
+            f" {before / after:>6.1f}x"
+        )
+    # The old queue had no entry IDs; /remove #ID and /move #ID look one up
+    entry_id = current[middle].entry_id
+    print(
+        f"{'find an entry by ID':<24} {'':>12}"
+        f" {per_call(lambda: current.find(entry_id), 200):>9.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
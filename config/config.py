@@ -19,9 +19,38 @@ class Config:
     ALLOWED_CHANNELS = _config["discord"]["allowed_channels"]
     COUNTING_CHANNELS = _config["discord"]["counting_channels"]
 
+    # Counting Configuration
+    _counting = _config.get("counting", {})
+    COUNTING_FLUSH_INTERVAL = _counting.get("flush_interval", 5)  # seconds
+    COUNTING_EVALUATOR = _counting.get("evaluator", "inline")  # "inline" or "pool"
+    COUNTING_POOL_WORKERS = _counting.get("pool_workers", 2)
+    COUNTING_EVAL_TIMEOUT = _counting.get("eval_timeout", 0.5)  # seconds
+    COUNTING_EVAL_MEMORY_MB = _counting.get("eval_memory_mb", 256)
+    COUNTING_CATCHUP_PAGE_SIZE = _counting.get("catchup_page_size", 500)
+    # History retention in days; 0 keeps forever
+    COUNTING_EVENT_RETENTION_DAYS = _counting.get("event_retention_days", 30)
+    COUNTING_HOURLY_RETENTION_DAYS = _counting.get("hourly_retention_days", 7)
+    COUNTING_DAILY_RETENTION_DAYS = _counting.get("daily_retention_days", 0)
+    COUNTING_MAINTENANCE_INTERVAL = _counting.get("maintenance_interval", 3600)
+    COUNTING_MAINTENANCE_IDLE = _counting.get("maintenance_idle", 30)  # seconds
+    COUNTING_VACUUM_PAGES = _counting.get("vacuum_pages", 256)
+    COUNTING_BACKUP_DIR = _counting.get("backup_dir", "")  # "" disables
+    COUNTING_BACKUP_INTERVAL = _counting.get("backup_interval", 86400)  # seconds
+    COUNTING_BACKUP_KEEP = _counting.get("backup_keep", 7)
+
     # Music Configuration
     MUSIC_CHANNEL_ID = _config["discord"]["music_channel_id"]
     MAX_SONG_DURATION = _config["discord"]["max_song_duration"]  # 10 minutes
+    _music = _config.get("music", {})
+    MUSIC_CACHE_MAX_ENTRIES = _music.get("cache_max_entries", 5000)
+    MUSIC_CACHE_MAX_BYTES = _music.get("cache_max_bytes", 4 * 1024 * 1024)
+    MUSIC_EXTRACT_WORKERS = _music.get("extract_workers", 2)
+    MUSIC_EXTRACT_PROCESSES = _music.get("extract_processes", False)
+    MUSIC_PREFETCH_TRACKS = _music.get("prefetch_tracks", 2)
+    MUSIC_IDLE_TIMEOUT = _music.get("idle_timeout", 300)
+    MUSIC_AUDIO_CACHE_DIR = _music.get("audio_cache_dir", "")  # "" disables
+    MUSIC_AUDIO_CACHE_MAX_BYTES = _music.get("audio_cache_max_bytes", 1024**3)
+    MUSIC_AUDIO_CACHE_MIN_PLAYS = _music.get("audio_cache_min_plays", 3)
 
     # Cooldowns (in seconds)
     START_COOLDOWN = _config["discord"]["start_cooldown"]  # 1 hour
@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 from datetime import datetime
 from config.config import Config
+from utils.users import UserResolver
 import logging
 
 
@@ -16,6 +17,8 @@ class DiscordBot(commands.Bot):
 
         self.logger = logging.getLogger("DiscordBot")
         self.startup_time = datetime.now()
+        self.features = []
+        self.user_resolver = UserResolver(self)
 
     async def setup_hook(self):
         await self.tree.sync()
@@ -28,6 +31,18 @@ class DiscordBot(commands.Bot):
             status=discord.Status.dnd,
         )
 
+    async def close(self):
+        for feature in self.features:
+            try:
+                await feature.teardown()
+            except Exception as e:
+                self.logger.error(
+                    f"Error tearing down {feature.__class__.__name__}: {e}"
+                )
+        self.features.clear()
+        self.logger.info(f"User resolver stats: {self.user_resolver.info()}")
+        await super().close()
+
     def run_bot(self):
         self.logger.info("Starting bot...")
         self.run(Config.DISCORD_TOKEN)
@@ -8,9 +8,15 @@ class BotFeature(ABC):
         self.bot = bot
         self.logger = logging.getLogger(self.__class__.__name__)
         self.setup_commands()
+        if hasattr(bot, "features"):
+            bot.features.append(self)
         self.logger.info(f"Feature {self.__class__.__name__} loaded")
 
     @abstractmethod
     def setup_commands(self) -> None:
         """Setup the feature's commands and event listeners."""
         pass
+
+    async def teardown(self) -> None:
+        """Release the feature's resources when the bot shuts down."""
+        pass
@@ -1,11 +1,13 @@
 from features.base import BotFeature
 from utils.logger import Logger
-from utils.counter import CounterUtils
+from utils.counter import PRIMES, CounterUtils, CountingActor, PooledEvaluator
 from utils.helpers import discord_message
 from config.config import Config
+import asyncio
 import discord
+import time
 from discord.ext import commands
-from typing import Optional
+from typing import Dict, Optional, Set
 from datetime import datetime
 
 
@@ -15,6 +17,133 @@ class CountingFeature(BotFeature):
         self.logger = Logger("Counting Bot")
         self.counter = CounterUtils()
         self.config = Config
+        self.evaluator: Optional[PooledEvaluator] = None
+        if self.config.COUNTING_EVALUATOR == "pool":
+            self.evaluator = PooledEvaluator(
+                workers=self.config.COUNTING_POOL_WORKERS,
+                timeout=self.config.COUNTING_EVAL_TIMEOUT,
+                memory_limit_mb=self.config.COUNTING_EVAL_MEMORY_MB,
+            )
+        self.flush_task: Optional[asyncio.Task] = None
+        self.maintenance_task: Optional[asyncio.Task] = None
+        self.catch_up_task: Optional[asyncio.Task] = None
+        self.actors: Dict[int, CountingActor] = {}
+
+        # Channels are matched by ID; config entries may be IDs or names
+        self.counting_channel_names = {
+            channel
+            for channel in self.config.COUNTING_CHANNELS
+            if isinstance(channel, str)
+        }
+        self.counting_channel_ids: Set[int] = {
+            channel
+            for channel in self.config.COUNTING_CHANNELS
+            if isinstance(channel, int)
+        }
+        self.other_channel_ids: Set[int] = set()
+        self.feedback_tasks: Set[asyncio.Task] = set()
+
+    async def teardown(self):
+        """Flush pending counting stats and drain writes before the bot exits."""
+        if self.flush_task:
+            self.flush_task.cancel()
+        if self.maintenance_task:
+            self.maintenance_task.cancel()
+        if self.catch_up_task:
+            self.catch_up_task.cancel()
+        for actor in self.actors.values():
+            await actor.close()
+        if self.evaluator:
+            await asyncio.to_thread(self.evaluator.close)
+        self.log_cache_stats()
+        try:
+            await self.counter.flush()
+        finally:
+            await asyncio.to_thread(self.counter.close)
+
+    async def flush_periodically(self):
+        """Write buffered counting stats to the database on a timer."""
+        while True:
+            await asyncio.sleep(self.config.COUNTING_FLUSH_INTERVAL)
+            try:
+                await self.counter.flush()
+            except Exception as e:
+                self.logger.error(f"Error flushing counting stats: {e}")
+
+    async def maintain_periodically(self):
+        """Run database upkeep on a timer, waiting for a lull in counting."""
+        next_backup = time.monotonic()
+        while True:
+            await asyncio.sleep(self.config.COUNTING_MAINTENANCE_INTERVAL)
+
+            idle = self.config.COUNTING_MAINTENANCE_IDLE
+            while time.monotonic() - self.counter.last_activity < idle:
+                await asyncio.sleep(
+                    idle - (time.monotonic() - self.counter.last_activity)
+                )
+
+            backup = bool(self.config.COUNTING_BACKUP_DIR) and (
+                time.monotonic() >= next_backup
+            )
+            if backup:
+                next_backup = time.monotonic() + self.config.COUNTING_BACKUP_INTERVAL
+            await self.run_maintenance(backup)
+
+    async def run_maintenance(self, backup: bool = False):
+        """Prune history, checkpoint, vacuum, analyze and optionally back up.
+
+        Each step is a short job of its own and its duration is logged.
+        """
+        steps = [
+            ("flush", self.counter.flush),
+            (
+                "prune history",
+                lambda: self.counter.prune_history(
+                    self.config.COUNTING_EVENT_RETENTION_DAYS,
+                    self.config.COUNTING_HOURLY_RETENTION_DAYS,
+                    self.config.COUNTING_DAILY_RETENTION_DAYS,
+                ),
+            ),
+            ("checkpoint", self.counter.db.checkpoint),
+            ("enable incremental vacuum", self.counter.db.enable_incremental_vacuum),
+            (
+                "incremental vacuum",
+                lambda: self.counter.db.incremental_vacuum(
+                    self.config.COUNTING_VACUUM_PAGES
+                ),
+            ),
+            ("optimize", self.counter.db.optimize),
+        ]
+        if backup:
+            steps.append(
+                (
+                    "backup",
+                    lambda: self.counter.backup(
+                        self.config.COUNTING_BACKUP_DIR,
+                        self.config.COUNTING_BACKUP_KEEP,
+                    ),
+                )
+            )
+
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                result = await step()
+            except Exception as e:
+                self.logger.error(f"Counting maintenance {name} failed: {e}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            self.logger.info(
+                f"Counting maintenance {name} took {elapsed:.1f} ms"
+                + (f" ({result})" if result is not None else "")
+            )
+        self.log_cache_stats()
+
+    def log_cache_stats(self):
+        """Log the expression cache's hit rate when counts are evaluated here."""
+        # Pooled workers keep their own caches
+        if not self.evaluator:
+            self.logger.info(f"Expression cache stats: {self.counter.cache_info()}")
 
     def setup_commands(self):
         @self.bot.command(name="count_help")
@@ -56,6 +185,27 @@ class CountingFeature(BotFeature):
             self.logger.info(f"Next prime requested by {ctx.author.name}")
             await self.handle_next_prime_command(ctx)
 
+        @self.bot.listen("on_ready")
+        async def start_counting_tasks():
+            # Registered before anything awaits so live counts queue behind it
+            if self.catch_up_task is None or self.catch_up_task.done():
+                self.catch_up_task = asyncio.create_task(self.catch_up())
+            if self.flush_task is None or self.flush_task.done():
+                self.flush_task = asyncio.create_task(self.flush_periodically())
+            if self.maintenance_task is None or self.maintenance_task.done():
+                self.maintenance_task = asyncio.create_task(
+                    self.maintain_periodically()
+                )
+            if self.evaluator:
+                await self.evaluator.warm()
+
+        @self.bot.listen("on_guild_channel_update")
+        async def forget_renamed_channel(before, after):
+            if before.name != after.name:
+                self.other_channel_ids.discard(after.id)
+                if after.id not in self.config.COUNTING_CHANNELS:
+                    self.counting_channel_ids.discard(after.id)
+
         @self.bot.event
         async def on_message(message):
             if message.author.bot:
@@ -67,7 +217,7 @@ class CountingFeature(BotFeature):
                 return
 
             # Check if this is a counting channel
-            if message.channel.name not in self.config.COUNTING_CHANNELS:
+            if not self.is_counting_channel(message.channel):
                 return
 
             # Process the count
@@ -76,20 +226,153 @@ class CountingFeature(BotFeature):
             except Exception as e:
                 self.logger.error(f"Error processing count: {e}")
 
+    def is_counting_channel(self, channel) -> bool:
+        """Check a channel against the counting channels, memoized by ID."""
+        if channel.id in self.counting_channel_ids:
+            return True
+        if channel.id in self.other_channel_ids:
+            return False
+
+        if getattr(channel, "name", None) in self.counting_channel_names:
+            self.counting_channel_ids.add(channel.id)
+            return True
+        self.other_channel_ids.add(channel.id)
+        return False
+
     async def process_count(self, message):
-        """Process a counting message."""
+        """Process a counting message.
+
+        Counts are validated strictly in message order by the guild's
+        actor; reactions and announcements are sent afterwards without
+        holding up the next count.
+        """
+        if self.catch_up_task and not self.catch_up_task.done():
+            await asyncio.wait({self.catch_up_task})
+
+        actor = self.actors.get(message.guild.id)
+        if actor is None:
+            actor = self.actors[message.guild.id] = CountingActor(self.validate_message)
+        await actor.submit(message.id, message)
+
+    async def catch_up(self):
+        """Replay counts sent to counting channels while the bot was offline."""
+        # Live counts wait for catch-up, so none of them hits an unbuilt
+        # prime sieve and builds it on the loop
+        await asyncio.to_thread(PRIMES.build)
+        try:
+            await self.counter.load_progress()
+        except Exception as e:
+            self.logger.error(f"Error loading counting progress: {e}")
+            return
+
+        channels = [
+            channel
+            for guild in self.bot.guilds
+            for channel in guild.text_channels
+            if self.is_counting_channel(channel)
+        ]
+        await asyncio.gather(*(self.catch_up_channel(channel) for channel in channels))
+
+    async def catch_up_channel(self, channel):
+        """Stream a channel's history since its last processed message.
+
+        Each page is evaluated as a batch and its stat changes are written
+        in one transaction. Channels with no recorded progress start
+        fresh instead of replaying their whole history.
+        """
+        channel_id = str(channel.id)
+        last_id = self.counter.last_processed.get(channel_id)
+        if last_id is None:
+            return
+
+        page_size = self.config.COUNTING_CATCHUP_PAGE_SIZE
+        replayed = 0
+        try:
+            while True:
+                messages = [
+                    message
+                    async for message in channel.history(
+                        limit=page_size,
+                        after=discord.Object(id=last_id),
+                        oldest_first=True,
+                    )
+                ]
+                if not messages:
+                    break
+
+                replayed += await self.replay_page(channel_id, messages)
+                last_id = messages[-1].id
+                if len(messages) < page_size:
+                    break
+        except Exception as e:
+            self.logger.error(f"Error catching up #{channel.name}: {e}")
+
+        if replayed:
+            self.logger.info(f"Caught up {replayed} counts in #{channel.name}")
+
+    async def replay_page(self, channel_id: str, messages) -> int:
+        """Apply one page of missed messages without sending any feedback."""
+        last_id = self.counter.last_processed.get(channel_id, 0)
+        candidates = [
+            message
+            for message in messages
+            if message.id > last_id
+            and not message.author.bot
+            and not message.content.startswith(self.bot.command_prefix)
+        ]
+        evaluations = await asyncio.gather(
+            *(self.evaluate(message.content) for message in candidates)
+        )
+
+        applied = 0
+        for message, evaluation in zip(candidates, evaluations):
+            if evaluation is None:
+                continue
+            state = await self.counter.get_state(str(message.guild.id))
+            self.counter.apply_count(
+                state,
+                evaluation.value,
+                str(message.author.id),
+                message.created_at.timestamp(),
+            )
+            applied += 1
+
+        self.counter.mark_processed(channel_id, messages[-1].id)
+        await self.counter.flush()
+        return applied
+
+    async def evaluate(self, content: str):
+        """Evaluate message text with the configured evaluator."""
+        if self.evaluator:
+            # Plain numbers, chat and repeats are answered here; only new
+            # expressions make the trip to a worker
+            answered, result = self.counter.evaluate_cached(content)
+            if answered:
+                return result
+            result = await self.evaluator.evaluate(content)
+            self.counter.remember(content, result)
+            return result
+        return self.counter.evaluate(content)
+
+    async def validate_message(self, message):
+        """Evaluate and validate one counting message (runs inside the actor)."""
+        # Skip anything offline catch-up already replayed
+        if not self.counter.mark_processed(str(message.channel.id), message.id):
+            return
+
         self.logger.info(
             f"Message received from {message.author.name}: {message.content}"
         )
 
         # First check if this looks like a counting attempt
         # Try to evaluate the expression first
-        evaluated_value = self.counter._evaluate_expression(message.content)
+        evaluation = await self.evaluate(message.content)
 
         # If we couldn't evaluate it as a number, treat it as regular chat
-        if evaluated_value is None:
+        if evaluation is None:
             # Allow regular chat messages to pass through without any reaction
             return
+        evaluated_value = evaluation.value
 
         # At this point, we know it's a counting attempt
         self.logger.info(
@@ -97,48 +380,47 @@ class CountingFeature(BotFeature):
         )
 
         # Validate the count
-        result = self.counter.validate_count(
-            str(evaluated_value), str(message.guild.id), str(message.author.id)
+        is_valid, is_prime, _ = await self.counter.validate_count(
+            evaluation, str(message.guild.id), str(message.author.id)
         )
 
-        if not result:
-            self.logger.error(
-                f"Invalid count from {message.author.name}: {message.content} (evaluated to: {evaluated_value})"
-            )
-            await message.add_reaction("❌")
-            await message.channel.send(
-                f"{message.author.mention} ruined the count! Starting over from 1.\n"
-                f"Debug info - Your input '{message.content}' evaluated to: {evaluated_value}"
-            )
-            return
-
-        is_valid, is_prime, _ = result
-
-        if is_valid:
-            count_value = evaluated_value
-            self.logger.info(
-                f"Valid count from {message.author.name}: {count_value}"
-                + (" (PRIME)" if is_prime else "")
-            )
+        task = asyncio.create_task(
+            self.send_count_feedback(message, evaluated_value, is_valid, is_prime)
+        )
+        self.feedback_tasks.add(task)
+        task.add_done_callback(self.feedback_tasks.discard)
+
+    async def send_count_feedback(
+        self, message, count_value: int, is_valid: bool, is_prime: bool
+    ):
+        """React to a validated count and announce failures."""
+        try:
+            if is_valid:
+                self.logger.info(
+                    f"Valid count from {message.author.name}: {count_value}"
+                    + (" (PRIME)" if is_prime else "")
+                )
 
-            # Log milestones
-            if count_value % 100 == 0:
-                self.logger.info(f"Century milestone reached: {count_value}")
-            if count_value % 1000 == 0:
-                self.logger.info(f"Millennium milestone reached: {count_value}")
+                # Log milestones
+                if count_value % 100 == 0:
+                    self.logger.info(f"Century milestone reached: {count_value}")
+                if count_value % 1000 == 0:
+                    self.logger.info(f"Millennium milestone reached: {count_value}")
 
-            if is_prime:
-                await message.add_reaction("🔢")
+                if is_prime:
+                    await message.add_reaction("🔢")
+                else:
+                    await message.add_reaction("✅")
             else:
-                await message.add_reaction("✅")
-        else:
-            self.logger.error(
-                f"Invalid sequence from {message.author.name}: expected next number"
-            )
-            await message.add_reaction("❌")
-            await message.channel.send(
-                f"{message.author.mention} ruined the count! Starting over from 1."
-            )
+                self.logger.error(
+                    f"Invalid sequence from {message.author.name}: expected next number"
+                )
+                await message.add_reaction("❌")
+                await message.channel.send(
+                    f"{message.author.mention} ruined the count! Starting over from 1."
+                )
+        except Exception as e:
+            self.logger.error(f"Error sending count feedback: {e}")
 
     async def handle_help_command(self, ctx):
         """Handle the count_help command."""
@@ -152,7 +434,7 @@ class CountingFeature(BotFeature):
             name="Commands",
             value="""
                 `/count_help` - Show this help message
-                `/count_stats [@user]` - Show user statistics
+                `/count_stats [@user]` - Show user statistics, last 24h/7d and best streak
                 `/count_top` - Show top counters
                 `/prime_top` - Show top prime counters
                 `/fail_top` - Show top failures
@@ -167,7 +449,7 @@ class CountingFeature(BotFeature):
                 • Type the next number in sequence
                 • No counting twice in a row
                 • Supports math expressions (e.g., `2+2`, `sqrt(16)`)
-                • Supports number words (e.g., 'four', 'twenty')
+                • Supports number words (e.g., 'four', 'twenty one', 'twenty + 1')
                 • ✅ - Correct number
                 • 🔢 - Prime number
                 • ❌ - Wrong number
@@ -179,7 +461,7 @@ class CountingFeature(BotFeature):
 
     async def handle_stats_command(self, ctx, user: discord.Member):
         """Handle the count_stats command."""
-        stats = self.counter.get_user_stats(str(ctx.guild.id), str(user.id))
+        stats = await self.counter.get_user_stats(str(ctx.guild.id), str(user.id))
         if not stats:
             await discord_message(ctx, f"{user.mention} hasn't counted anything yet!")
             return
@@ -200,6 +482,19 @@ class CountingFeature(BotFeature):
         embed.add_field(
             name="Highest Count", value=str(stats["highest_count"]), inline=True
         )
+        embed.add_field(
+            name="Best Streak", value=str(stats["best_streak"]), inline=True
+        )
+        embed.add_field(
+            name="Last 24h",
+            value=f"{stats['counts_24h']} counts, {stats['fails_24h']} fails",
+            inline=True,
+        )
+        embed.add_field(
+            name="Last 7d",
+            value=f"{stats['counts_7d']} counts, {stats['fails_7d']} fails",
+            inline=True,
+        )
 
         if stats["last_fail_date"]:
             fail_date = datetime.fromtimestamp(float(stats["last_fail_date"]))
@@ -213,17 +508,17 @@ class CountingFeature(BotFeature):
 
     async def handle_top_command(self, ctx):
         """Handle the count_top command."""
-        leaders = self.counter.get_leaderboard(str(ctx.guild.id), "counts")
+        leaders = await self.counter.get_leaderboard(str(ctx.guild.id), "counts")
         await self.send_leaderboard(ctx, "Top Counters", leaders)
 
     async def handle_prime_top_command(self, ctx):
         """Handle the prime_top command."""
-        leaders = self.counter.get_leaderboard(str(ctx.guild.id), "primes")
+        leaders = await self.counter.get_leaderboard(str(ctx.guild.id), "primes")
         await self.send_leaderboard(ctx, "Top Prime Counters", leaders)
 
     async def handle_fail_top_command(self, ctx):
         """Handle the fail_top command."""
-        leaders = self.counter.get_leaderboard(str(ctx.guild.id), "fails")
+        leaders = await self.counter.get_leaderboard(str(ctx.guild.id), "fails")
         await self.send_leaderboard(ctx, "Top Failures", leaders)
 
     async def send_leaderboard(self, ctx, title: str, leaders):
@@ -232,21 +527,19 @@ class CountingFeature(BotFeature):
             await discord_message(ctx, "No data available for the leaderboard!")
             return
 
+        users = await self.bot.user_resolver.resolve_many(
+            (user_id for _, user_id in leaders), ctx.guild
+        )
+
         embed = discord.Embed(title=title, color=0x3498DB)
         for i, (score, user_id) in enumerate(leaders, 1):
-            try:
-                user = await self.bot.fetch_user(int(user_id))
-                embed.add_field(
-                    name=f"#{i} {user.display_name}", value=str(score), inline=False
-                )
-            except discord.NotFound:
-                embed.add_field(
-                    name=f"#{i} Unknown User", value=str(score), inline=False
-                )
+            user = users[int(user_id)]
+            name = user.display_name if user else "Unknown User"
+            embed.add_field(name=f"#{i} {name}", value=str(score), inline=False)
 
         await discord_message(ctx, embed=embed)
 
     async def handle_next_prime_command(self, ctx):
         """Handle the next_prime command."""
-        next_prime = self.counter.get_next_prime(str(ctx.guild.id))
+        next_prime = await self.counter.get_next_prime(str(ctx.guild.id))
         await discord_message(ctx, f"The next prime number is {next_prime}")
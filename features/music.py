@@ -1,15 +1,17 @@
 from features.base import BotFeature
 from utils.logger import Logger
 from config.config import Config
-from utils.cache import MusicCache
+from utils.cache import AudioCache, MusicCache
+from utils.extractor import ExtractionService, SingleFlight, video_id
+from utils.audio import PlaybackStats, TimedAudio, open_stream
+from utils.player import GuildPlayer, Track
 from utils.helpers import discord_message, discord_embed
-import queue
-import yt_dlp
 import discord
 import asyncio
 import aiohttp
 import re
-from typing import List, Dict
+import time
+from typing import List, Dict, Optional
 from discord import app_commands
 
 
@@ -18,22 +20,18 @@ from discord import app_commands
 
 
 class MusicFeature(BotFeature):
+    QUEUE_PAGE_SIZE = 10
+
     def __init__(self, bot):
         super().__init__(bot)
 
         # Basic configs
+        # Opus formats can be streamed to Discord without re-encoding
         self.ydl_opts = {
-            "format": "bestaudio/best",
+            "format": "bestaudio[acodec=opus]/bestaudio/best",
             "noplaylist": True,
             "quiet": True,
             "extract_flat": False,
-            "postprocessors": [
-                {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "wav",
-                    "preferredquality": "320",
-                }
-            ],
         }
 
         self.playlist_opts = {
@@ -41,13 +39,6 @@ class MusicFeature(BotFeature):
             "noplaylist": False,
             "quiet": True,
             "extract_flat": "in_playlist",
-            "postprocessors": [
-                {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "wav",
-                    "preferredquality": "320",
-                }
-            ],
         }
 
         self.ffmpeg_opts = {
@@ -56,23 +47,51 @@ class MusicFeature(BotFeature):
         }
         self.config = Config()
         self.logger = Logger("Music Bot")
-        self.cache = MusicCache()
-        self.pending_playlist_tracks = []
-        self.is_processing_playlist = False
-
-        # Player state
-        self.queue = queue.Queue()
-        self.channel = None
-        self.current_player = None
-        self.volume = 1.0
-        self.loop = False
-        self.current_track: Dict = None
+        self.extractor = ExtractionService(
+            {"track": self.ydl_opts, "playlist": self.playlist_opts},
+            workers=self.config.MUSIC_EXTRACT_WORKERS,
+            processes=self.config.MUSIC_EXTRACT_PROCESSES,
+        )
+        self.resolutions = SingleFlight()
+        self.cache = MusicCache(
+            max_entries=self.config.MUSIC_CACHE_MAX_ENTRIES,
+            max_bytes=self.config.MUSIC_CACHE_MAX_BYTES,
+        )
+        self.audio_cache: Optional[AudioCache] = None
+        if self.config.MUSIC_AUDIO_CACHE_DIR:
+            self.audio_cache = AudioCache(
+                self.config.MUSIC_AUDIO_CACHE_DIR,
+                self.cache,
+                max_bytes=self.config.MUSIC_AUDIO_CACHE_MAX_BYTES,
+                min_plays=self.config.MUSIC_AUDIO_CACHE_MIN_PLAYS,
+            )
+        self.playback_stats = PlaybackStats()
+
+        # Player state, one per guild with an active music session
+        self.players: Dict[int, GuildPlayer] = {}
 
         # API configurations
         self.lyrics_base_url = "https://api.genius.com"
         self.lyrics_token = self.config.GENIUS_API_TOKEN
 
+    async def teardown(self):
+        self.logger.info(f"Music cache stats: {self.cache.get_stats()}")
+        self.logger.info(f"Extraction stats: {self.extractor.info()}")
+        self.logger.info(f"Resolution dedup stats: {self.resolutions.info()}")
+        self.logger.info(f"Playback stats: {self.playback_stats.info()}")
+        for player in list(self.players.values()):
+            self.close_player(player)
+        if self.audio_cache:
+            self.logger.info(f"Audio cache stats: {self.audio_cache.info()}")
+            await self.audio_cache.close()
+        await self.extractor.close()
+        await self.cache.close()
+
     def setup_commands(self):
+        @self.bot.listen("on_ready")
+        async def warm_extractors():
+            await self.extractor.warm()
+
         @self.bot.hybrid_command(
             name="join", with_app_command=True, description="Make me join your call"
         )
@@ -112,7 +131,7 @@ class MusicFeature(BotFeature):
             name="skip", with_app_command=True, description="Skip next song in queue"
         )
         async def skip(ctx):
-            if self.in_call(ctx) and self.queue.empty():
+            if self.in_call(ctx) and not self.player(ctx).queue:
                 await discord_message(ctx, "Queue is empty bruh... Anyhowz ah you 🎵")
             else:
                 await self.handle_skip_command(ctx)
@@ -129,8 +148,9 @@ class MusicFeature(BotFeature):
             with_app_command=True,
             description="Add song to queue",
         )
-        async def show_queue(ctx):
-            await self.handle_queue_command(ctx)
+        @app_commands.describe(page="Queue page (optional)")
+        async def show_queue(ctx, page: int = 1):
+            await self.handle_queue_command(ctx, page)
 
         @self.bot.hybrid_command(
             name="clear", with_app_command=True, description="Empty song queue"
@@ -143,9 +163,27 @@ class MusicFeature(BotFeature):
             with_app_command=True,
             description="Remove song from queue based on specified song queue position",
         )
-        @app_commands.describe(position="Queue number")
-        async def remove_from_queue(ctx, position: int):
-            await self.handle_remove_command(ctx, position)
+        @app_commands.describe(entry="Queue number, or the #ID shown in the queue")
+        async def remove_from_queue(ctx, entry: str):
+            await self.handle_remove_command(ctx, entry)
+
+        @self.bot.hybrid_command(
+            name="move",
+            with_app_command=True,
+            description="Move a queued song to another queue position",
+        )
+        @app_commands.describe(
+            entry="Queue number, or the #ID shown in the queue",
+            target="New queue number",
+        )
+        async def move_in_queue(ctx, entry: str, target: int):
+            await self.handle_move_command(ctx, entry, target)
+
+        @self.bot.hybrid_command(
+            name="shuffle", with_app_command=True, description="Shuffle song queue"
+        )
+        async def shuffle_queue(ctx):
+            await self.handle_shuffle_command(ctx)
 
         @self.bot.hybrid_command(
             name="volume",
@@ -206,72 +244,129 @@ class MusicFeature(BotFeature):
     def is_playlist(self, url: str) -> bool:
         return "list=" in url and "youtube.com" in url
 
-    async def search_music(self, query: str, url: bool = False):
-        # Make this function truly asynchronous by moving the yt-dlp operation to a thread
-        # Use a thread pool to handle the CPU-bound yt-dlp operation
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, lambda: self.fetch_from_youtube(query, url)  # Use default executor
-        )
-        return result
+    async def search_music(
+        self,
+        query: str,
+        url: bool = False,
+        priority: int = ExtractionService.INTERACTIVE,
+    ):
+        """Resolve a query or URL to a playable track, using the cache first.
+
+        Cached metadata with an expired stream URL is refreshed from the
+        video page instead of repeating the search. Concurrent requests for
+        the same video or search share a single extraction. Search results
+        are also cached under the video's page URL, which is what a queued
+        track is resolved by when it comes up.
+        """
+        status, entry = self.cache.lookup(query)
+        if status == MusicCache.HIT:
+            return entry
+        if status == MusicCache.NEGATIVE:
+            return None
+
+        target = query
+        if status == MusicCache.STALE and entry["webpage_url"]:
+            target, url = entry["webpage_url"], True
+
+        video = video_id(target) if url else None
+        key = f"video:{video}" if video else f"query:{' '.join(query.lower().split())}"
 
-    def fetch_from_youtube(self, query: str, url: bool):
-        """This function runs in a separate thread"""
+        async def resolve():
+            result = await self.fetch_from_youtube(target, url, priority)
+            if result:
+                self.cache.update(query, result)
+                # Queued tracks are resolved again by their page URL
+                if result["webpage_url"].lower() != query.lower():
+                    self.cache.update(result["webpage_url"], result)
+            else:
+                self.cache.update_missing(query)
+            return result
+
+        result = await self.resolutions.run(key, resolve)
+        # Each caller gets its own copy, never the cached dict itself
+        return dict(result) if result else result
+
+    async def fetch_from_youtube(
+        self, query: str, url: bool, priority: int = ExtractionService.INTERACTIVE
+    ):
+        """Extract a track on the extraction service's warm workers."""
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                if url:
-                    info = ydl.extract_info(query, download=False)
-                else:
-                    info = ydl.extract_info(f"ytsearch:{query}", download=False)[
-                        "entries"
-                    ][0]
+            if url:
+                info = await self.extractor.extract("track", query, priority)
+            else:
+                info = (
+                    await self.extractor.extract("track", f"ytsearch:{query}", priority)
+                )["entries"][0]
             return {
+                "id": info["id"],
                 "url": info["url"],
                 "title": info["title"],
                 "duration": info["duration"],
+                "codec": info.get("acodec"),
+                "webpage_url": info.get("webpage_url")
+                or f"https://www.youtube.com/watch?v={info['id']}",
             }
         except Exception as e:
             self.logger.error(f"Error fetching from YouTube: {e}")
             return None
 
     async def search_playlist(self, url):
-        """Move playlist extraction to a thread as well"""
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, lambda: self._extract_playlist(url))
-        return result
-
-    def _extract_playlist(self, url):
-        """This runs in a separate thread"""
+        """Extract a playlist's entries on the extraction service."""
         try:
-            with yt_dlp.YoutubeDL(self.playlist_opts) as ydl:
-                playlist_info = ydl.extract_info(url, download=False)
-                if "entries" in playlist_info:
-                    return playlist_info["entries"]
-                else:
-                    self.logger.error("No entries found in playlist")
-                    return []
+            playlist_info = await self.extractor.extract("playlist", url)
+            if "entries" in playlist_info:
+                return playlist_info["entries"]
+            else:
+                self.logger.error("No entries found in playlist")
+                return []
         except Exception as e:
             self.logger.error(f"Error fetching playlist: {e}")
             return []
 
-    async def process_intermediate_queue(self, ctx):
-        while self.is_processing_playlist:
-            track = self.pending_playlist_tracks.pop(0)
-            if track.get("searched"):
-                self.queue.put(track.pop("searched"))
-            else:
-                self.logger.info("Adding {}".format(track.get("title")))
-                track_info = await self.search_music(track.get("url"), True)
-                if track_info:
-                    self.queue.put(track_info)
-                else:
-                    self.logger.error(track_info)
-
-            if len(self.pending_playlist_tracks) == 0:
-                self.is_processing_playlist = False
-            asyncio.sleep(0.1)
-
-        await discord_message(ctx, "Added the playlist to the queue... I THINK?!")
+    def player(self, ctx) -> GuildPlayer:
+        """The guild's player, created on its first music command."""
+        player = self.players.get(ctx.guild.id)
+        if player is None:
+            player = self.players[ctx.guild.id] = GuildPlayer(ctx.guild.id)
+            # Cancelled once a track starts; a player nobody plays on is dropped
+            self.start_idle_timer(ctx, player)
+        return player
+
+    def start_idle_timer(self, ctx, player: GuildPlayer):
+        """Leave the call and drop the player if it stays idle too long."""
+
+        async def on_idle():
+            voice_client = ctx.guild.voice_client
+            if voice_client and voice_client.is_playing():
+                return
+            self.logger.info(f"Music player for guild {player.guild_id} went idle")
+            self.close_player(player)
+            if voice_client:
+                await voice_client.disconnect()
+
+        player.start_idle_timer(self.config.MUSIC_IDLE_TIMEOUT, on_idle)
+
+    def close_player(self, player: GuildPlayer):
+        player.close()
+        if self.players.get(player.guild_id) is player:
+            del self.players[player.guild_id]
+
+    def prefetch(self, player: GuildPlayer):
+        """Resolve stream URLs for the next few tracks in the background.
+
+        Results land in the music cache, so the next play_next finds a
+        live stream URL without waiting on an extraction.
+        """
+        for track in player.queue.peek(self.config.MUSIC_PREFETCH_TRACKS):
+            if self.audio_cache and self.audio_cache.contains(track.id):
+                continue
+            player.track_prefetch(
+                asyncio.create_task(
+                    self.search_music(
+                        track.webpage_url, True, ExtractionService.BACKGROUND
+                    )
+                )
+            )
 
     def in_call(self, ctx) -> bool:
         """Check if bot is in a voice call."""
@@ -312,7 +407,7 @@ class MusicFeature(BotFeature):
         else:
             await channel.connect()
 
-        self.channel = channel
+        self.player(ctx).channel = channel
         await discord_message(
             ctx, f"I have blessed {channel.name} with my prescence! 🎵"
         )
@@ -322,20 +417,20 @@ class MusicFeature(BotFeature):
         await ctx.defer()
         if not self.in_call(ctx):
             await self.handle_join_command(ctx, None)
+        player = self.player(ctx)
 
         if self.is_playlist(query):
             self.logger.info("Searching for a playlist")
             tracks = await self.search_playlist(query)
             if tracks:
                 self.logger.info("Adding the songs in the playlist to the queue")
-                if not self.is_processing_playlist:
-                    track_info = await self.search_music(tracks.pop(0).get("url"), True)
-                    self.queue.put(track_info)
-                    if not ctx.guild.voice_client.is_playing():
-                        await self.play_next(ctx)
-                self.pending_playlist_tracks.extend(tracks)
-                self.is_processing_playlist = True
-                asyncio.create_task(self.process_intermediate_queue(ctx))
+                # Entries already carry stable IDs; streams resolve at play time
+                player.queue.extend(
+                    Track.from_info(entry) for entry in tracks if entry.get("id")
+                )
+                await discord_message(
+                    ctx, "Added the playlist to the queue... I THINK?!"
+                )
 
             else:
                 self.logger.error(
@@ -354,53 +449,140 @@ class MusicFeature(BotFeature):
                     "Your song search as real as your gf... Search a real song leh... 😕",
                 )
                 return
-            if self.is_processing_playlist:
-                track_info["searched"] = True
-                self.pending_playlist_tracks.extend(
-                    [
-                        track_info,
-                    ]
-                )
-            else:
-                self.queue.put(track_info)
+            player.queue.append(Track.from_info(track_info))
             await discord_message(ctx, f"Added to queue: {track_info['title']} 🎵")
 
         if not ctx.guild.voice_client.is_playing():
-            await self.play_next(ctx)
+            await self.play_next(ctx, player)
+        else:
+            self.prefetch(player)
+
+    async def play_next(self, ctx, player: GuildPlayer):
+        """Play the next track in the guild's queue.
+
+        The stream URL is resolved now rather than when the track was
+        queued, and the following tracks are prefetched while it plays.
+        Tracks that can no longer be resolved are skipped.
+        """
+        async with player.lock:
+            if player.closed:
+                # The session ended while the last track was finishing
+                return
+
+            voice_client = ctx.guild.voice_client
+            if voice_client and (voice_client.is_playing() or voice_client.is_paused()):
+                # Another caller already started the next track
+                return
 
-    async def play_next(self, ctx):
-        """Play the next track in queue."""
-        if self.loop and self.current_track:
-            self.queue.put(self.current_track)
+            if player.loop and player.current_track:
+                player.queue.append(player.current_track)
 
-        if self.queue.empty():
-            self.current_track = None
-            await discord_message(
-                ctx, "Queus is empty alreadyy, please add more to continues"
-            )
-            return
+            while True:
+                if not player.queue:
+                    player.current_track = None
+                    self.start_idle_timer(ctx, player)
+                    await discord_message(
+                        ctx, "Queus is empty alreadyy, please add more to continues"
+                    )
+                    return
 
-        self.current_track = self.queue.get()
-        self.logger.info(f"playing {self.current_track['title']}")
+                player.current_track = player.queue.pop()
+                self.logger.info(f"playing {player.current_track.title}")
+
+                voice_client = ctx.guild.voice_client
+                if not voice_client:
+                    return
+
+                started = time.perf_counter()
+                track = await self.resolve_stream(player.current_track)
+                if track:
+                    break
+                self.logger.error(f"Could not resolve {player.current_track.title}")
+                await discord_message(
+                    ctx, f"Cannot play {player.current_track.title}, skipping..."
+                )
+
+            if not self.start_playback(ctx, player, track, started):
+                # Only possible if something started playback without the lock
+                return
+            if self.audio_cache:
+                self.audio_cache.played(
+                    player.current_track.id,
+                    None if track.get("local") else track["url"],
+                    track.get("codec"),
+                )
+            self.prefetch(player)
+        await discord_message(
+            ctx, f"I shall sing: {player.current_track.title} nowzz 🎵"
+        )
 
+    async def resolve_stream(self, track: Track) -> Optional[dict]:
+        """Something to play for a queued track: its saved Opus file if the
+        audio cache has one, otherwise a live stream URL."""
+        if self.audio_cache:
+            path = self.audio_cache.lookup(track.id)
+            if path:
+                return {"url": path, "codec": "opus", "local": True}
+        return await self.search_music(track.webpage_url, True)
+
+    def start_playback(
+        self,
+        ctx,
+        player: GuildPlayer,
+        track: dict,
+        started: float,
+        position: float = 0.0,
+    ) -> bool:
+        """Start a stream on the voice client, timing its first frame.
+
+        The source is the cheapest one open_stream can build for the
+        track's codec and the player's volume. Returns False, starting
+        nothing, if the voice client is busy.
+        """
+        title = player.current_track.title
         voice_client = ctx.guild.voice_client
-        if not voice_client:
-            return
+        if voice_client.is_playing() or voice_client.is_paused():
+            self.logger.error(f"Not starting {title}: something is already playing")
+            return False
+
+        player.cancel_idle_timer()
 
-        audio = discord.PCMVolumeTransformer(
-            discord.FFmpegPCMAudio(self.current_track["url"], **self.ffmpeg_opts),
-            volume=self.volume,
+        # Reconnecting only applies to streams, not saved files
+        before_options = (
+            "" if track.get("local") else self.ffmpeg_opts["before_options"]
+        )
+        if position:
+            before_options += f" -ss {position:.2f}"
+
+        path, source = open_stream(
+            track["url"],
+            track.get("codec"),
+            player.volume,
+            before_options,
+            self.ffmpeg_opts["options"],
         )
 
+        def first_audio(seconds: float):
+            self.playback_stats.record(seconds)
+            self.logger.info(f"First audio for {title} after {seconds * 1000:.0f} ms")
+
+        def finished(audio_seconds: float, cpu_seconds: float):
+            self.playback_stats.record_stream(path, audio_seconds, cpu_seconds)
+            if audio_seconds:
+                self.logger.info(
+                    f"Played {audio_seconds:.0f}s of {title} ({path}) using "
+                    f"{cpu_seconds / audio_seconds * 100:.2f}% CPU"
+                )
+
+        audio = TimedAudio(source, started, first_audio, position, finished)
+
         def after_playing(error):
             if error:
                 self.logger.error(f"Error playing audio: {error}")
-            asyncio.run_coroutine_threadsafe(self.play_next(ctx), self.bot.loop)
+            asyncio.run_coroutine_threadsafe(self.play_next(ctx, player), self.bot.loop)
 
         voice_client.play(audio, after=after_playing)
-        await discord_message(
-            ctx, f"I shall sing: {self.current_track['title']} nowzz 🎵"
-        )
+        return True
 
     async def handle_pause_command(self, ctx):
         """Handle pausing/resuming playback."""
@@ -410,16 +592,19 @@ class MusicFeature(BotFeature):
             )
             return
 
+        player = self.player(ctx)
         voice_client = ctx.guild.voice_client
         if voice_client.is_playing():
             voice_client.pause()
+            self.start_idle_timer(ctx, player)
             await discord_message(ctx, "Paused! ⏸️")
         elif voice_client.is_paused():
             voice_client.resume()
+            player.cancel_idle_timer()
             await discord_message(ctx, "Resumed! ▶️")
         else:
-            if not self.queue.empty():
-                await self.play_next(ctx)
+            if player.queue:
+                await self.play_next(ctx, player)
 
             await discord_message(
                 ctx, "NOTHING IS EVEN BEING PLAYED! Are you stupid {ctx.author.id}?"
@@ -446,93 +631,117 @@ class MusicFeature(BotFeature):
             )
             return
 
-        # Clear queue and disconnect
-        while not self.queue.empty():
-            self.queue.get()
+        # Drop the guild's queue and state, then disconnect
+        player = self.players.get(ctx.guild.id)
+        if player:
+            self.close_player(player)
 
         await ctx.guild.voice_client.disconnect()
-        self.channel = None
-        self.current_track = None
         await discord_message(
             ctx, "Bye bye! gonna go get more sleepz than all of yall 👋"
         )
 
-    async def handle_queue_command(self, ctx):
-        if self.queue.empty():
+    async def handle_queue_command(self, ctx, page: int = 1):
+        """Show one page of the queue."""
+        player = self.player(ctx)
+        if not player.queue:
             await discord_message(ctx, "Queue is empty! Add some songs.")
             return
 
-        queue_list = list(self.queue.queue)
+        pages = player.queue.pages(self.QUEUE_PAGE_SIZE)
+        page = min(max(page, 1), pages)
         embed = discord.Embed(title="Current Queue 🎵", color=0x1DB954)
 
         # Add current track
-        if self.current_track and isinstance(self.current_track, dict):
-            try:
-                embed.add_field(
-                    name="Now Playing",
-                    value=f"🎵 {self.current_track.get('title', 'Unknown')} [{self.current_track.get('duration', '?')}]",
-                    inline=False,
-                )
-            except Exception as e:
-                self.logger.error(f"Error displaying current track: {e}")
-                embed.add_field(
-                    name="Now Playing",
-                    value="Error displaying current track",
-                    inline=False,
-                )
-
-        # Add queue
-        queue_text = ""
-        for i, track in enumerate(queue_list, 1):
-            try:
-                if isinstance(track, dict) and "title" in track and "duration" in track:
-                    queue_text += f"{i}. {track['title']} [{track['duration']}]\n"
-                else:
-                    queue_text += f"{i}. [Invalid track format]\n"
-                    self.logger.error(
-                        f"Invalid track format in queue position {i}: {type(track)}"
-                    )
-            except Exception as e:
-                queue_text += f"{i}. [Error displaying track]\n"
-                self.logger.error(f"Error displaying track at position {i}: {e}")
-
-            if i >= 10:  # Show only first 10 items
-                remaining = self.queue.qsize() - 10
-                if remaining > 0:
-                    queue_text += f"\n*...and {remaining} more tracks*"
-                break
+        current_track = player.current_track
+        if current_track:
+            embed.add_field(
+                name="Now Playing",
+                value=f"🎵 {current_track.title or 'Unknown'} [{current_track.duration or '?'}]",
+                inline=False,
+            )
 
-        if queue_text:
-            embed.add_field(name="Up Next", value=queue_text, inline=False)
+        # Add this page of the queue
+        first = (page - 1) * self.QUEUE_PAGE_SIZE + 1
+        queue_text = "".join(
+            f"{i}. {track.title} [{track.duration}] `#{track.entry_id}`\n"
+            for i, track in enumerate(
+                player.queue.page(page, self.QUEUE_PAGE_SIZE), first
+            )
+        )
+        remaining = len(player.queue) - (first - 1) - self.QUEUE_PAGE_SIZE
+        if remaining > 0:
+            queue_text += f"\n*...and {remaining} more tracks*"
+        embed.add_field(name="Up Next", value=queue_text, inline=False)
+        if pages > 1:
+            embed.set_footer(text=f"Page {page}/{pages}")
 
         await discord_embed(ctx, embed)
 
     async def handle_clear_command(self, ctx):
         """Clear the queue."""
-        while not self.queue.empty():
-            self.queue.get()
+        self.player(ctx).queue.clear()
         await discord_message(ctx, "Queue cleared! 🧹")
 
-    async def handle_remove_command(self, ctx, position: int):
-        """Remove a track from the queue."""
-        if position < 1 or position > self.queue.qsize():
+    def valid_position(self, player: GuildPlayer, position: int) -> bool:
+        return 1 <= position <= len(player.queue)
+
+    def find_entry(self, player: GuildPlayer, entry) -> Optional[int]:
+        """The 0-based position of a queue entry, or None if there is none.
+
+        ``entry`` is a 1-based queue number, or ``#ID`` for the entry ID
+        shown in the queue, which still finds the same track after skips
+        and removals have moved it.
+        """
+        entry = str(entry).strip()
+        try:
+            if entry.startswith("#"):
+                return player.queue.find(int(entry[1:]))
+            position = int(entry)
+        except ValueError:
+            return None
+        return position - 1 if self.valid_position(player, position) else None
+
+    async def handle_remove_command(self, ctx, entry):
+        """Remove a track from the queue by number or #ID."""
+        player = self.player(ctx)
+        position = self.find_entry(player, entry)
+        if position is None:
             await discord_message(
                 ctx,
                 "You dont even have that many songs queued bruhhhh! Please check the queue first.",
             )
             return
 
-        queue_list = list(self.queue.queue)
-        removed_track = queue_list.pop(position - 1)
-
-        self.queue = queue.Queue()
-        for track in queue_list:
-            self.queue.put(track)
-
+        removed_track = player.queue.remove(position)
         await discord_message(
-            ctx, f"Removed '{removed_track['title']}' from the queue! ❌"
+            ctx, f"Removed '{removed_track.title}' from the queue! ❌"
         )
 
+    async def handle_move_command(self, ctx, entry, target: int):
+        """Move a track, by number or #ID, to another position in the queue."""
+        player = self.player(ctx)
+        position = self.find_entry(player, entry)
+        if position is None or not self.valid_position(player, target):
+            await discord_message(
+                ctx,
+                "You dont even have that many songs queued bruhhhh! Please check the queue first.",
+            )
+            return
+
+        moved_track = player.queue.move(position, target - 1)
+        await discord_message(ctx, f"Moved '{moved_track.title}' to {target} ↕️")
+
+    async def handle_shuffle_command(self, ctx):
+        """Shuffle the queue."""
+        player = self.player(ctx)
+        if not player.queue:
+            await discord_message(ctx, "Queue is empty! Add some songs.")
+            return
+
+        player.queue.shuffle()
+        await discord_message(ctx, "Queue shuffled! 🔀")
+
     async def handle_volume_command(self, ctx, volume: int):
         """Set the volume."""
         if not 0 <= volume <= 100:
@@ -546,30 +755,37 @@ class MusicFeature(BotFeature):
             )
             return
 
-        self.volume = volume / 100
-        if ctx.guild.voice_client.source:
-            ctx.guild.voice_client.source.volume = self.volume
+        player = self.player(ctx)
+        previous, player.volume = player.volume, volume / 100
+        source = ctx.guild.voice_client.source
+        if isinstance(source, TimedAudio) and player.volume != previous:
+            if isinstance(source.original, discord.PCMVolumeTransformer):
+                source.original.volume = player.volume
+            elif not await self.restart_playback(ctx, player, keep_position=True):
+                await discord_message(ctx, "Volume changes from the next song 😕")
 
         await discord_message(ctx, f"Volume set to {volume}% 🔊")
 
     async def handle_loop_command(self, ctx):
         """Toggle loop mode."""
-        self.loop = not self.loop
-        status = "enabled" if self.loop else "disabled"
+        player = self.player(ctx)
+        player.loop = not player.loop
+        status = "enabled" if player.loop else "disabled"
         await discord_message(ctx, f"Loop mode {status} 🔁")
 
     async def handle_now_playing_command(self, ctx):
         """Show the currently playing track."""
-        if not self.current_track:
+        current_track = self.player(ctx).current_track
+        if not current_track:
             await discord_message(ctx, "Nothing is playing right now!")
             return
 
         embed = discord.Embed(
             title="Now Playing 🎵",
-            description=f"**{self.current_track['title']}**",
+            description=f"**{current_track.title}**",
             color=0x1DB954,
         )
-        embed.add_field(name="Duration", value=self.current_track["duration"])
+        embed.add_field(name="Duration", value=current_track.duration)
 
         await discord_message(ctx, embed=embed)
 
@@ -599,42 +815,70 @@ class MusicFeature(BotFeature):
 
     async def handle_replay_command(self, ctx):
         """Replay the current track."""
-        if not self.current_track:
+        player = self.player(ctx)
+        if not player.current_track:
             await discord_message(
                 ctx, "NOTHING IS EVEN BEING PLAYED! Are you DEAF {ctx.author.id}?"
             )
             return
 
-        voice_client = ctx.guild.voice_client
-        if not voice_client:
+        if not ctx.guild.voice_client:
             await discord_message(
                 ctx,
                 "I NOT EVEN IN CALL WITH YOU!!! gonna make me dunb like you if i am in the call frfr",
             )
             return
 
-        voice_client.stop()
-        audio = discord.PCMVolumeTransformer(
-            discord.FFmpegPCMAudio(self.current_track["url"], **self.ffmpeg_opts),
-            volume=self.volume,
-        )
-
-        def after_playing(error):
-            if error:
-                self.logger.error(f"Error playing audio: {error}")
-            asyncio.run_coroutine_threadsafe(self.play_next(ctx), self.bot.loop)
+        if not await self.restart_playback(ctx, player):
+            await discord_message(ctx, "Cannot replay this song anymore 😕")
+            return
+        await discord_message(ctx, f"🔄 Replaying: {player.current_track.title}")
+
+    async def restart_playback(
+        self, ctx, player: GuildPlayer, keep_position: bool = False
+    ) -> bool:
+        """Restart the current track from the start or where it is now.
+
+        Used to replay a track and to apply a new volume to Opus streams,
+        whose volume is fixed when ffmpeg starts. Returns False if the
+        track could not be resolved again or changed in the meantime.
+        """
+        track_playing = player.current_track
+        # Waits for a play_next that is still starting a track
+        async with player.lock:
+            if player.closed or player.current_track is not track_playing:
+                return False
+            started = time.perf_counter()
+            track = await self.resolve_stream(track_playing)
+            voice_client = ctx.guild.voice_client
+            if not track or not voice_client:
+                return False
+
+            source = voice_client.source
+            position = (
+                source.position
+                if keep_position and isinstance(source, TimedAudio)
+                else 0.0
+            )
+            paused = voice_client.is_paused()
 
-        voice_client.play(audio, after=after_playing)
-        await discord_message(ctx, f"🔄 Replaying: {self.current_track['title']}")
+            # The stopped stream's after-callback finds this one already
+            # playing, so the queue doesn't advance
+            voice_client.stop()
+            started_playing = self.start_playback(ctx, player, track, started, position)
+            if paused:
+                voice_client.pause()
+            return started_playing
 
     async def handle_lyrics_command(self, ctx, song_name: str = None):
         """Fetch and display lyrics."""
         await ctx.defer()
-        if not song_name and not self.current_track:
+        current_track = self.player(ctx).current_track
+        if not song_name and not current_track:
             await discord_message(ctx, "Either specify a song or play something first!")
             return
 
-        search_query = song_name if song_name else self.current_track["title"]
+        search_query = song_name if song_name else current_track.title
         search_query = re.sub(
             r"\(feat\..*?\)|\(ft\..*?\)|\(with.*?\)|\[.*?\]|\(.*?remix.*?\)",
             "",
@@ -85,18 +85,11 @@ class TrollFeature(BotFeature):
             return ctx.author.name
 
         try:
-            # Handle mention
-            if (
-                isinstance(user_id, str)
-                and user_id.startswith("<@")
-                and user_id.endswith(">")
-            ):
-                user_id = int(user_id.strip("<@!>"))
-
-            member = await ctx.guild.fetch_member(user_id)
-            return member.name
-        except (discord.NotFound, ValueError):
+            # Accepts IDs and mentions; served from the shared resolver's caches
+            user = await self.bot.user_resolver.resolve(user_id, ctx.guild)
+        except ValueError:
             return str(user_id)
+        return user.name if user else str(user_id)
 
     async def handle_wakey(self, ctx, user):
         self.ongoing_pings[user] = True
@@ -0,0 +1,174 @@
+"""Point the bot's config and databases at a throwaway directory.
+
+Config reads ./config/config.toml when it is imported, and the feature
+databases are created in the working directory, so this runs before any
+bot module is imported.
+"""
+
+import asyncio
+import atexit
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import discord
+import pytest
+import toml
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+_workdir = pathlib.Path(tempfile.mkdtemp(prefix="mist-bot-tests-"))
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+_config = toml.load(ROOT / "config" / "config.toml.template")
+_config["discord"]["counting_channels"] = ["counting"]
+_config.setdefault("genius", {"api": ""})
+(_workdir / "config").mkdir()
+with open(_workdir / "config" / "config.toml", "w") as f:
+    toml.dump(_config, f)
+_cwd = os.getcwd()
+os.chdir(_workdir)
+
+# Load it now, while ./config/config.toml is the one written above
+import config.config  # noqa: E402
+from utils.extractor import video_id  # noqa: E402
+
+# pytest resolves testpaths against the working directory it started in
+os.chdir(_cwd)
+
+
+@pytest.fixture(autouse=True)
+def isolated_workdir(tmp_path, monkeypatch):
+    """Give every test its own directory for databases and caches."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class FakeBot:
+    """Just enough of commands.Bot for features to register themselves."""
+
+    command_prefix = "#"
+
+    def __init__(self):
+        self.features = []
+        self.loop = None
+
+    def command(self, **kwargs):
+        return lambda f: f
+
+    def hybrid_command(self, **kwargs):
+        return lambda f: f
+
+    def listen(self, *args):
+        return lambda f: f
+
+    def event(self, f):
+        return f
+
+
+@pytest.fixture
+def bot():
+    return FakeBot()
+
+
+class FakeVoiceClient:
+    """A connected voice client that plays instantly and never sends audio."""
+
+    def __init__(self):
+        self.source = None
+        self.after = None
+        self.paused = False
+        self.played = []
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self.source is not None
+
+    def is_paused(self):
+        return self.paused
+
+    def play(self, source, after=None):
+        if self.source is not None:
+            raise RuntimeError("Already playing audio.")
+        self.source, self.after = source, after
+        self.played.append(source)
+
+    def stop(self):
+        source, after = self.source, self.after
+        self.source = self.after = None
+        self.paused = False
+        if source is not None:
+            source.cleanup()
+            if after is not None:
+                after(None)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    async def disconnect(self):
+        self.source = None
+
+
+class FakeContext:
+    """A command invoked in a guild where the bot is already in a call."""
+
+    def __init__(self, guild_id=1):
+        self.sent = []
+        self.guild = SimpleNamespace(id=guild_id, voice_client=FakeVoiceClient())
+        self.channel = SimpleNamespace(send=self.send)
+
+    async def send(self, message=None, embed=None):
+        self.sent.append(message or embed)
+
+    async def defer(self):
+        pass
+
+
+class FakeSource(discord.AudioSource):
+    """Stands in for the ffmpeg sources, which need an ffmpeg binary."""
+
+    def __init__(self, url, **options):
+        self.url = url
+        self.options = options
+
+    def read(self):
+        return b"\0" * 3840
+
+
+@pytest.fixture
+def music(bot, monkeypatch):
+    """A MusicFeature whose extractions are canned and counted.
+
+    ``music.extractions`` lists every target handed to yt-dlp.
+    """
+    from features.music import MusicFeature
+
+    monkeypatch.setattr(discord, "FFmpegOpusAudio", FakeSource)
+    monkeypatch.setattr(discord, "FFmpegPCMAudio", FakeSource)
+
+    feature = MusicFeature(bot)
+    feature.extractions = []
+
+    async def fetch_from_youtube(query, url, priority=0):
+        feature.extractions.append(query)
+        video = video_id(query) if url else query.replace(" ", "_")
+        await asyncio.sleep(0)
+        return {
+            "id": video,
+            "url": f"https://example.invalid/{video}?expire=9999999999",
+            "title": f"Title of {video}",
+            "duration": 200,
+            "codec": "opus",
+            "webpage_url": f"https://www.youtube.com/watch?v={video}",
+        }
+
+    feature.fetch_from_youtube = fetch_from_youtube
+    return feature
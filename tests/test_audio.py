@@ -0,0 +1,128 @@
+"""Playback path choice, TimedAudio's bookkeeping and PlaybackStats."""
+
+import discord
+import pytest
+
+from utils.audio import PlaybackStats, TimedAudio, open_stream
+
+BEFORE = "-reconnect 1"
+PCM_OPTIONS = "-vn -b:a 192k"
+
+
+class FakeFFmpeg(discord.AudioSource):
+    """Records how a source was opened instead of starting ffmpeg."""
+
+    opus = False
+
+    def __init__(self, url, **options):
+        self.url = url
+        self.options = options
+        self.frames = 3
+        self.cleaned_up = 0
+
+    def read(self):
+        if not self.frames:
+            return b""
+        self.frames -= 1
+        return b"\0" * 3840
+
+    def is_opus(self):
+        return self.opus
+
+    def cleanup(self):
+        self.cleaned_up += 1
+
+
+class FakeFFmpegOpus(FakeFFmpeg):
+    opus = True
+
+
+@pytest.fixture(autouse=True)
+def fake_ffmpeg(monkeypatch):
+    monkeypatch.setattr(discord, "FFmpegOpusAudio", FakeFFmpegOpus)
+    monkeypatch.setattr(discord, "FFmpegPCMAudio", FakeFFmpeg)
+
+
+@pytest.mark.parametrize(
+    "codec, volume, path, options",
+    [
+        ("opus", 1.0, "passthrough", {"codec": "copy", "options": "-vn"}),
+        ("opus", 0.5, "opus_filter", {"options": "-vn -af volume=0.50"}),
+        ("opus", 0.05, "opus_filter", {"options": "-vn -af volume=0.05"}),
+        ("mp4a.40.2", 1.0, "pcm", {"options": PCM_OPTIONS}),
+        (None, 0.5, "pcm", {"options": PCM_OPTIONS}),
+    ],
+)
+def test_open_stream_picks_the_path_for_codec_and_volume(codec, volume, path, options):
+    name, source = open_stream("https://stream", codec, volume, BEFORE, PCM_OPTIONS)
+
+    assert name == path
+    if path == "pcm":
+        # Volume stays adjustable in Python
+        assert isinstance(source, discord.PCMVolumeTransformer)
+        assert source.volume == volume
+        source = source.original
+        assert type(source) is FakeFFmpeg
+    else:
+        assert type(source) is FakeFFmpegOpus
+    assert source.url == "https://stream"
+    assert source.options == {"before_options": BEFORE, **options}
+
+
+def test_timed_audio_counts_frames_and_reports_once():
+    first_audio, finished = [], []
+    source = FakeFFmpegOpus("https://stream")
+    audio = TimedAudio(
+        source,
+        started=0.0,
+        on_first_audio=first_audio.append,
+        position=30.0,
+        on_finished=lambda seconds, cpu: finished.append((seconds, cpu)),
+    )
+
+    reads = [audio.read() for _ in range(5)]
+    audio.cleanup()
+    audio.cleanup()
+
+    assert audio.is_opus()
+    # The empty reads at the end are not frames
+    assert [bool(data) for data in reads] == [True, True, True, False, False]
+    assert audio.frames == 3
+    assert audio.position == pytest.approx(30.06)
+    assert len(first_audio) == 1 and first_audio[0] > 0
+    assert source.cleaned_up == 2
+    assert len(finished) == 1
+    seconds, cpu = finished[0]
+    assert seconds == pytest.approx(0.06)
+    assert cpu == audio.cpu and cpu >= 0
+
+
+def test_playback_stats_totals_first_audio_and_paths():
+    stats = PlaybackStats()
+    empty = stats.info()
+
+    for seconds in (0.2, 0.5, 0.1):
+        stats.record(seconds)
+    stats.record_stream("pcm", audio=100.0, cpu=2.0)
+    stats.record_stream("pcm", audio=50.0, cpu=1.0)
+    stats.record_stream("passthrough", audio=200.0, cpu=0.1)
+    stats.record_stream("opus_filter", audio=0.0, cpu=0.0)
+    info = stats.info()
+
+    assert empty == {
+        "tracks": 0,
+        "avg_first_audio_ms": 0.0,
+        "max_first_audio_ms": 0.0,
+        "last_first_audio_ms": None,
+    }
+    assert info["tracks"] == 3
+    assert info["avg_first_audio_ms"] == pytest.approx(800 / 3)
+    assert info["max_first_audio_ms"] == pytest.approx(500)
+    assert info["last_first_audio_ms"] == pytest.approx(100)
+    assert info["pcm_path"] == {
+        "streams": 2,
+        "audio_s": 150.0,
+        "cpu_percent": pytest.approx(2.0),
+    }
+    assert info["passthrough_path"]["cpu_percent"] == pytest.approx(0.05)
+    assert info["opus_filter_path"]["cpu_percent"] == 0.0
@@ -0,0 +1,158 @@
+"""AudioCache saves often played tracks, serves them and stays under its cap."""
+
+import asyncio
+import os
+
+import pytest
+
+from utils.cache import AudioCache, MusicCache
+
+URL = "https://example.invalid/stream?expire=9999999999"
+
+
+class FakeProcess:
+    """ffmpeg that writes ``size`` bytes to its output file."""
+
+    def __init__(self, args, size, returncode):
+        self.args = args
+        self.size = size
+        self.returncode = returncode
+
+    async def communicate(self):
+        # Plays recorded after a save must be later than it
+        await asyncio.sleep(0.01)
+        if self.returncode:
+            return b"", b"Server returned 403 Forbidden"
+        with open(self.args[-1], "wb") as f:
+            f.write(b"\0" * self.size)
+        return b"", b""
+
+    def kill(self):
+        pass
+
+    async def wait(self):
+        return self.returncode
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    """Replaces ffmpeg; set ``sizes`` per video ID or ``returncode``."""
+
+    class FFmpeg:
+        calls = []
+        sizes = {}
+        returncode = 0
+
+        @classmethod
+        async def exec(cls, *args, **kwargs):
+            cls.calls.append(args)
+            video_id = os.path.basename(args[-1]).split(".")[0]
+            return FakeProcess(args, cls.sizes.get(video_id, 1000), cls.returncode)
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", FFmpeg.exec)
+    return FFmpeg
+
+
+async def play(cache, video_id, codec="opus"):
+    """Play a video, streaming it unless it is saved, and let saves finish."""
+    path = cache.lookup(video_id)
+    cache.played(video_id, None if path else URL, codec)
+    await asyncio.gather(*cache.tasks)
+    return path
+
+
+def test_saved_after_enough_plays_then_served(isolated_workdir, ffmpeg):
+    async def run():
+        music_cache = MusicCache()
+        cache = AudioCache("audio", music_cache, min_plays=2)
+        try:
+            paths = [await play(cache, "a") for _ in range(3)]
+            await play(cache, "b", codec="webm")
+            await play(cache, "b", codec="webm")
+            return paths, cache.info()
+        finally:
+            await cache.close()
+            await music_cache.close()
+
+    paths, info = asyncio.run(run())
+
+    assert paths == [None, None, os.path.join("audio", "a.opus")]
+    # Saved once, not again when served from the file
+    assert len(ffmpeg.calls) == 2
+    opus, webm = ffmpeg.calls
+    assert opus[opus.index("-c:a") + 1] == "copy"
+    assert webm[webm.index("-c:a") + 1] == "libopus"
+    assert opus[opus.index("-i") + 1] == URL
+    assert sorted(os.listdir("audio")) == ["a.opus", "b.opus"]
+    assert info["hits"] == 1 and info["misses"] == 4
+    assert info["hit_rate"] == pytest.approx(0.2)
+    assert info["mb_saved"] == pytest.approx(1000 / 1024**2)
+    assert info["saved"] == 2 and info["saving"] == 0
+    assert info["size_mb"] == pytest.approx(2000 / 1024**2)
+
+
+def test_least_recently_played_files_are_evicted(isolated_workdir, ffmpeg):
+    async def run():
+        music_cache = MusicCache()
+        cache = AudioCache("audio", music_cache, max_bytes=2500, min_plays=1)
+        try:
+            await play(cache, "a")
+            await play(cache, "b")
+            # "a" is now played more recently than "b"
+            assert await play(cache, "a")
+            await play(cache, "c")
+            state = (cache.size, cache.evictions, music_cache.audio_files())
+
+            # A restart totals the store and drops files it doesn't know
+            open(os.path.join("audio", "stray.opus"), "wb").close()
+            open(os.path.join("audio", "d.opus.partial"), "wb").close()
+            restarted = AudioCache("audio", music_cache)
+            restarted._load()
+            return state, restarted.size
+        finally:
+            await cache.close()
+            await music_cache.close()
+
+    (size, evictions, files), restarted_size = asyncio.run(run())
+
+    assert size == 2000 and evictions == 1
+    assert [video_id for video_id, _ in files] == ["a", "c"]
+    assert sorted(os.listdir("audio")) == ["a.opus", "c.opus"]
+    assert restarted_size == 2000
+
+
+def test_files_deleted_from_outside_are_forgotten(isolated_workdir, ffmpeg):
+    ffmpeg.sizes = {"a": 700}
+
+    async def run():
+        music_cache = MusicCache()
+        cache = AudioCache("audio", music_cache, min_plays=1)
+        try:
+            await play(cache, "a")
+            os.remove(os.path.join("audio", "a.opus"))
+            return cache.lookup("a"), cache.size, music_cache.audio_file_size("a")
+        finally:
+            await cache.close()
+            await music_cache.close()
+
+    assert asyncio.run(run()) == (None, 0, None)
+
+
+def test_failed_save_leaves_nothing_behind(isolated_workdir, ffmpeg):
+    ffmpeg.returncode = 1
+
+    async def run():
+        music_cache = MusicCache()
+        cache = AudioCache("audio", music_cache, min_plays=1)
+        try:
+            await play(cache, "a")
+            return cache.info(), cache.contains("a")
+        finally:
+            await cache.close()
+            await music_cache.close()
+
+    info, contains = asyncio.run(run())
+
+    assert info["failures"] == 1 and info["saved"] == 0 and info["saving"] == 0
+    assert info["size_mb"] == 0 and not contains
+    assert os.listdir("audio") == []
@@ -0,0 +1,146 @@
+"""Flood process_count with interleaved messages and check exact results."""
+
+import asyncio
+import random
+import types
+from collections import Counter
+
+from features.counting import CountingFeature
+from utils.counter import CounterUtils
+
+GUILD_ID = 42
+
+
+class FakeMessage:
+    def __init__(self, message_id, content, user_id, guild, channel):
+        self.id = message_id
+        self.content = content
+        self.author = types.SimpleNamespace(
+            id=user_id, name=f"user{user_id}", bot=False, mention=f"<@{user_id}>"
+        )
+        self.guild = guild
+        self.channel = channel
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        # Discord round trips finish out of order
+        await asyncio.sleep(random.random() / 1000)
+        self.reactions.append(emoji)
+
+
+def make_messages(contents_and_users):
+    guild = types.SimpleNamespace(id=GUILD_ID)
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+
+    channel = types.SimpleNamespace(id=1, name="counting", send=send)
+    return [
+        FakeMessage(message_id, content, user_id, guild, channel)
+        for message_id, (content, user_id) in enumerate(contents_and_users, 1)
+    ]
+
+
+async def flood(feature, messages):
+    """Deliver every message concurrently, in a shuffled arrival order."""
+    arrivals = list(messages)
+    random.shuffle(arrivals)
+    await asyncio.gather(*(feature.process_count(m) for m in arrivals))
+    await asyncio.gather(*feature.feedback_tasks)
+
+
+def expected_outcome(contents_and_users):
+    """Apply the counting rules sequentially, in message order."""
+    expected, last_user = 1, None
+    counts, fails = Counter(), Counter()
+    for content, user_id in contents_and_users:
+        if int(content) != expected or user_id == last_user:
+            fails[user_id] += 1
+            expected = 1
+        else:
+            counts[user_id] += 1
+            expected = int(content) + 1
+        last_user = user_id
+    return expected, counts, fails
+
+
+async def run(bot, contents_and_users):
+    feature = CountingFeature(bot)
+    messages = make_messages(contents_and_users)
+    try:
+        await flood(feature, messages)
+        state = await feature.counter.get_state(str(GUILD_ID))
+        stats = {
+            user_id: await feature.counter.get_user_stats(str(GUILD_ID), str(user_id))
+            for user_id in {user_id for _, user_id in contents_and_users}
+        }
+    finally:
+        await feature.teardown()
+    return state, stats, messages
+
+
+def test_flood_of_valid_counts_is_exact(bot):
+    random.seed(3)
+    total = 3000
+    # Seven users taking turns never count twice in a row
+    contents_and_users = [(str(i), i % 7) for i in range(1, total + 1)]
+
+    state, stats, messages = asyncio.run(run(bot, contents_and_users))
+
+    assert state.count == total + 1
+    assert state.counts == total
+    assert state.fails == 0
+    assert state.high_score == total
+    for user_id, user_stats in stats.items():
+        assert user_stats["total_counts"] == sum(
+            1 for _, u in contents_and_users if u == user_id
+        )
+        assert user_stats["total_fails"] == 0
+    assert all(message.reactions for message in messages)
+    assert not any("❌" in message.reactions for message in messages)
+
+
+def test_interleaved_mistakes_match_sequential_rules(bot):
+    random.seed(4)
+    contents_and_users = []
+    expected, last_user = 1, None
+    for _ in range(2000):
+        user_id = random.randrange(5)
+        content = expected if random.random() > 0.05 else expected + 7
+        contents_and_users.append((str(content), user_id))
+        # Track what the bot should expect next to keep most counts valid
+        if content != expected or user_id == last_user:
+            expected = 1
+        else:
+            expected += 1
+        last_user = user_id
+
+    next_count, counts, fails = expected_outcome(contents_and_users)
+    state, stats, _ = asyncio.run(run(bot, contents_and_users))
+
+    assert state.count == next_count
+    assert state.counts == sum(counts.values())
+    assert state.fails == sum(fails.values())
+    for user_id, user_stats in stats.items():
+        assert user_stats["total_counts"] == counts[user_id]
+        assert user_stats["total_fails"] == fails[user_id]
+
+
+def test_stats_survive_a_restart(bot):
+    random.seed(5)
+    contents_and_users = [(str(i), i % 3) for i in range(1, 501)]
+    asyncio.run(run(bot, contents_and_users))
+
+    async def reload():
+        counter = CounterUtils()
+        try:
+            state = await counter.get_state(str(GUILD_ID))
+            stats = await counter.get_user_stats(str(GUILD_ID), "1")
+        finally:
+            counter.close()
+        return state, stats
+
+    state, stats = asyncio.run(reload())
+    assert state.count == 501
+    assert stats["total_counts"] == sum(1 for _, u in contents_and_users if u == 1)
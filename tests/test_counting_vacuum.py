@@ -0,0 +1,44 @@
+"""Startup never rewrites counting.db; idle maintenance does it once."""
+
+import asyncio
+import sqlite3
+
+from utils.counter import CounterUtils
+
+
+def auto_vacuum(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+
+def test_old_database_is_converted_by_maintenance_not_startup(isolated_workdir):
+    path = str(isolated_workdir / "counting.db")
+    # A database created before incremental auto-vacuum, with free pages
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE filler (data BLOB)")
+        db.executemany(
+            "INSERT INTO filler VALUES (?)", [(b"x" * 1000,) for _ in range(500)]
+        )
+        db.execute("DELETE FROM filler")
+    counter = CounterUtils(path)
+    counter.close()
+    assert auto_vacuum(path) == 0
+
+    counter = CounterUtils(path)
+    try:
+        first = asyncio.run(counter.db.enable_incremental_vacuum())
+        again = asyncio.run(counter.db.enable_incremental_vacuum())
+    finally:
+        counter.close()
+    assert auto_vacuum(path) == 2
+    assert first is not None and again is None
+
+
+def test_new_database_starts_with_incremental_vacuum(isolated_workdir):
+    path = str(isolated_workdir / "counting.db")
+    counter = CounterUtils(path)
+    try:
+        assert asyncio.run(counter.db.enable_incremental_vacuum()) is None
+    finally:
+        counter.close()
+    assert auto_vacuum(path) == 2
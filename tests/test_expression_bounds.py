@@ -0,0 +1,37 @@
+"""Static cost bounds must reject runaway ints but keep ordinary counts."""
+
+import pytest
+
+from utils.counter import ExpressionEvaluator
+
+
+@pytest.fixture(scope="module")
+def evaluator():
+    return ExpressionEvaluator()
+
+
+@pytest.mark.parametrize(
+    "expression, value",
+    [
+        ("2**ceil(pi)", 16),
+        ("factorial(floor(4.7))", 24),
+        ("10**floor(e)", 100),
+        ("2**ceil(log2(1000))", 1024),
+        ("floor(sqrt(10))**floor(pi)", 27),
+        ("comb(ceil(10.2), 3)", 165),
+        ("2**abs(-3)", 8),
+        ("abs(-2.5)*2", 5),
+    ],
+)
+def test_integer_results_of_float_functions_are_bounded(evaluator, expression, value):
+    result = evaluator.evaluate(expression)
+    assert result is not None
+    assert result.value == value
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["9**9**9", "2**ceil(1e300)", "factorial(ceil(1e6+0.5))", "ceil(inf)"],
+)
+def test_oversized_expressions_are_rejected(evaluator, expression):
+    assert evaluator.evaluate(expression) is None
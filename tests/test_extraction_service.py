@@ -0,0 +1,47 @@
+"""A dead extraction worker must cost one fresh pool, not one per dispatcher."""
+
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from utils.extractor import ExtractionError, ExtractionService
+
+
+def test_broken_pool_is_replaced_once():
+    service = ExtractionService({"search": {"quiet": True}}, processes=True)
+    started = []
+    new_executor = service._new_executor
+
+    def counting_new_executor():
+        started.append(new_executor())
+        return started[-1]
+
+    service._new_executor = counting_new_executor
+
+    async def run():
+        service._start()
+        broken = service._executor
+        loop = asyncio.get_running_loop()
+        # As if the workers had been killed for running out of memory, while
+        # every dispatcher is waiting on the pool
+        crashes = [
+            loop.run_in_executor(broken, os._exit, 1) for _ in range(service.workers)
+        ]
+        results = await asyncio.gather(
+            *(service.extract("search", "") for _ in range(service.workers)),
+            return_exceptions=True,
+        )
+        await asyncio.gather(*crashes, return_exceptions=True)
+        assert all(isinstance(result, BrokenProcessPool) for result in results)
+        assert service._executor is not broken
+        # The fresh pool works
+        with pytest.raises(ExtractionError):
+            await service.extract("search", "")
+
+    try:
+        asyncio.run(run())
+    finally:
+        asyncio.run(service.close())
+    assert len(started) == 2
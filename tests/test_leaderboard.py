@@ -0,0 +1,47 @@
+"""The in-memory top entries and the SQL fallback must rank identically."""
+
+import asyncio
+import random
+
+from utils.counter import CounterUtils, GuildCountState
+
+GUILD_ID = "7"
+
+
+def test_memory_and_sql_leaderboards_agree():
+    random.seed(11)
+    # Few distinct scores, so ties abound, plus users with nothing yet
+    rows = [
+        (str(user_id), GUILD_ID, random.choice([0, 0, 1, 2, 3, 5]), random.randrange(3))
+        for user_id in range(1000, 1060)
+    ]
+
+    async def run():
+        counter = CounterUtils()
+        try:
+            await counter.db.write(
+                lambda db: db.executemany(
+                    "INSERT INTO mathematicians (ID, serverID, counts, fails)"
+                    " VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+            )
+            state = await counter.get_state(GUILD_ID)
+            # Live updates that create new ties at the bottom of the board
+            for user_id in ("1003", "1041", "1059", "2000"):
+                counter.apply_count(state, state.count, user_id)
+
+            size = GuildCountState.LEADERBOARD_SIZE
+            boards = {}
+            for category in ("counts", "fails", "primes"):
+                memory = await counter.get_leaderboard(GUILD_ID, category, size)
+                sql = await counter.get_leaderboard(GUILD_ID, category, size + 1)
+                boards[category] = memory, sql[:size]
+            return boards
+        finally:
+            counter.close()
+
+    for category, (memory, sql) in asyncio.run(run()).items():
+        assert memory == [tuple(entry) for entry in sql], category
+        assert all(score > 0 for score, _ in memory)
+        assert memory == sorted(memory, key=lambda entry: (-entry[0], entry[1]))
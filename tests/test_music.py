@@ -0,0 +1,255 @@
+"""Music commands against a fake voice client and canned extractions."""
+
+import asyncio
+import statistics
+import time
+
+from tests.conftest import FakeContext
+
+
+def test_text_search_is_extracted_once(music):
+    async def run():
+        music.bot.loop = asyncio.get_running_loop()
+        ctx = FakeContext()
+        try:
+            await music.handle_play_command(ctx, "never gonna")
+            await music.handle_play_command(ctx, "never gonna")
+            # The first track finishes and the second one starts
+            ctx.guild.voice_client.stop()
+            await asyncio.sleep(0.01)
+        finally:
+            await music.teardown()
+        return ctx
+
+    ctx = asyncio.run(run())
+    assert music.extractions == ["never gonna"]
+    assert [audio.original.url for audio in ctx.guild.voice_client.played] == [
+        "https://example.invalid/never_gonna?expire=9999999999"
+    ] * 2
+
+
+def test_guilds_keep_separate_players(music):
+    guilds = range(1, 6)
+
+    async def session(ctx):
+        guild = ctx.guild.id
+        for song in range(3):
+            await music.handle_play_command(ctx, f"guild {guild} song {song}")
+        if guild % 2:
+            await music.handle_loop_command(ctx)
+        await music.handle_volume_command(ctx, 10 * guild)
+        await music.handle_remove_command(ctx, 1)
+
+    async def run():
+        music.bot.loop = asyncio.get_running_loop()
+        contexts = {guild: FakeContext(guild) for guild in guilds}
+        try:
+            await asyncio.gather(*(session(ctx) for ctx in contexts.values()))
+            players = dict(music.players)
+            states = {
+                guild: (
+                    player.current_track.title,
+                    [track.title for track in player.queue],
+                    player.volume,
+                    player.loop,
+                )
+                for guild, player in players.items()
+            }
+            # Ending one guild's session leaves the others playing
+            await music.handle_quit_command(contexts[1])
+            remaining = sorted(music.players)
+            playing = [
+                contexts[guild].guild.voice_client.is_playing() for guild in remaining
+            ]
+            closed = [guild for guild, player in players.items() if player.closed]
+        finally:
+            await music.teardown()
+        return players, states, remaining, playing, closed
+
+    players, states, remaining, playing, closed = asyncio.run(run())
+    assert sorted(players) == list(guilds)
+    assert len({id(player.queue) for player in players.values()}) == len(guilds)
+    for guild in guilds:
+        assert states[guild] == (
+            f"Title of guild_{guild}_song_0",
+            [f"Title of guild_{guild}_song_2"],
+            guild / 10,
+            bool(guild % 2),
+        )
+    assert remaining == [2, 3, 4, 5]
+    assert all(playing)
+    assert closed == [1]
+
+
+def test_replay_waits_for_the_next_track_to_start(music):
+    async def run():
+        music.bot.loop = asyncio.get_running_loop()
+        ctx = FakeContext()
+        voice_client = ctx.guild.voice_client
+        try:
+            await music.handle_play_command(ctx, "first song")
+            await music.handle_play_command(ctx, "second song")
+            resolve_stream = music.resolve_stream
+            delays = [0.02]
+
+            async def slow_resolve_stream(track):
+                # Only the first resolution, the next track's, is slow
+                await asyncio.sleep(delays.pop() if delays else 0)
+                return await resolve_stream(track)
+
+            music.resolve_stream = slow_resolve_stream
+            # The first song ends; /replay comes in while the next one resolves
+            voice_client.stop()
+            await asyncio.sleep(0.001)
+            await music.handle_replay_command(ctx)
+            await asyncio.sleep(0.05)
+        finally:
+            await music.teardown()
+        return [audio.original.url for audio in voice_client.played]
+
+    played = asyncio.run(run())
+    assert [url.split("?")[0] for url in played] == [
+        "https://example.invalid/first_song",
+        "https://example.invalid/second_song",
+        "https://example.invalid/second_song",
+    ]
+
+
+def test_remove_by_entry_id_survives_a_skip(music):
+    async def run():
+        music.bot.loop = asyncio.get_running_loop()
+        ctx = FakeContext()
+        try:
+            for song in range(4):
+                await music.handle_play_command(ctx, f"song {song}")
+            player = music.players[ctx.guild.id]
+            # "song 2" is shown second in the queue; someone skips before
+            # the /remove for it arrives, so its queue number changes
+            entry_id = player.queue[1].entry_id
+            ctx.guild.voice_client.stop()
+            await asyncio.sleep(0.01)
+            await music.handle_remove_command(ctx, f"#{entry_id}")
+            await music.handle_move_command(ctx, "#999", 1)
+            return [track.title for track in player.queue], ctx.sent[-2:]
+        finally:
+            await music.teardown()
+
+    queue, sent = asyncio.run(run())
+    assert queue == ["Title of song_3"]
+    assert sent[0] == "Removed 'Title of song_2' from the queue! ❌"
+    assert sent[1].startswith("You dont even have")
+
+
+def test_dozens_of_guilds_under_load(music):
+    """Every guild's commands stay fast while the others play and skip."""
+    guilds = range(1, 49)
+    latencies = {guild: [] for guild in guilds}
+
+    async def timed(guild, command, *args):
+        start = time.perf_counter()
+        await command(*args)
+        latencies[guild].append(time.perf_counter() - start)
+
+    async def session(ctx):
+        guild = ctx.guild.id
+        for song in range(5):
+            await timed(guild, music.handle_play_command, ctx, f"g{guild} s{song}")
+            await asyncio.sleep(0)
+        for _ in range(2):
+            await timed(guild, music.handle_queue_command, ctx)
+            await timed(guild, music.handle_skip_command, ctx)
+            # Lets the skipped track's play_next run, as the voice thread would
+            await asyncio.sleep(0.001)
+        await timed(guild, music.handle_queue_command, ctx, 2)
+
+    async def run():
+        music.bot.loop = asyncio.get_running_loop()
+        contexts = [FakeContext(guild) for guild in guilds]
+        try:
+            await asyncio.gather(*(session(ctx) for ctx in contexts))
+            await asyncio.sleep(0.05)
+            return {
+                ctx.guild.id: (
+                    music.players[ctx.guild.id].current_track.title,
+                    [track.title for track in music.players[ctx.guild.id].queue],
+                    [audio.original.url for audio in ctx.guild.voice_client.played],
+                )
+                for ctx in contexts
+            }
+        finally:
+            await music.teardown()
+
+    states = asyncio.run(run())
+    for guild in guilds:
+        current, queue, played = states[guild]
+        assert current == f"Title of g{guild}_s2"
+        assert queue == [f"Title of g{guild}_s3", f"Title of g{guild}_s4"]
+        assert all(f"/g{guild}_s" in url for url in played)
+
+    per_guild = sorted(statistics.median(times) for times in latencies.values())
+    worst = max(max(times) for times in latencies.values())
+    print(
+        f"{len(guilds)} guilds: median command latency per guild"
+        f" {per_guild[0] * 1000:.2f}-{per_guild[-1] * 1000:.2f} ms,"
+        f" worst {worst * 1000:.2f} ms"
+    )
+    # Generous; a guild waiting on another guild's work would blow through it
+    assert per_guild[-1] < 0.25
+    assert worst < 1.0
+
+
+def test_playlist_plays_at_once_and_resolves_only_a_few_ahead(music):
+    ahead = music.config.MUSIC_PREFETCH_TRACKS
+    entries = [
+        {
+            "id": f"track{number:02d}",
+            "title": f"Track {number}",
+            "duration": 200,
+            "webpage_url": f"https://www.youtube.com/watch?v=track{number:02d}",
+        }
+        for number in range(40)
+    ]
+
+    async def search_playlist(url):
+        return entries
+
+    music.search_playlist = search_playlist
+
+    async def run():
+        music.bot.loop = asyncio.get_running_loop()
+        ctx = FakeContext()
+        try:
+            await music.handle_play_command(
+                ctx, "https://www.youtube.com/playlist?list=PL1"
+            )
+            player = music.players[ctx.guild.id]
+            # Only the first track had to resolve before it played
+            first = list(music.extractions)
+            queued = len(player.queue)
+            await asyncio.gather(*player.prefetches)
+            prefetched = list(music.extractions)
+
+            # A song added while the playlist plays goes after it
+            await music.handle_play_command(ctx, "interlude")
+            ctx.guild.voice_client.stop()
+            await asyncio.sleep(0.01)
+            await asyncio.gather(*player.prefetches)
+            titles = [track.title for track in player.queue]
+        finally:
+            await music.teardown()
+        return ctx, first, queued, prefetched, titles
+
+    ctx, first, queued, prefetched, titles = asyncio.run(run())
+
+    urls = [entry["webpage_url"] for entry in entries]
+    assert first == urls[:1]
+    assert queued == 39
+    assert prefetched == urls[: 1 + ahead]
+    # The second track played from its prefetched stream; only the track
+    # that came into the window was extracted
+    assert music.extractions == prefetched + ["interlude"] + urls[1 + ahead : 2 + ahead]
+    assert [audio.original.url for audio in ctx.guild.voice_client.played] == [
+        "https://example.invalid/track00?expire=9999999999",
+        "https://example.invalid/track01?expire=9999999999",
+    ]
+    assert titles == [entry["title"] for entry in entries[2:]] + ["Title of interlude"]
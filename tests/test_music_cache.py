@@ -0,0 +1,108 @@
+"""MusicCache buffers its writes but must read them back and persist them."""
+
+import asyncio
+import json
+
+from utils.cache import MusicCache
+
+TRACK = {
+    "id": "dQw4w9WgXcQ",
+    "title": "Never Gonna Give You Up",
+    "duration": 213,
+    "webpage_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "url": "https://example.invalid/stream?expire=9999999999",
+    "codec": "opus",
+}
+
+
+def test_buffered_writes_are_visible_and_persisted():
+    async def write():
+        cache = MusicCache()
+        cache.update("never gonna", TRACK)
+        for _ in range(3):
+            plays, size = cache.record_play(TRACK["id"])
+        cache.set_audio_file(TRACK["id"], 1234)
+
+        # Nothing is committed yet, but reads see the buffered changes
+        rows = cache.db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+        status, entry = cache.lookup("Never Gonna")
+        result = (rows, status, entry["title"], plays, size)
+        result += (cache.audio_file_size(TRACK["id"]), cache.audio_files())
+        await cache.close()
+        return result
+
+    rows, status, title, plays, size, file_size, files = asyncio.run(write())
+    assert rows == 0
+    assert (status, title) == (MusicCache.HIT, TRACK["title"])
+    assert (plays, size) == (3, None)
+    assert file_size == 1234
+    assert files == [(TRACK["id"], 1234)]
+
+    async def reopen():
+        cache = MusicCache()
+        try:
+            return (
+                cache.lookup("never gonna"),
+                cache.record_play(TRACK["id"]),
+                cache.audio_files(),
+            )
+        finally:
+            await cache.close()
+
+    (status, entry), play, files = asyncio.run(reopen())
+    # Stream URLs are only kept in memory
+    assert status == MusicCache.STALE
+    assert entry["webpage_url"] == TRACK["webpage_url"]
+    assert play == (4, 1234)
+    assert files == [(TRACK["id"], 1234)]
+
+
+def test_legacy_entries_are_imported_as_stale(isolated_workdir):
+    legacy = {
+        # The JSON cache never stored a video ID, and lowercased its keys
+        "https://www.youtube.com/watch?v=dqw4w9wgxcq": {
+            "url": "https://example.invalid/a",
+            "title": "Never Gonna Give You Up",
+            "duration": 213,
+            "cached_at": "2024-01-01T00:00:00",
+        },
+        "some search words": {
+            "url": "https://example.invalid/b",
+            "title": "Unknown",
+            "duration": 100,
+            "cached_at": "2024-01-02T00:00:00",
+        },
+        "with a page url": {
+            "title": "Gangnam Style",
+            "duration": 252,
+            "webpage_url": "https://www.youtube.com/watch?v=9bZkp7q19f0",
+            "cached_at": "2024-01-03T00:00:00",
+        },
+    }
+    (isolated_workdir / "music_cache.json").write_text(json.dumps(legacy))
+
+    async def run():
+        cache = MusicCache()
+        try:
+            return [
+                cache.lookup(query)
+                for query in (
+                    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                    "Some search words",
+                    "with a page url",
+                )
+            ]
+        finally:
+            await cache.close()
+
+    lookups = asyncio.run(run())
+    assert [status for status, _ in lookups] == [MusicCache.STALE] * 3
+    url, search, page = (entry for _, entry in lookups)
+    assert (url["id"], url["webpage_url"], url["title"]) == (
+        "",
+        None,
+        "Never Gonna Give You Up",
+    )
+    assert search["id"] == ""
+    assert page["id"] == "9bZkp7q19f0"
+    assert (isolated_workdir / "music_cache.json.imported").exists()
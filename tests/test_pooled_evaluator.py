@@ -0,0 +1,105 @@
+"""Pooled counting evaluation: recycling, deadlines and what reaches a worker."""
+
+import asyncio
+import os
+import time
+
+from features.counting import CountingFeature
+from utils.counter import ExpressionEvaluator, PooledEvaluator
+
+
+def test_recycle_resubmits_other_evaluations():
+    evaluator = PooledEvaluator(workers=2, timeout=5)
+
+    async def run():
+        await evaluator.warm()
+        pool = evaluator._pool
+        tasks = [
+            asyncio.create_task(evaluator.evaluate(f"{n} * 2")) for n in range(1, 41)
+        ]
+        await asyncio.sleep(0)
+        # As if one of them had missed its deadline
+        evaluator._recycle(pool)
+        evaluator._recycle(pool)
+        return await asyncio.gather(*tasks)
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        evaluator.close()
+
+    assert [result.value for result in results] == [n * 2 for n in range(1, 41)]
+    assert evaluator.recycles == 1
+
+
+def test_missed_deadline_returns_none():
+    evaluator = PooledEvaluator(workers=1, timeout=0.000001)
+    try:
+        assert asyncio.run(evaluator.evaluate("1 + 1")) is None
+    finally:
+        evaluator.close()
+    assert evaluator.recycles == 1
+
+
+def test_recycle_stops_the_workers():
+    evaluator = PooledEvaluator(workers=1, timeout=5)
+
+    async def run():
+        await evaluator.warm()
+        pids = evaluator._worker_pids()
+        for pid in pids:
+            evaluator._pids.put(pid)
+        evaluator._recycle(evaluator._pool)
+        return pids
+
+    try:
+        pids = asyncio.run(run())
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(alive(pid) for pid in pids):
+            time.sleep(0.01)
+    finally:
+        evaluator.close()
+
+    assert len(pids) == 1
+    assert not any(alive(pid) for pid in pids)
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+class RecordingEvaluator:
+    def __init__(self):
+        self.submitted = []
+
+    async def evaluate(self, expression):
+        self.submitted.append(expression)
+        return ExpressionEvaluator().evaluate(expression)
+
+    def close(self):
+        pass
+
+
+def test_pool_mode_only_sends_new_expressions_to_workers(bot):
+    async def run():
+        feature = CountingFeature(bot)
+        feature.evaluator = RecordingEvaluator()
+        try:
+            return [
+                await feature.evaluate(text)
+                for text in ["12", "hello there", "3 * 4", "3  *  4", "3 +", "3 +"]
+            ], feature.evaluator.submitted
+        finally:
+            await feature.teardown()
+
+    results, submitted = asyncio.run(run())
+
+    assert [result and result.value for result in results] == [
+        12, None, 12, 12, None, None,
+    ]  # fmt: skip
+    # A None may be a missed deadline, so invalid text is not remembered
+    assert submitted == ["3 * 4", "3 +", "3 +"]
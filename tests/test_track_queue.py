@@ -0,0 +1,22 @@
+"""TrackQueue entry IDs stay with their track while the queue changes."""
+
+from utils.player import Track, TrackQueue
+
+
+def test_entry_ids_follow_their_tracks():
+    queue = TrackQueue(Track(f"v{n}", f"song {n}") for n in range(5))
+    ids = {track.title: track.entry_id for track in queue}
+    assert sorted(ids.values()) == [1, 2, 3, 4, 5]
+
+    queue.pop()
+    queue.move(3, 0)
+    queue.remove(1)
+    queue.shuffle()
+    for track in queue:
+        assert queue[queue.find(ids[track.title])] is track
+    assert queue.find(ids["song 0"]) is None
+    assert queue.find(ids["song 1"]) is None
+
+    # Re-queued tracks get a new entry
+    looped = queue.append(Track("v0", "song 0"))
+    assert looped.entry_id == 6
@@ -0,0 +1,151 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import threading
+import time
+import discord
+
+
+class PlaybackStats:
+    """Time-to-first-audio across tracks, from picking a track to the
+    voice client reading its first frame, and player-thread CPU per
+    playback path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tracks = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.last: Optional[float] = None
+        # path -> [streams, seconds of audio, CPU seconds]
+        self.paths: Dict[str, list] = {}
+
+    def record(self, seconds: float) -> None:
+        # Called from the voice client's player thread
+        with self._lock:
+            self.tracks += 1
+            self.total += seconds
+            self.worst = max(self.worst, seconds)
+            self.last = seconds
+
+    def record_stream(self, path: str, audio: float, cpu: float) -> None:
+        """Count a finished stream's audio and the CPU spent sending it."""
+        with self._lock:
+            totals = self.paths.setdefault(path, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += audio
+            totals[2] += cpu
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tracks": self.tracks,
+                "avg_first_audio_ms": (
+                    self.total / self.tracks * 1000 if self.tracks else 0.0
+                ),
+                "max_first_audio_ms": self.worst * 1000,
+                "last_first_audio_ms": (
+                    self.last * 1000 if self.last is not None else None
+                ),
+                **{
+                    f"{path}_path": {
+                        "streams": streams,
+                        "audio_s": audio,
+                        # Share of one core while a stream of this path plays
+                        "cpu_percent": cpu / audio * 100 if audio else 0.0,
+                    }
+                    for path, (streams, audio, cpu) in self.paths.items()
+                },
+            }
+
+
+class TimedAudio(discord.AudioSource):
+    """Wraps an audio source to time it and track the playback position.
+
+    ``started`` is when the track was chosen, so the delay reported to
+    ``on_first_audio`` covers stream URL resolution, ffmpeg start-up and
+    the first read. Every read is one 20 ms frame, so counting them gives
+    the position in the track, starting from ``position``.
+
+    The voice client's player thread reads, Opus-encodes (unless the
+    source already is Opus) and sends each frame before the next read,
+    so the thread CPU time between reads is what the stream costs this
+    process. ``on_finished`` gets the seconds played and that CPU time.
+    """
+
+    FRAME = discord.opus.Encoder.FRAME_LENGTH / 1000
+
+    def __init__(
+        self,
+        original: discord.AudioSource,
+        started: float,
+        on_first_audio: Callable[[float], None],
+        position: float = 0.0,
+        on_finished: Optional[Callable[[float, float], None]] = None,
+    ):
+        self.original = original
+        self.started = started
+        self.on_first_audio: Optional[Callable[[float], None]] = on_first_audio
+        self.on_finished = on_finished
+        self.start_position = position
+        self.frames = 0
+        self.cpu = 0.0
+        self._last_cpu: Optional[float] = None
+
+    @property
+    def position(self) -> float:
+        """Seconds into the track of the last frame read."""
+        return self.start_position + self.frames * self.FRAME
+
+    def read(self) -> bytes:
+        now = time.thread_time()
+        if self._last_cpu is not None:
+            self.cpu += now - self._last_cpu
+        self._last_cpu = now
+
+        data = self.original.read()
+        if data:
+            self.frames += 1
+        if self.on_first_audio is not None:
+            callback, self.on_first_audio = self.on_first_audio, None
+            callback(time.perf_counter() - self.started)
+        return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self) -> None:
+        self.original.cleanup()
+        if self.on_finished is not None:
+            callback, self.on_finished = self.on_finished, None
+            callback(self.frames * self.FRAME, self.cpu)
+
+
+def open_stream(
+    url: str,
+    codec: Optional[str],
+    volume: float,
+    before_options: str,
+    pcm_options: str,
+) -> Tuple[str, discord.AudioSource]:
+    """The cheapest source for a stream, and the name of its path.
+
+    Opus streams are handed to Discord as they are when the volume is
+    100% ("passthrough"), and otherwise get their volume from an ffmpeg
+    filter ("opus_filter"), so no audio passes through Python. Other
+    codecs are decoded to PCM and scaled by PCMVolumeTransformer ("pcm"),
+    which can change volume live. The filter path costs ffmpeg more CPU
+    in total than the PCM path, but none of it holds the bot's GIL.
+    """
+    if codec == "opus":
+        if volume == 1.0:
+            return "passthrough", discord.FFmpegOpusAudio(
+                url, codec="copy", before_options=before_options, options="-vn"
+            )
+        return "opus_filter", discord.FFmpegOpusAudio(
+            url,
+            before_options=before_options,
+            options=f"-vn -af volume={volume:.2f}",
+        )
+    return "pcm", discord.PCMVolumeTransformer(
+        discord.FFmpegPCMAudio(url, before_options=before_options, options=pcm_options),
+        volume=volume,
+    )
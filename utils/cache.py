@@ -1,46 +1,240 @@
+import asyncio
 import json
 import os
+import re
+import sqlite3
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+from utils.extractor import video_id
 from utils.logger import Logger
 import logging
 
 
+class CacheWrites:
+    """Changes to the MusicCache store that have not been committed yet."""
+
+    __slots__ = ("tracks", "touches", "plays", "files")
+
+    def __init__(self):
+        # query -> metadata with cached_at
+        self.tracks: Dict[str, dict] = {}
+        # query -> last used
+        self.touches: Dict[str, float] = {}
+        # video ID -> [plays to add, last played]
+        self.plays: Dict[str, List[float]] = {}
+        # video ID -> (audio file size or None if deleted, when recorded)
+        self.files: Dict[str, Tuple[Optional[int], float]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.tracks or self.touches or self.plays or self.files)
+
+    def merge(self, newer: "CacheWrites") -> None:
+        """Fold changes made after these into them."""
+        self.tracks.update(newer.tracks)
+        self.touches.update(newer.touches)
+        for video_id, (plays, last_played) in newer.plays.items():
+            pending = self.plays.setdefault(video_id, [0, last_played])
+            pending[0] += plays
+            pending[1] = last_played
+        self.files.update(newer.files)
+
+
 class MusicCache:
-    def __init__(self, cache_file: str = "music_cache.json"):
+    """Query to track cache that keeps metadata apart from stream URLs.
+
+    Video ID, title, duration and page URL never change and are persisted
+    in SQLite, one row per query, so an update writes a single row. The
+    store is bounded by entry count and bytes with least-recently-used
+    eviction, and triggers keep its totals current so stats never scan.
+    Stream URLs embed an ``expire`` timestamp a few hours out, so they are
+    only kept in memory, per video ID, until shortly before they lapse,
+    together with the codec of the format they point at.
+
+    Reads are single index probes on the event loop. Writes are buffered
+    like the counting stats and committed in one transaction from a thread
+    every FLUSH_DELAY seconds; reads see buffered changes first.
+    """
+
+    # Lookup outcomes
+    HIT, STALE, NEGATIVE, MISS = "hit", "stale", "negative", "miss"
+
+    METADATA_FIELDS = ("id", "title", "duration", "webpage_url")
+    NEGATIVE_TTL = 300  # seconds a failed search is remembered
+    STREAM_TTL = 3600  # assumed lifetime of a stream URL without ``expire``
+    STREAM_MARGIN = 60  # seconds a stream URL must outlive the track by
+
+    FLUSH_DELAY = 5  # seconds buffered writes wait before they are committed
+    PRUNE_PLAYS = 64  # plays recorded between prunes of the play counts
+
+    def __init__(
+        self,
+        cache_file: str = "music_cache.db",
+        max_entries: int = 5000,
+        max_bytes: int = 4 * 1024 * 1024,
+        legacy_file: Optional[str] = "music_cache.json",
+    ):
         """Initialize the cache manager with a specified cache file.
 
+        Nothing is read until the first lookup.
+
         Args:
-            cache_file: Path to the JSON file that will store the cache
+            cache_file: Path to the SQLite database that will store the cache
+            max_entries: Most entries kept before the least recent are evicted
+            max_bytes: Most bytes of entries kept before eviction
+            legacy_file: Old JSON cache imported once, then renamed
         """
         self.cache_file = cache_file
-        self.cache: Dict[str, dict] = {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.legacy_file = legacy_file
+        self._db: Optional[sqlite3.Connection] = None
+        self.streams: Dict[str, Tuple[str, float, Optional[str]]] = {}
+        self.negative: Dict[str, float] = {}
         self.logger = Logger("Music Cache")
 
-        # Load existing cache if it exists
-        self._load_cache()
+        # Buffered writes, and the batch being committed right now
+        self._pending = CacheWrites()
+        self._flushing: Optional[CacheWrites] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Flushes commit on their own connection, one thread at a time
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._plays_since_prune = 0
 
-    def _load_cache(self) -> None:
-        """Load the cache from disk if it exists."""
-        try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, "r") as f:
-                    self.cache = json.load(f)
-                self.logger.info(f"Loaded {len(self.cache)} entries from cache")
-            else:
-                self.logger.info("No existing cache file found")
-        except Exception as e:
-            self.logger.error(f"Error loading cache: {str(e)}")
-            self.cache = {}  # Start with empty cache if loading fails
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.negative_hits = 0
+        self.evictions = 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Open the store on first use, creating and importing as needed."""
+        if self._db is None:
+            self._db = self._connect()
+            with self._db:
+                self._create_tables(self._db)
+            self._import_legacy()
+        return self._db
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.cache_file, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA busy_timeout=5000")
+        return db
+
+    @staticmethod
+    def _create_tables(db: sqlite3.Connection) -> None:
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tracks (
+                query TEXT PRIMARY KEY,
+                id TEXT NOT NULL,
+                title TEXT,
+                duration INTEGER,
+                webpage_url TEXT,
+                cached_at TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS tracks_last_used ON tracks (last_used)")
+        db.execute("CREATE INDEX IF NOT EXISTS tracks_cached_at ON tracks (cached_at)")
+
+        # Running totals, kept current by triggers instead of scans
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS totals (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                entries INTEGER NOT NULL,
+                bytes INTEGER NOT NULL
+            )
+        """
+        )
+        db.execute("INSERT OR IGNORE INTO totals VALUES (0, 0, 0)")
+        db.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS tracks_insert AFTER INSERT ON tracks
+            BEGIN
+                UPDATE totals SET entries = entries + 1, bytes = bytes + new.size;
+            END
+        """
+        )
+        db.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS tracks_delete AFTER DELETE ON tracks
+            BEGIN
+                UPDATE totals SET entries = entries - 1, bytes = bytes - old.size;
+            END
+        """
+        )
+        db.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS tracks_update AFTER UPDATE OF size ON tracks
+            BEGIN
+                UPDATE totals SET bytes = bytes - old.size + new.size;
+            END
+        """
+        )
+
+        # Plays per video, and the size of its file if AudioCache saved one
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plays (
+                id TEXT PRIMARY KEY,
+                plays INTEGER NOT NULL,
+                last_played REAL NOT NULL,
+                file_size INTEGER
+            )
+        """
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS plays_last_played ON plays (last_played)"
+        )
 
-    def _save_cache(self) -> None:
-        """Save the current cache to disk."""
+    def _import_legacy(self) -> None:
+        """Move entries from the old JSON cache into the store, once."""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
         try:
-            with open(self.cache_file, "w") as f:
-                json.dump(self.cache, f, indent=2)
-            self.logger.info(f"Saved {len(self.cache)} entries to cache")
+            with open(self.legacy_file, "r") as f:
+                legacy = json.load(f)
+            # Old entries kept no video ID and their keys were lowercased,
+            # which mangles IDs in URLs. Without one they are imported as
+            # stale, and the first lookup re-resolves the query itself
+            entries = [
+                (
+                    query.lower(),
+                    {
+                        **entry,
+                        "id": entry.get("id")
+                        or video_id(entry.get("webpage_url") or "")
+                        or "",
+                    },
+                )
+                for query, entry in legacy.items()
+                if isinstance(entry, dict)
+            ]
+            with self.db:
+                for query, entry in entries:
+                    self._write(self.db, query, entry, entry.get("cached_at"))
+                self._evict(self.db)
+            os.replace(self.legacy_file, self.legacy_file + ".imported")
+            self.logger.info(f"Imported {len(entries)} entries from legacy cache")
         except Exception as e:
-            self.logger.error(f"Error saving cache: {str(e)}")
+            self.logger.error(f"Error importing legacy cache: {str(e)}")
+
+    def _batches(self) -> List[CacheWrites]:
+        """Uncommitted changes, newest first."""
+        if self._flushing is None:
+            return [self._pending]
+        return [self._pending, self._flushing]
 
     def get(self, query: str) -> Optional[dict]:
         """Get a cached entry if it exists.
@@ -49,46 +243,561 @@ class MusicCache:
             query: The search query or URL to look up
 
         Returns:
-            Dict containing audio URL and metadata if found, None otherwise
+            Dict containing the track metadata if found, None otherwise
+        """
+        key = query.lower()
+        for batch in self._batches():
+            entry = batch.tracks.get(key)
+            if entry is not None:
+                break
+        else:
+            row = self.db.execute(
+                """
+                SELECT id, title, duration, webpage_url, cached_at
+                FROM tracks WHERE query = ?
+            """,
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = dict(zip(self.METADATA_FIELDS + ("cached_at",), row))
+
+        # Recency is written with the next flush
+        self._pending.touches[key] = time.time()
+        self._schedule_flush()
+        return dict(entry)
+
+    @staticmethod
+    def _write(
+        db: sqlite3.Connection, key: str, entry: dict, cached_at: Optional[str]
+    ) -> None:
+        """Insert or replace one entry (caller commits)."""
+        values = [entry.get(field) for field in MusicCache.METADATA_FIELDS]
+        cached_at = cached_at or datetime.now().isoformat()
+        size = len(key) + len(cached_at) + len(json.dumps(values))
+        db.execute(
+            """
+            INSERT INTO tracks (query, id, title, duration, webpage_url,
+                                cached_at, last_used, size)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(query) DO UPDATE SET
+                id = excluded.id,
+                title = excluded.title,
+                duration = excluded.duration,
+                webpage_url = excluded.webpage_url,
+                cached_at = excluded.cached_at,
+                last_used = excluded.last_used,
+                size = excluded.size
+        """,
+            (key, *values, cached_at, time.time(), size),
+        )
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Drop least recently used entries until both bounds hold."""
+        entries, size = db.execute("SELECT entries, bytes FROM totals").fetchone()
+        while entries > self.max_entries or size > self.max_bytes:
+            victims = db.execute(
+                "SELECT query, size FROM tracks ORDER BY last_used LIMIT ?",
+                (max(entries - self.max_entries, 16),),
+            ).fetchall()
+            if not victims:
+                break
+            for key, victim_size in victims:
+                if entries <= self.max_entries and size <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM tracks WHERE query = ?", (key,))
+                entries -= 1
+                size -= victim_size
+                self.evictions += 1
+
+    def _schedule_flush(self) -> None:
+        """Commit buffered writes soon; straight away outside an event loop."""
+        if self._flush_task is not None:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            batch, self._pending = self._pending, CacheWrites()
+            self._write_batch(batch)
+            return
+        self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.FLUSH_DELAY)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Commit all buffered writes in one transaction, off the loop."""
+        # Created lazily so it binds to the loop the bot actually runs on
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, CacheWrites()
+            self._flushing = batch
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except sqlite3.Error as e:
+                self.logger.error(f"Error saving cache: {str(e)}")
+                # Keep the changes for the next flush
+                batch.merge(self._pending)
+                self._pending = batch
+            finally:
+                self._flushing = None
+
+    def _write_batch(self, batch: CacheWrites) -> None:
+        """Write a batch of changes and evict in a single transaction."""
+        with self._write_lock:
+            if self._writer is None:
+                # Make sure the tables exist before the first write
+                self.db
+                self._writer = self._connect()
+            db = self._writer
+            with db:
+                for key, entry in batch.tracks.items():
+                    self._write(db, key, entry, entry.get("cached_at"))
+                db.executemany(
+                    "UPDATE tracks SET last_used = ? WHERE query = ?",
+                    [(used, key) for key, used in batch.touches.items()],
+                )
+                db.executemany(
+                    """
+                    INSERT INTO plays (id, plays, last_played) VALUES (?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        plays = plays + excluded.plays,
+                        last_played = excluded.last_played
+                """,
+                    [
+                        (video_id, plays, last_played)
+                        for video_id, (plays, last_played) in batch.plays.items()
+                    ],
+                )
+                db.executemany(
+                    """
+                    INSERT INTO plays (id, plays, last_played, file_size)
+                    VALUES (?, 0, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET file_size = excluded.file_size
+                """,
+                    [
+                        (video_id, recorded, size)
+                        for video_id, (size, recorded) in batch.files.items()
+                    ],
+                )
+                if batch.tracks:
+                    self._evict(db)
+
+                self._plays_since_prune += sum(
+                    plays for plays, _ in batch.plays.values()
+                )
+                if self._plays_since_prune >= self.PRUNE_PLAYS:
+                    self._plays_since_prune = 0
+                    # Counts of the least recently played videos without a
+                    # file go first, so the table stays as bounded as the cache
+                    db.execute(
+                        """
+                        DELETE FROM plays WHERE id IN (
+                            SELECT id FROM plays WHERE file_size IS NULL
+                            ORDER BY last_played DESC LIMIT -1 OFFSET ?
+                        )
+                    """,
+                        (self.max_entries,),
+                    )
+
+    def lookup(self, query: str) -> Tuple[str, Optional[dict]]:
+        """Resolve a query against the cache and count the outcome.
+
+        Args:
+            query: The search query or URL to look up
+
+        Returns:
+            (HIT, track with a live stream URL), (STALE, metadata whose
+            stream URL must be resolved again), (NEGATIVE, None) for a
+            recently failed query, or (MISS, None)
         """
-        return self.cache.get(query.lower())
+        key = query.lower()
+        now = time.time()
+
+        expiry = self.negative.get(key)
+        if expiry is not None:
+            if expiry > now:
+                self.negative_hits += 1
+                return self.NEGATIVE, None
+            del self.negative[key]
+
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+            return self.MISS, None
+
+        stream = self.streams.get(entry["id"])
+        needed = (entry.get("duration") or 0) + self.STREAM_MARGIN
+        if stream is not None and stream[1] > now + needed:
+            self.hits += 1
+            return self.HIT, {**entry, "url": stream[0], "codec": stream[2]}
+
+        self.refreshes += 1
+        return self.STALE, entry
+
+    @classmethod
+    def stream_expiry(cls, url: str) -> float:
+        """Read the ``expire`` timestamp embedded in a stream URL."""
+        try:
+            return float(parse_qs(urlparse(url).query)["expire"][0])
+        except (KeyError, ValueError):
+            return time.time() + cls.STREAM_TTL
 
     def update(self, query: str, data: dict) -> None:
-        """Update the cache with new data and save to disk.
+        """Update the cache with new data; it is written with the next flush.
 
         Args:
             query: The search query or URL to cache
-            data: Dictionary containing audio URL and metadata
+            data: Dictionary containing audio URL, its codec and metadata
+        """
+        key = query.lower()
+        self.negative.pop(key, None)
+        self._remember_stream(data["id"], data["url"], data.get("codec"))
+
+        # Only the stable metadata is persisted; a refreshed stream URL
+        # leaves it unchanged and needs no write
+        previous = self.get(key)
+        if previous is not None and all(
+            previous[field] == data.get(field) for field in self.METADATA_FIELDS
+        ):
+            return
+
+        entry = {field: data.get(field) for field in self.METADATA_FIELDS}
+        entry["cached_at"] = datetime.now().isoformat()
+        self._pending.tracks[key] = entry
+        self._schedule_flush()
+
+    def _remember_stream(
+        self, video_id: str, url: str, codec: Optional[str] = None
+    ) -> None:
+        now = time.time()
+        self.streams[video_id] = (url, self.stream_expiry(url), codec)
+        if len(self.streams) > self.max_entries:
+            for stale in [
+                key for key, (_, expiry, _) in self.streams.items() if expiry <= now
+            ]:
+                del self.streams[stale]
+
+    def record_play(self, video_id: str) -> Tuple[int, Optional[int]]:
+        """Count a play of a video.
+
+        Returns:
+            How often it has been played, and the size of its saved audio
+            file or None if there is none
         """
-        # Add timestamp to track when this entry was cached
-        data["cached_at"] = datetime.now().isoformat()
+        pending = self._pending.plays.setdefault(video_id, [0, 0.0])
+        pending[0] += 1
+        pending[1] = time.time()
+        self._schedule_flush()
+
+        row = self.db.execute(
+            "SELECT plays FROM plays WHERE id = ?", (video_id,)
+        ).fetchone()
+        plays = (row[0] if row else 0) + sum(
+            batch.plays[video_id][0]
+            for batch in self._batches()
+            if video_id in batch.plays
+        )
+        return plays, self.audio_file_size(video_id)
+
+    def audio_file_size(self, video_id: str) -> Optional[int]:
+        """Size of the video's saved audio file, or None if there is none."""
+        for batch in self._batches():
+            if video_id in batch.files:
+                return batch.files[video_id][0]
+        row = self.db.execute(
+            "SELECT file_size FROM plays WHERE id = ?", (video_id,)
+        ).fetchone()
+        return row[0] if row else None
 
-        # Update memory cache
-        self.cache[query.lower()] = data
+    def set_audio_file(self, video_id: str, size: Optional[int]) -> None:
+        """Record that a video's audio file was saved, or None if deleted."""
+        self._pending.files[video_id] = (size, time.time())
+        self._schedule_flush()
 
-        # Save to disk
-        self._save_cache()
+    def audio_files(self) -> List[Tuple[str, int]]:
+        """Videos with saved audio files, least recently played first."""
+        files = {
+            video_id: [size, last_played]
+            for video_id, size, last_played in self.db.execute(
+                """
+                SELECT id, file_size, last_played FROM plays
+                WHERE file_size IS NOT NULL
+            """
+            )
+        }
+        # Oldest uncommitted changes first, so newer ones win
+        for batch in reversed(self._batches()):
+            for video_id, (size, recorded) in batch.files.items():
+                if size is None:
+                    files.pop(video_id, None)
+                else:
+                    files.setdefault(video_id, [size, recorded])[0] = size
+            for video_id, (_, last_played) in batch.plays.items():
+                if video_id in files:
+                    files[video_id][1] = last_played
+        ordered = sorted(files.items(), key=lambda item: item[1][1])
+        return [(video_id, size) for video_id, (size, _) in ordered]
+
+    def update_missing(self, query: str) -> None:
+        """Remember briefly that a query found nothing."""
+        self.negative[query.lower()] = time.time() + self.NEGATIVE_TTL
 
     def clear(self) -> None:
         """Clear the entire cache from memory and disk."""
-        self.cache = {}
-        if os.path.exists(self.cache_file):
-            os.remove(self.cache_file)
+        self.streams = {}
+        self.negative = {}
+        self._pending.tracks.clear()
+        self._pending.touches.clear()
+        with self._write_lock:
+            with self.db:
+                self.db.execute("DELETE FROM tracks")
         self.logger.info("Cache cleared")
 
+    async def close(self) -> None:
+        """Commit buffered writes and close the store."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        with self._write_lock:
+            for db in (self._writer, self._db):
+                if db is not None:
+                    db.close()
+            self._writer = self._db = None
+
     def get_stats(self) -> dict:
         """Get basic statistics about the cache."""
+        lookups = self.hits + self.refreshes + self.misses + self.negative_hits
+        entries, size = self.db.execute("SELECT entries, bytes FROM totals").fetchone()
         return {
-            "total_entries": len(self.cache),
-            "cache_size_kb": (
-                os.path.getsize(self.cache_file) / 1024
-                if os.path.exists(self.cache_file)
-                else 0
-            ),
-            "oldest_entry": min(
-                (entry["cached_at"] for entry in self.cache.values()), default=None
-            ),
-            "newest_entry": max(
-                (entry["cached_at"] for entry in self.cache.values()), default=None
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "negative_hits": self.negative_hits,
+            "hit_rate": (
+                (self.hits + self.negative_hits) / lookups if lookups else 0.0
             ),
+            "evictions": self.evictions,
+            "live_streams": len(self.streams),
+            "total_entries": entries,
+            "cache_size_kb": size / 1024,
+            # Both are single index probes
+            "oldest_entry": self.db.execute(
+                "SELECT MIN(cached_at) FROM tracks"
+            ).fetchone()[0],
+            "newest_entry": self.db.execute(
+                "SELECT MAX(cached_at) FROM tracks"
+            ).fetchone()[0],
+        }
+
+
+class AudioCache:
+    """Opus files of often played tracks, served instead of YouTube streams.
+
+    Once a video has been played ``min_plays`` times it is saved in the
+    background as ``<video id>.opus`` in ``directory``: Opus streams are
+    copied as they are, anything else is encoded to Opus at Discord's
+    48 kHz stereo. Play counts and file sizes live in the MusicCache
+    store, and the least recently played files are deleted to stay under
+    ``max_bytes``. Nothing is read until the first save.
+    """
+
+    VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+    EXTENSION = ".opus"
+    BITRATE = "128k"  # for sources that have to be encoded
+    RECONNECT = ("-reconnect", "1", "-reconnect_streamed", "1")
+
+    def __init__(
+        self,
+        directory: str,
+        music_cache: MusicCache,
+        max_bytes: int = 1024**3,
+        min_plays: int = 3,
+        concurrency: int = 1,
+    ):
+        self.directory = directory
+        self.music_cache = music_cache
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        self.concurrency = concurrency
+        self.size: Optional[int] = None
+        self.saving: Set[str] = set()
+        self.tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.logger = Logger("Audio Cache")
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.saved = 0
+        self.failures = 0
+        self.evictions = 0
+
+    def path(self, video_id: str) -> str:
+        return os.path.join(self.directory, video_id + self.EXTENSION)
+
+    def _load(self) -> None:
+        """Total the saved files and drop any the store doesn't know."""
+        if self.size is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        files = dict(self.music_cache.audio_files())
+        self.size = sum(files.values())
+        for name in os.listdir(self.directory):
+            video_id, extension = os.path.splitext(name)
+            # Partial saves and files whose rows were lost
+            if name.endswith(".partial") or (
+                extension == self.EXTENSION and video_id not in files
+            ):
+                os.remove(os.path.join(self.directory, name))
+
+    def contains(self, video_id: str) -> bool:
+        return self.music_cache.audio_file_size(video_id) is not None
+
+    def lookup(self, video_id: Optional[str]) -> Optional[str]:
+        """Path of the video's saved file, counting the hit or miss."""
+        if video_id:
+            size = self.music_cache.audio_file_size(video_id)
+            if size is not None:
+                path = self.path(video_id)
+                if os.path.exists(path):
+                    self.hits += 1
+                    self.bytes_saved += size
+                    return path
+                # Deleted from outside; forget it
+                self._load()
+                self._forget(video_id, size)
+        self.misses += 1
+        return None
+
+    def played(
+        self, video_id: Optional[str], url: Optional[str], codec: Optional[str]
+    ) -> None:
+        """Count a play and save the track once it is played often enough.
+
+        ``url`` is the live stream URL, or None when the play was served
+        from a saved file.
+        """
+        if not video_id or not self.VIDEO_ID.match(video_id):
+            return
+        plays, size = self.music_cache.record_play(video_id)
+        if (
+            url
+            and size is None
+            and plays >= self.min_plays
+            and video_id not in self.saving
+        ):
+            self.saving.add(video_id)
+            task = asyncio.create_task(self._save(video_id, url, codec))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _save(self, video_id: str, url: str, codec: Optional[str]) -> None:
+        # Created lazily so it binds to the loop the bot actually runs on
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        target = self.path(video_id)
+        partial = target + ".partial"
+        try:
+            async with self._semaphore:
+                self._load()
+                process = await asyncio.create_subprocess_exec(
+                    "ffmpeg",
+                    "-nostdin",
+                    "-y",
+                    "-loglevel",
+                    "error",
+                    *self.RECONNECT,
+                    "-i",
+                    url,
+                    "-vn",
+                    "-map_metadata",
+                    "-1",
+                    "-c:a",
+                    "copy" if codec == "opus" else "libopus",
+                    "-b:a",
+                    self.BITRATE,
+                    "-ar",
+                    "48000",
+                    "-ac",
+                    "2",
+                    "-f",
+                    "opus",
+                    partial,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                try:
+                    _, stderr = await process.communicate()
+                except asyncio.CancelledError:
+                    process.kill()
+                    await process.wait()
+                    raise
+                if process.returncode != 0:
+                    raise RuntimeError(stderr.decode(errors="replace").strip())
+
+                os.replace(partial, target)
+                size = os.path.getsize(target)
+                self.music_cache.set_audio_file(video_id, size)
+                self.size += size
+                self.saved += 1
+                self._evict()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            self.logger.error(f"Error saving audio for {video_id}: {str(e)}")
+        finally:
+            self.saving.discard(video_id)
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def _evict(self) -> None:
+        """Delete the least recently played files until under max_bytes."""
+        if self.size <= self.max_bytes:
+            return
+        for video_id, size in self.music_cache.audio_files():
+            if self.size <= self.max_bytes:
+                break
+            if self._forget(video_id, size):
+                self.evictions += 1
+
+    def _forget(self, video_id: str, size: int) -> bool:
+        try:
+            os.remove(self.path(video_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Still open on a platform that won't delete open files
+            self.logger.error(f"Error deleting audio for {video_id}: {str(e)}")
+            return False
+        self.music_cache.set_audio_file(video_id, None)
+        self.size -= size
+        return True
+
+    async def close(self) -> None:
+        """Stop saves in progress; their partial files are removed."""
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def info(self) -> Dict[str, Any]:
+        """Hit rate, and how much streaming the saved files avoided."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "mb_saved": self.bytes_saved / 1024**2,
+            "saved": self.saved,
+            "failures": self.failures,
+            "evictions": self.evictions,
+            "saving": len(self.saving),
+            "size_mb": (self.size or 0) / 1024**2,
         }
@@ -1,14 +1,762 @@
-from typing import Any, Optional, Union, Tuple, List, Dict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    NamedTuple,
+    Optional,
+    Union,
+    Tuple,
+    List,
+    Dict,
+)
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import os
+import pathlib
+import queue
+import threading
 import time
 import ast
 import math
 import numpy
 import operator
+import re
+import signal
 import sqlite3
-from word2number import w2n
 
+try:
+    import resource
+except ImportError:  # Windows has no rlimits
+    resource = None
 
-class CounterUtils:
+
+class CounterDatabase:
+    """Long-lived SQLite connections for the counting subsystem.
+
+    Every write runs on one dedicated writer thread that owns a single
+    connection, so statements are prepared once and reused from the
+    connection's statement cache. Reads go through a small pool of
+    read-only connections, which WAL mode lets proceed while a write
+    is being committed.
+    """
+
+    STATEMENT_CACHE_SIZE = 128
+
+    def __init__(self, db_path: str, readers: int = 2):
+        self.db_path = db_path
+        self._jobs: "queue.Queue[Optional[Tuple[Callable, Future]]]" = queue.Queue()
+        self._reader_connections: List[sqlite3.Connection] = []
+        self._reader_lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+        self._readers = ThreadPoolExecutor(
+            max_workers=readers, thread_name_prefix="counting-db-reader"
+        )
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="counting-db-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        """Open a connection tuned for the bot's access pattern."""
+        if readonly:
+            uri = pathlib.Path(self.db_path).resolve().as_uri() + "?mode=ro"
+            db = sqlite3.connect(
+                uri,
+                uri=True,
+                check_same_thread=False,
+                cached_statements=self.STATEMENT_CACHE_SIZE,
+            )
+        else:
+            db = sqlite3.connect(
+                self.db_path, cached_statements=self.STATEMENT_CACHE_SIZE
+            )
+            # Applies to a new database straight away; an existing one
+            # switches over when enable_incremental_vacuum rewrites it
+            db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA busy_timeout=5000")
+        return db
+
+    def _writer_loop(self) -> None:
+        """Run queued write jobs one at a time on the writer connection."""
+        db = self._connect()
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+
+                fn, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = fn(db)
+                    db.commit()
+                except BaseException as e:
+                    db.rollback()
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            db.close()
+
+    def _read_job(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run a read job on this reader thread's connection."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._connect(readonly=True)
+            self._local.db = db
+            with self._reader_lock:
+                self._reader_connections.append(db)
+        return fn(db)
+
+    def submit(self, fn: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Queue a write job and return a future for its result.
+
+        The job receives the writer connection and is committed as a
+        single transaction once it returns.
+        """
+        if self._closed:
+            raise RuntimeError("Counting database is closed")
+        future: Future = Future()
+        self._jobs.put((fn, future))
+        return future
+
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run a write job on the writer thread without blocking the loop."""
+        return await asyncio.wrap_future(self.submit(fn))
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run a read job on a read-only connection."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._read_job, fn)
+
+    async def checkpoint(self) -> Tuple[int, int, int]:
+        """Copy committed WAL frames back into the database file.
+
+        PASSIVE mode never waits on readers or the writer.
+        Returns: (busy, wal_frames, checkpointed_frames)
+        """
+        return await self.write(
+            lambda db: db.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        )
+
+    async def enable_incremental_vacuum(self) -> Optional[int]:
+        """Rewrite a database created without incremental auto-vacuum.
+
+        A one-off full VACUUM that takes as long as copying the whole
+        database, with writes queued behind it, so it belongs in an idle
+        period. Returns the page count afterwards, or None if the database
+        already uses incremental auto-vacuum.
+        """
+
+        def enable(db: sqlite3.Connection) -> Optional[int]:
+            if db.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return None
+            db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            if db.in_transaction:
+                db.commit()
+            db.execute("VACUUM")
+            return db.execute("PRAGMA page_count").fetchone()[0]
+
+        return await self.write(enable)
+
+    async def incremental_vacuum(self, pages: int) -> int:
+        """Return up to ``pages`` free pages to the filesystem.
+
+        Returns the number of free pages left afterwards.
+        """
+
+        def vacuum(db: sqlite3.Connection) -> int:
+            db.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            return db.execute("PRAGMA freelist_count").fetchone()[0]
+
+        return await self.write(vacuum)
+
+    async def optimize(self) -> None:
+        """Refresh query planner statistics that have gone stale."""
+
+        def optimize(db: sqlite3.Connection) -> None:
+            # Bound ANALYZE to a sample so it stays quick on large tables
+            db.execute("PRAGMA analysis_limit = 400")
+            db.execute("PRAGMA optimize")
+
+        await self.write(optimize)
+
+    async def backup(self, target: str) -> int:
+        """Snapshot the database to ``target`` with the online backup API.
+
+        Runs as one job on the writer connection and copies every page in
+        a single step. A stepwise backup from another connection restarts
+        whenever the writer commits, so it might never finish; this one
+        cannot be interrupted. Writes queue behind it meanwhile and readers
+        carry on. The snapshot is written beside ``target`` and renamed
+        into place once complete.
+        Returns the number of pages copied.
+        """
+        partial = target + ".partial"
+
+        def backup(db: sqlite3.Connection) -> int:
+            destination = sqlite3.connect(partial)
+            try:
+                db.backup(destination)
+            finally:
+                destination.close()
+            os.replace(partial, target)
+            return db.execute("PRAGMA page_count").fetchone()[0]
+
+        return await self.write(backup)
+
+    def close(self) -> None:
+        """Drain pending writes and close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._jobs.put(None)
+        self._writer.join()
+        self._readers.shutdown(wait=True)
+        with self._reader_lock:
+            for db in self._reader_connections:
+                db.close()
+            self._reader_connections.clear()
+
+
+class CountingActor:
+    """Serializes count handling for one guild's counting channels.
+
+    Messages are queued and handled one at a time by a single worker, so
+    two counts that arrive together can never both see the same expected
+    number. Queued messages are ordered by their snowflake ID, which is
+    Discord's own message order.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[Any]]):
+        self.handler = handler
+        self.queue: "asyncio.PriorityQueue[Tuple[int, int, Any, asyncio.Future]]" = (
+            asyncio.PriorityQueue()
+        )
+        self.worker: Optional[asyncio.Task] = None
+        self._sequence = 0
+
+    def submit(self, order: int, message: Any) -> asyncio.Future:
+        """Queue a message and return a future for the handler's result."""
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        self.queue.put_nowait((order, self._sequence, message, future))
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+        return future
+
+    async def _run(self) -> None:
+        """Handle queued messages one at a time."""
+        while True:
+            _, _, message, future = await self.queue.get()
+            try:
+                result = await self.handler(message)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.queue.task_done()
+
+    async def close(self) -> None:
+        """Finish the queued messages and stop the worker."""
+        if self.worker is None:
+            return
+        await self.queue.join()
+        self.worker.cancel()
+        self.worker = None
+
+
+class Leaderboard:
+    """Top scores for one guild and category, kept current in memory.
+
+    Scores only ever grow, so a user outside the top can only enter it by
+    passing the lowest entry; updates touch at most ``size`` entries.
+    Entries are ordered like the SQL leaderboard: score descending, then
+    user ID ascending, leaving out users with no score.
+    """
+
+    @staticmethod
+    def _rank(entry: Tuple[int, str]) -> Tuple[int, str]:
+        score, user_id = entry
+        return -score, user_id
+
+    def __init__(self, size: int):
+        self.size = size
+        self.scores: Dict[str, int] = {}
+        self.entries: List[Tuple[int, str]] = []
+
+    def load(self, scores: Dict[str, int]) -> None:
+        """Seed the board from every user's stored score."""
+        self.scores = scores
+        self.entries = heapq.nsmallest(
+            self.size,
+            ((score, user_id) for user_id, score in scores.items() if score > 0),
+            key=self._rank,
+        )
+
+    def add(self, user_id: str, amount: int = 1) -> None:
+        """Credit a user and keep the top entries in order."""
+        score = self.scores.get(user_id, 0) + amount
+        self.scores[user_id] = score
+
+        for i, (_, entry_id) in enumerate(self.entries):
+            if entry_id == user_id:
+                self.entries[i] = (score, user_id)
+                break
+        else:
+            entry = (score, user_id)
+            full = len(self.entries) >= self.size
+            if full and self._rank(entry) > self._rank(self.entries[-1]):
+                return
+            self.entries.append(entry)
+
+        self.entries.sort(key=self._rank)
+        del self.entries[self.size :]
+
+    def top(self, limit: int) -> List[Tuple[int, str]]:
+        return self.entries[:limit]
+
+
+class GuildCountState:
+    """Authoritative in-memory copy of a guild's row in the ``server`` table."""
+
+    LEADERBOARD_SIZE = 25
+
+    __slots__ = (
+        "guild_id",
+        "count",
+        "last_counter",
+        "high_score",
+        "fails",
+        "counts",
+        "primes",
+        "leaderboards",
+    )
+
+    def __init__(
+        self,
+        guild_id: str,
+        count: int = 1,
+        last_counter: Optional[str] = None,
+        high_score: int = 0,
+        fails: int = 0,
+        counts: int = 0,
+        primes: int = 0,
+    ):
+        self.guild_id = guild_id
+        self.count = count
+        self.last_counter = last_counter
+        self.high_score = high_score
+        self.fails = fails
+        self.counts = counts
+        self.primes = primes
+        self.leaderboards = {
+            category: Leaderboard(self.LEADERBOARD_SIZE)
+            for category in ("counts", "primes", "fails")
+        }
+
+    def as_row(self) -> tuple:
+        """Snapshot the state in ``server`` column order."""
+        return (
+            self.guild_id,
+            self.count,
+            self.last_counter,
+            self.high_score,
+            self.fails,
+            self.counts,
+            self.primes,
+        )
+
+
+class UserCountDelta:
+    """Coalesced, not yet flushed changes to one row of ``mathematicians``."""
+
+    __slots__ = (
+        "counts",
+        "fails",
+        "primes",
+        "high_score",
+        "last_count",
+        "last_fail",
+        "last_fail_date",
+        "streak_lead",
+        "streak_run",
+        "streak_best",
+        "streak_reset",
+    )
+
+    def __init__(self):
+        self.counts = 0
+        self.fails = 0
+        self.primes = 0
+        self.high_score = 0
+        self.last_count: Optional[int] = None
+        self.last_fail: Optional[int] = None
+        self.last_fail_date: Optional[float] = None
+
+        # Valid counts in a row: ``lead`` extends the stored streak, ``run``
+        # is the streak now, ``best`` the longest run begun since a reset
+        self.streak_lead = 0
+        self.streak_run = 0
+        self.streak_best = 0
+        self.streak_reset = False
+
+    def extend_streak(self) -> None:
+        self.streak_run += 1
+        if self.streak_reset:
+            self.streak_best = max(self.streak_best, self.streak_run)
+        else:
+            self.streak_lead += 1
+
+    def break_streak(self) -> None:
+        self.streak_run = 0
+        self.streak_reset = True
+
+    def merge(self, newer: "UserCountDelta") -> None:
+        """Fold a more recent delta into this one."""
+        self.counts += newer.counts
+        self.fails += newer.fails
+        self.primes += newer.primes
+        self.high_score = max(self.high_score, newer.high_score)
+        if newer.last_count is not None:
+            self.last_count = newer.last_count
+        if newer.last_fail_date is not None:
+            self.last_fail = newer.last_fail
+            self.last_fail_date = newer.last_fail_date
+
+        if self.streak_reset:
+            self.streak_best = max(
+                self.streak_best,
+                newer.streak_best,
+                self.streak_run + newer.streak_lead,
+            )
+        else:
+            self.streak_lead += newer.streak_lead
+            self.streak_best = newer.streak_best
+        if newer.streak_reset:
+            self.streak_run = newer.streak_run
+        else:
+            self.streak_run += newer.streak_run
+        self.streak_reset = self.streak_reset or newer.streak_reset
+
+
+class NumberWordParser:
+    """Reads English number words ("one hundred and five") in one pass.
+
+    Every word is resolved with a single lookup in a precomputed
+    vocabulary and malformed phrases return None instead of raising, so
+    chat that merely contains number words costs nothing extra.
+    """
+
+    UNIT, TENS, HUNDRED, SCALE, POINT = range(5)
+
+    UNIT_WORDS = (
+        "zero one two three four five six seven eight nine ten eleven twelve "
+        "thirteen fourteen fifteen sixteen seventeen eighteen nineteen"
+    ).split()
+    TENS_WORDS = "twenty thirty forty fifty sixty seventy eighty ninety".split()
+
+    # word -> (kind, value); every word costs exactly one lookup
+    VOCABULARY: Dict[str, Tuple[int, int]] = {
+        **dict(zip(UNIT_WORDS, zip(itertools.repeat(UNIT), range(20)))),
+        **dict(zip(TENS_WORDS, zip(itertools.repeat(TENS), range(20, 100, 10)))),
+        "hundred": (HUNDRED, 100),
+        "thousand": (SCALE, 10**3),
+        "million": (SCALE, 10**6),
+        "billion": (SCALE, 10**9),
+        "trillion": (SCALE, 10**12),
+        "point": (POINT, 0),
+    }
+
+    # Allowed between number words, as in "one hundred and five"
+    CONNECTOR = "and"
+    WORDS = frozenset(VOCABULARY) | {CONNECTOR}
+
+    TOKEN = re.compile(r"\d[\w.]*|[A-Za-z_]\w*")
+
+    def value(self, words: List[str]) -> Optional[Union[int, float]]:
+        """Convert a run of lowercase number words, or None if malformed."""
+        total = 0
+        group = 0
+        last = None
+        last_scale = None
+        decimals = None
+
+        for word in words:
+            if word == self.CONNECTOR:
+                continue
+            kind, value = self.VOCABULARY[word]
+
+            if decimals is not None:
+                if kind != self.UNIT or value > 9:
+                    return None
+                decimals += str(value)
+                continue
+
+            if kind == self.UNIT:
+                if last == self.UNIT or (last == self.TENS and not 1 <= value <= 9):
+                    return None
+                group += value
+            elif kind == self.TENS:
+                if last in (self.UNIT, self.TENS):
+                    return None
+                group += value
+            elif kind == self.HUNDRED:
+                if last == self.HUNDRED or group >= 100:
+                    return None
+                group = (group or 1) * value
+            elif kind == self.SCALE:
+                if last_scale is not None and value >= last_scale:
+                    return None
+                total += (group or 1) * value
+                group = 0
+                last_scale = value
+            else:
+                decimals = ""
+            last = kind
+
+        if last is None or decimals == "":
+            return None
+        if decimals:
+            return float(f"{total + group}.{decimals}")
+        return total + group
+
+    def _joins(self, previous: str, word: str) -> bool:
+        """Whether a hyphen between two words spells one number (twenty-one)."""
+        if previous not in self.VOCABULARY or word not in self.VOCABULARY:
+            return False
+        kind, _ = self.VOCABULARY[previous]
+        next_kind, next_value = self.VOCABULARY[word]
+        return kind == self.TENS and next_kind == self.UNIT and 1 <= next_value <= 9
+
+    def replace(self, text: str) -> Optional[Tuple[str, Optional[Union[int, float]]]]:
+        """Replace every run of number words in text with its digits.
+
+        Returns the rewritten text plus the value when the whole text was
+        a single run, or None if any run is malformed. Runs are separated
+        by anything other than whitespace, so "twenty + 1" becomes "20 + 1".
+        """
+        # A single bare word is the usual case: one lookup
+        word = text.strip().lower()
+        if word.isalpha():
+            kind, value = self.VOCABULARY.get(word, (None, None))
+            if kind is None:
+                return text, None
+            return None if kind == self.POINT else (text, value)
+
+        # Plain words only: no scanning or rebuilding needed
+        words = word.split()
+        if "".join(words).isalpha():
+            number_words = self.WORDS.issuperset(words)
+            if not number_words or self.CONNECTOR in (words[0], words[-1]):
+                return text, None
+            value = self.value(words)
+            return None if value is None else (text, value)
+
+        runs = []
+        current = None
+        for match in self.TOKEN.finditer(text):
+            word = match.group().lower()
+            if current is not None:
+                gap = text[current[1] : match.start()]
+                joined = not gap.strip() or (
+                    gap == "-" and self._joins(current[2][-1], word)
+                )
+                if joined and (word in self.VOCABULARY or word == self.CONNECTOR):
+                    current[1] = match.end()
+                    current[2].append(word)
+                    if word != self.CONNECTOR:
+                        current[3] = match.end()
+                    continue
+                runs.append(current)
+                current = None
+            if word in self.VOCABULARY:
+                current = [match.start(), match.end(), [word], match.end()]
+        if current is not None:
+            runs.append(current)
+
+        if not runs:
+            return text, None
+
+        pieces = []
+        position = 0
+        value = None
+        for start, _, words, end in runs:
+            # A trailing "and" belongs to the surrounding text, not the number
+            while words[-1] == self.CONNECTOR:
+                words.pop()
+            value = self.value(words)
+            if value is None:
+                return None
+            pieces.append(text[position:start])
+            pieces.append(str(value))
+            position = end
+        pieces.append(text[position:])
+
+        start, end = runs[0][0], runs[0][3]
+        whole = len(runs) == 1 and not text[:start].strip() and not text[end:].strip()
+        return "".join(pieces), value if whole else None
+
+
+class PrimeIndex:
+    """Primality checks and next-prime lookups tuned for counting.
+
+    Numbers below SIEVE_LIMIT (where real counts live) are answered from
+    an odd-only sieve and a sorted array of primes. Anything larger uses
+    a Miller-Rabin test that is deterministic for every 20-digit count.
+    Both tables are built by build(), or on first use if nobody called it.
+    """
+
+    SIEVE_LIMIT = 1 << 22
+
+    # Miller-Rabin witnesses that are exact for n < 3.3 * 10**24
+    WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+    def __init__(self, limit: int = SIEVE_LIMIT):
+        self.limit = limit
+        self._sieve: Optional[bytearray] = None
+        self._primes: Optional[array] = None
+        self._lock = threading.Lock()
+
+    def build(self) -> None:
+        """Sieve the odd numbers below the limit and list the primes.
+
+        Takes ~80 ms, so the bot runs it in a thread at startup. Does
+        nothing once the tables exist.
+        """
+        with self._lock:
+            if self._sieve is not None:
+                return
+            # sieve[i] says whether 2 * i + 1 is prime
+            sieve = bytearray([1]) * (self.limit // 2)
+            sieve[0] = 0
+            for i in range(1, (math.isqrt(self.limit) - 1) // 2 + 1):
+                if sieve[i]:
+                    step = 2 * i + 1
+                    start = step * step // 2
+                    sieve[start::step] = bytes(len(range(start, len(sieve), step)))
+            primes = array("I", [2])
+            primes.extend(
+                2 * i + 1 for i in itertools.compress(range(len(sieve)), sieve)
+            )
+            self._primes = primes
+            self._sieve = sieve
+
+    def _miller_rabin(self, n: int) -> bool:
+        """Miller-Rabin test for odd n above the sieve."""
+        for p in self.WITNESSES:
+            if n % p == 0:
+                return n == p
+
+        d = n - 1
+        r = 0
+        while d % 2 == 0:
+            d //= 2
+            r += 1
+
+        for a in self.WITNESSES:
+            x = pow(a, d, n)
+            if x == 1 or x == n - 1:
+                continue
+            for _ in range(r - 1):
+                x = x * x % n
+                if x == n - 1:
+                    break
+            else:
+                return False
+        return True
+
+    def is_prime(self, n: int) -> bool:
+        """Check if a number is prime."""
+        if n < 2:
+            return False
+        if n % 2 == 0:
+            return n == 2
+        if n < self.limit:
+            if self._sieve is None:
+                self.build()
+            return bool(self._sieve[n // 2])
+        return self._miller_rabin(n)
+
+    def next_prime(self, n: int) -> int:
+        """Smallest prime that is at least n."""
+        if n < self.limit:
+            if self._primes is None:
+                self.build()
+            i = bisect_left(self._primes, n)
+            if i < len(self._primes):
+                return self._primes[i]
+            n = self.limit
+
+        n += 1 - n % 2
+        while not self._miller_rabin(n):
+            n += 2
+        return n
+
+
+PRIMES = PrimeIndex()
+
+
+class EvaluationResult(NamedTuple):
+    """Outcome of evaluating a counting message."""
+
+    value: int
+    kind: str  # "number", "word" or "expression"
+    parse_time: float  # seconds spent parsing, ~0 on a cache hit
+
+
+class ExpressionCache:
+    """Bounded LRU of compiled counting expressions keyed on normalized text."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Tuple[str, Any]) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def info(self) -> Dict[str, Any]:
+        """Hit/miss counters for the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }
+
+
+class ExpressionEvaluator:
     """Safe mathematical expression evaluator."""
 
     # Supported operators
@@ -24,6 +772,22 @@ class CounterUtils:
         ast.UAdd: operator.pos,
     }
 
+    # Lexical pre-screen: characters and tokens a count can be made of
+    MAX_MESSAGE_LENGTH = 256
+    FOREIGN_CHARACTER = re.compile(r"[^0-9A-Za-z_\s+\-*/%().,]")
+    TOKEN = NumberWordParser.TOKEN
+    NUMBER_WORDS = NumberWordParser.WORDS
+
+    # Static cost limits applied before an expression is evaluated
+    MAX_NODES = 200
+    MAX_DEPTH = 50
+    MAX_INT_BITS = 4096
+    FLOAT_BOUND = 1 << 1024
+
+    # Functions that turn float arguments into ints (or need int ones);
+    # float arguments are folded so the int result can be bounded
+    INTEGER_ARGUMENTS = frozenset({"ceil", "floor", "factorial", "perm", "comb"})
+
     # Supported math functions with their safe implementations
     SAFE_FUNCTIONS = {
         # Math module constants
@@ -186,71 +950,102 @@ class CounterUtils:
         "numpyheaviside": numpy.heaviside,
     }
 
-    def __init__(self, db_path: str = "counting.db", max_digits: int = 20):
-        self.db_path = db_path
+    def __init__(self, max_digits: int = 20):
         self.max_digits = max_digits
-        self.init_database()
+        self.count_limit = 10**max_digits
+        self.expression_cache = ExpressionCache()
+        self.number_words = NumberWordParser()
+        self.prefilter_rejects = 0
 
-    def init_database(self) -> None:
-        """Initialize the database with required tables."""
-        with sqlite3.connect(self.db_path) as db:
-            cursor = db.cursor()
+    def _compile_node(self, node: ast.AST) -> Callable[[], Any]:
+        """Compile a checked AST node into a zero-argument closure.
 
-            # Create server settings table
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS server (
-                    serverID TEXT PRIMARY KEY,
-                    count INTEGER NOT NULL DEFAULT 1,
-                    last_counter TEXT,
-                    high_score INTEGER NOT NULL DEFAULT 0,
-                    fails INTEGER NOT NULL DEFAULT 0,
-                    counts INTEGER NOT NULL DEFAULT 0,
-                    primes INTEGER NOT NULL DEFAULT 0
-                )
-            """
-            )
+        Operators and functions are looked up once here, so evaluating the
+        result is a plain chain of calls with no type dispatch. Must only
+        be given trees that passed _check_node.
+        """
 
-            # Create user stats table
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS mathematicians (
-                    ID TEXT,
-                    serverID TEXT,
-                    fails INTEGER DEFAULT 0,
-                    counts INTEGER DEFAULT 0,
-                    high_score INTEGER DEFAULT 0,
-                    last_fail INTEGER DEFAULT 0,
-                    last_fail_date TEXT,
-                    last_count INTEGER DEFAULT 0,
-                    delta_fail INTEGER DEFAULT 0,
-                    primes INTEGER DEFAULT 0,
-                    PRIMARY KEY (ID, serverID)
-                )
-            """
-            )
-            db.commit()
+        # Numeric values
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda: value
 
-    def _eval_node(self, node: ast.AST) -> Any:
-        """Safely evaluate an AST node."""
+        # Names (constants are zero-argument functions)
+        elif isinstance(node, ast.Name):
+            return self.SAFE_FUNCTIONS[node.id]
+
+        # Mathematical operations
+        elif isinstance(node, ast.BinOp):
+            op = self.OPERATORS[type(node.op)]
+            left = self._compile_node(node.left)
+            right = self._compile_node(node.right)
+            return lambda: op(left(), right())
+
+        # Unary operations (like -5)
+        elif isinstance(node, ast.UnaryOp):
+            op = self.OPERATORS[type(node.op)]
+            operand = self._compile_node(node.operand)
+            return lambda: op(operand())
+
+        # Function calls, specialised for the common arities
+        func = self.SAFE_FUNCTIONS[node.func.id]
+        args = [self._compile_node(arg) for arg in node.args]
+        if not args:
+            return func
+        if len(args) == 1:
+            (arg,) = args
+            return lambda: func(arg())
+        if len(args) == 2:
+            first, second = args
+            return lambda: func(first(), second())
+        return lambda: func(*[arg() for arg in args])
+
+    def _check_node(self, node: ast.AST, depth: int = 0) -> Tuple[int, bool]:
+        """Validate a node and bound its cost without evaluating it.
+
+        Returns an upper bound on the absolute value of the node's result
+        and whether that result is an exact int. Floats are cheap no matter
+        how large they get (they overflow instead of growing), so only int
+        arithmetic is bounded. Raises ValueError for anything that is not
+        a whitelisted number, operator or function, or that could exceed
+        MAX_INT_BITS along the way.
+        """
+        if depth > self.MAX_DEPTH:
+            raise ValueError("Expression nested too deeply")
 
         # Numeric values
-        if isinstance(node, ast.Num):
-            return node.n
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(
+                node.value, (int, float, complex)
+            ):
+                raise ValueError(f"Unsupported constant: {node.value!r}")
+            if isinstance(node.value, int):
+                return abs(node.value), True
+            return self.FLOAT_BOUND, False
 
         # Names (functions and constants)
         elif isinstance(node, ast.Name):
-            if node.id in self.SAFE_FUNCTIONS:
-                return self.SAFE_FUNCTIONS[node.id]()
-            raise ValueError(f"Unknown identifier: {node.id}")
+            if node.id not in self.SAFE_FUNCTIONS:
+                raise ValueError(f"Unknown identifier: {node.id}")
+            return self.FLOAT_BOUND, False
 
         # Mathematical operations
         elif isinstance(node, ast.BinOp):
             if type(node.op) not in self.OPERATORS:
                 raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
-            left = self._eval_node(node.left)
-            right = self._eval_node(node.right)
-            return self.OPERATORS[type(node.op)](left, right)
+            left, left_int = self._check_node(node.left, depth + 1)
+            right, right_int = self._check_node(node.right, depth + 1)
+            if not (left_int and right_int) or isinstance(node.op, ast.Div):
+                return self.FLOAT_BOUND, False
+            if isinstance(node.op, (ast.Add, ast.Sub)):
+                return left + right, True
+            if isinstance(node.op, ast.Mult):
+                return self._bounded(left.bit_length() + right.bit_length()), True
+            if isinstance(node.op, ast.FloorDiv):
+                return left, True
+            if isinstance(node.op, ast.Mod):
+                return right, True
+            return self._bounded_power(left, right), True
 
         # Unary operations (like -5)
         elif isinstance(node, ast.UnaryOp):
@@ -258,8 +1053,7 @@ class CounterUtils:
                 raise ValueError(
                     f"Unsupported unary operator: {type(node.op).__name__}"
                 )
-            operand = self._eval_node(node.operand)
-            return self.OPERATORS[type(node.op)](operand)
+            return self._check_node(node.operand, depth + 1)
 
         # Function calls
         elif isinstance(node, ast.Call):
@@ -267,192 +1061,886 @@ class CounterUtils:
                 raise ValueError("Invalid function call")
             if node.func.id not in self.SAFE_FUNCTIONS:
                 raise ValueError(f"Unknown function: {node.func.id}")
-
-            args = [self._eval_node(arg) for arg in node.args]
-            return self.SAFE_FUNCTIONS[node.func.id](*args)
+            if node.keywords:
+                raise ValueError("Keyword arguments are not supported")
+            args = [self._check_node(arg, depth + 1) for arg in node.args]
+            if node.func.id in self.INTEGER_ARGUMENTS:
+                args = [
+                    (bound, True) if is_int else (self._fold_bound(arg), True)
+                    for arg, (bound, is_int) in zip(node.args, args)
+                ]
+            return self._check_call(node.func.id, args)
 
         # Everything else is not allowed
         raise ValueError(f"Unsupported expression type: {type(node).__name__}")
 
-    def _evaluate_expression(self, expression: str) -> Optional[int]:
-        """Safely evaluate a mathematical expression."""
-        try:
-            # Try word to number first
-            if len(expression.split()) == 1:
-                try:
-                    result = w2n.word_to_num(expression)
-                    return result if len(str(abs(result))) <= self.max_digits else None
-                except ValueError:
-                    pass
+    def _fold_bound(self, node: ast.AST) -> int:
+        """Bound a checked float subexpression by evaluating it.
 
-            # Parse and evaluate mathematical expression
-            tree = ast.parse(expression, mode="eval")
-            result = self._eval_node(tree.body)
-
-            # Enhanced validation for trigonometric and other float results
-            if isinstance(result, (int, float)):
-                # If result is a float, round it if it's very close to an integer
-                if abs(result - round(result)) < 1e-10:
-                    result_int = round(result)
-                    if len(str(abs(result_int))) <= self.max_digits:
-                        return result_int
-                elif isinstance(result, int):
-                    if len(str(abs(result))) <= self.max_digits:
-                        return result
+        Float arithmetic is cheap and any ints inside are already bounded,
+        so this is safe; it lets ``2 ** ceil(pi)`` be bounded by 2 ** 4.
+        """
+        return math.ceil(abs(self._compile_node(node)()))
+
+    def _bounded(self, bits: int) -> int:
+        """Turn a bit-length estimate into a bound, rejecting oversized ones."""
+        if bits > self.MAX_INT_BITS:
+            raise ValueError("Expression result too large")
+        return (1 << bits) - 1
+
+    def _bounded_power(self, base: int, exponent: int) -> int:
+        """Bound ``base ** exponent`` for ints before it is computed."""
+        if base <= 1:
+            return 1
+        if exponent > self.MAX_INT_BITS:
+            raise ValueError("Exponent too large")
+        return self._bounded(base.bit_length() * exponent)
+
+    def _check_call(self, name: str, args: List[Tuple[int, bool]]) -> Tuple[int, bool]:
+        """Bound the result of a whitelisted function call."""
+        bounds = [bound for bound, _ in args]
+        all_int = all(is_int for _, is_int in args)
+
+        if name.startswith("numpy"):
+            # NumPy falls back to Python objects for ints beyond 64 bits
+            if any(is_int and bound >= 1 << 63 for bound, is_int in args):
+                raise ValueError("Integer too large for NumPy")
+            return self.FLOAT_BOUND, False
+
+        if name in ("abs", "ceil", "floor") and len(args) == 1:
+            return bounds[0], all_int
+        if not all_int or not args:
+            return self.FLOAT_BOUND, False
+
+        if name == "factorial":
+            n = bounds[0]
+            if n.bit_length() > 32:
+                raise ValueError("Factorial argument too large")
+            return self._bounded(int(math.lgamma(n + 1) / math.log(2)) + 1), True
+        if name in ("perm", "comb"):
+            n = bounds[0]
+            k = min(bounds[1], n) if len(bounds) > 1 else n
+            if name == "comb":
+                return self._bounded(min(n, k * n.bit_length())), True
+            return self._bounded(k * n.bit_length()), True
+        if name == "gcd":
+            return max(bounds), True
+        if name == "lcm":
+            return self._bounded(sum(bound.bit_length() for bound in bounds)), True
+        if name == "isqrt":
+            return bounds[0], True
+        return self.FLOAT_BOUND, False
+
+    def looks_like_count(self, text: str) -> bool:
+        """Cheaply rule out messages that cannot possibly be a count.
+
+        Rejects on stray characters or on any word that is neither a
+        whitelisted function nor a number word, without parsing anything.
+        A True result still has to be evaluated.
+        """
+        if not text or len(text) > self.MAX_MESSAGE_LENGTH:
+            return False
+        if self.FOREIGN_CHARACTER.search(text):
+            return False
+
+        has_value = False
+        for token in self.TOKEN.findall(text):
+            if token[0].isdigit():
+                has_value = True
+            elif token in self.SAFE_FUNCTIONS or token.lower() in self.NUMBER_WORDS:
+                has_value = True
+            else:
+                return False
+        return has_value
+
+    def _compile_expression(self, expression: str) -> Optional[Tuple[str, Any]]:
+        """Turn message text into a cacheable (kind, payload) entry."""
+        # Number words become digits, so "twenty + 1" parses like "20 + 1"
+        replaced = self.number_words.replace(expression)
+        if replaced is None:
             return None
+        expression, value = replaced
+        if value is not None:
+            return "word", value
 
+        try:
+            tree = ast.parse(expression, mode="eval")
+            if sum(1 for _ in ast.walk(tree)) > self.MAX_NODES:
+                return None
+            self._check_node(tree.body)
+            return "expression", self._compile_node(tree.body)
         except (
             SyntaxError,
             ValueError,
             TypeError,
             ZeroDivisionError,
             OverflowError,
-            MemoryError,
             RecursionError,
+            MemoryError,
         ):
+            # Folding can fail the way evaluating would, e.g. ceil(inf)
             return None
 
-    def validate_count(
-        self, expression: str, guild_id: str, user_id: str
-    ) -> Tuple[bool, bool, bool]:
-        """
-        Validate a count attempt and update statistics.
-        Returns: (is_valid, is_prime, should_remove_role)
+    def _as_count(self, result: Any) -> Optional[int]:
+        """Convert an evaluated result to a count, or None if it isn't one."""
+        # Enhanced validation for trigonometric and other float results
+        if isinstance(result, (int, float)):
+            # If result is a float, round it if it's very close to an integer
+            if abs(result - round(result)) < 1e-10:
+                result_int = round(result)
+                if abs(result_int) < self.count_limit:
+                    return result_int
+            elif isinstance(result, int):
+                if abs(result) < self.count_limit:
+                    return result
+        return None
+
+    def evaluate(self, expression: str) -> Optional[EvaluationResult]:
+        """Evaluate a counting message once, reusing cached compiled forms."""
+        started = time.perf_counter()
+        answered, result = self.evaluate_cached(expression)
+        if answered:
+            return result
+
+        # Text that passes the pre-screen but doesn't parse is cached too
+        key = " ".join(expression.split())
+        entry = self._compile_expression(key) or ("invalid", None)
+        self.expression_cache.put(key, entry)
+        return self._run_entry(entry, time.perf_counter() - started)
+
+    def evaluate_cached(
+        self, expression: str
+    ) -> Tuple[bool, Optional[EvaluationResult]]:
+        """Answer a message without compiling anything.
+
+        Returns (answered, result). Plain numbers, text that fails the
+        pre-screen and cache hits are answered; anything else comes back
+        as (False, None) and needs a full evaluation.
         """
+        started = time.perf_counter()
+        # Most counts are plain numbers; they need no parsing and would only
+        # push real expressions out of the cache
+        text = expression.strip()
+        if text.isascii() and text.isdigit() and len(text) <= self.max_digits:
+            return True, EvaluationResult(
+                int(text), "number", time.perf_counter() - started
+            )
+
+        if not self.looks_like_count(expression):
+            self.prefilter_rejects += 1
+            return True, None
+
+        entry = self.expression_cache.get(" ".join(expression.split()))
+        if entry is None:
+            return False, None
+        return True, self._run_entry(entry, time.perf_counter() - started)
+
+    def remember(self, expression: str, result: Optional[EvaluationResult]) -> None:
+        """Cache a result evaluated elsewhere, such as in a pooled worker."""
+        if result is None:
+            # A pooled None may be a missed deadline rather than bad input
+            return
+        value = result.value
+        self.expression_cache.put(
+            " ".join(expression.split()),
+            (result.kind, value if result.kind == "word" else lambda: value),
+        )
+
+    def _run_entry(
+        self, entry: Tuple[str, Any], parse_time: float
+    ) -> Optional[EvaluationResult]:
+        """Evaluate a cached (kind, payload) entry."""
+        kind, payload = entry
+        if kind == "invalid":
+            return None
         try:
-            # Try to evaluate the expression
-            number = self._evaluate_expression(expression)
-            if number is None:
-                return False, False, False
+            value = self._as_count(payload if kind == "word" else payload())
+        except (
+            ValueError,
+            TypeError,
+            ZeroDivisionError,
+            OverflowError,
+            MemoryError,
+            RecursionError,
+        ):
+            return None
+        if value is None:
+            return None
+        return EvaluationResult(value, kind, parse_time)
 
-            with sqlite3.connect(self.db_path) as db:
-                cursor = db.cursor()
+    def cache_info(self) -> Dict[str, Any]:
+        """Hit/miss counters for the compiled-expression cache."""
+        return {
+            **self.expression_cache.info(),
+            "prefilter_rejects": self.prefilter_rejects,
+        }
 
-                # Ensure server exists in database
-                cursor.execute(
-                    "INSERT OR IGNORE INTO server (serverID, count) VALUES (?, 1)",
-                    (guild_id,),
-                )
+    def _evaluate_expression(self, expression: str) -> Optional[int]:
+        """Safely evaluate a mathematical expression."""
+        result = self.evaluate(expression)
+        return result.value if result else None
 
-                # Ensure user exists in database
-                cursor.execute(
-                    "INSERT OR IGNORE INTO mathematicians (ID, serverID) VALUES (?, ?)",
-                    (user_id, guild_id),
-                )
 
-                # Get current count and last counter
-                cursor.execute(
-                    "SELECT count, last_counter FROM server WHERE serverID = ?",
-                    (guild_id,),
-                )
-                current_count, last_counter = cursor.fetchone()
+# Evaluator owned by each pooled worker process
+_worker_evaluator: Optional[ExpressionEvaluator] = None
+
+
+def _init_evaluation_worker(max_digits: int, memory_limit: int, pids) -> None:
+    """Set up a pooled worker: cap its address space and warm an evaluator."""
+    global _worker_evaluator
+
+    # Lets the parent stop this worker in the middle of a call
+    pids.put(os.getpid())
+
+    if resource is not None and memory_limit and os.path.exists("/proc/self/statm"):
+        # The limit is on top of what the freshly started worker already maps
+        with open("/proc/self/statm") as f:
+            mapped = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        limit = mapped + memory_limit
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    _worker_evaluator = ExpressionEvaluator(max_digits)
+
+
+def _evaluate_in_worker(expression: str) -> Optional[EvaluationResult]:
+    """Evaluate an expression inside a pooled worker process."""
+    return _worker_evaluator.evaluate(expression)
+
+
+class PooledEvaluator:
+    """Evaluates counting expressions in a pool of warm worker processes.
 
-                # Check if count is valid and user isn't counting twice
-                if number != current_count or user_id == last_counter:
-                    self._handle_failed_count(cursor, guild_id, user_id, current_count)
-                    return False, False, False
+    Keeps CPU-heavy expressions off the event loop and away from the GIL
+    the voice thread needs. Each expression gets a wall-clock deadline and
+    every worker runs under an address-space cap; a pool that misses a
+    deadline or loses a worker is torn down and replaced.
+    """
 
-                # Handle successful count
-                is_prime = self.is_prime(number)
-                self._handle_successful_count(
-                    cursor, guild_id, user_id, number, is_prime
+    # Resubmissions allowed for an expression whose pool was torn down
+    # because of another expression
+    RETRIES = 2
+
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout: float = 0.5,
+        memory_limit_mb: int = 256,
+        max_digits: int = 20,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.max_digits = max_digits
+        self.recycles = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Each worker of the current pool puts its PID here as it starts
+        self._pids = None
+
+    def _start(self) -> ProcessPoolExecutor:
+        """Start a fresh pool of workers."""
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        self._pids = context.SimpleQueue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_evaluation_worker,
+            initargs=(self.max_digits, self.memory_limit, self._pids),
+        )
+        return self._pool
+
+    def _worker_pids(self) -> List[int]:
+        """PIDs reported so far by the current pool's workers."""
+        pids = []
+        while not self._pids.empty():
+            pids.append(self._pids.get())
+        return pids
+
+    def _recycle(self, pool: ProcessPoolExecutor) -> None:
+        """Kill a misbehaving pool; the next evaluation starts a new one."""
+        if self._pool is not pool:
+            # Already replaced by another evaluation
+            return
+        pids = self._worker_pids()
+        self._pool = None
+        self._pids = None
+        self.recycles += 1
+        if not pids:
+            # No worker has started, so none can be stuck in a call
+            pool.shutdown(wait=False, cancel_futures=True)
+            return
+        # ProcessPoolExecutor cannot cancel a running call, so kill the
+        # workers. A dead worker breaks the pool, which then terminates any
+        # worker still starting up and fails what was queued; shutting it
+        # down here instead could wait forever on a worker blocked on a
+        # queue lock the killed one held.
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    async def warm(self) -> None:
+        """Start the workers ahead of the first counting message."""
+        await asyncio.gather(*(self.evaluate("1") for _ in range(self.workers)))
+
+    async def evaluate(self, expression: str) -> Optional[EvaluationResult]:
+        """Evaluate an expression in the pool, giving up at the deadline.
+
+        Only the expression that misses its deadline gets None. Others
+        running or queued in the pool it takes down are resubmitted to the
+        replacement pool.
+        """
+        for _ in range(self.RETRIES + 1):
+            pool = self._pool or self._start()
+            try:
+                future = asyncio.wrap_future(
+                    pool.submit(_evaluate_in_worker, expression)
                 )
+            except BrokenProcessPool:
+                self._recycle(pool)
+                continue
 
-                db.commit()
-                return True, is_prime, False
+            try:
+                # Unlike wait_for, a timeout here leaves the future alone
+                await asyncio.wait({future}, timeout=self.timeout)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
 
-        except Exception as e:
-            print(f"Error validating count: {e}")
-            return False, False, False
+            if not future.done():
+                future.cancel()
+                self._recycle(pool)
+                return None
+            if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+                # Lost to another expression's deadline or a crashed worker
+                self._recycle(pool)
+                continue
+            return future.result()
+        return None
 
-    def _handle_failed_count(
-        self, cursor: sqlite3.Cursor, guild_id: str, user_id: str, current_count: int
-    ) -> None:
-        """Handle a failed count attempt."""
-        # Update user stats
+    def close(self) -> None:
+        """Shut the worker pool down."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            self._pids = None
+
+
+class CounterUtils(ExpressionEvaluator):
+    """Counting game state and statistics backed by SQLite."""
+
+    def __init__(self, db_path: str = "counting.db", max_digits: int = 20):
+        super().__init__(max_digits)
+        self.db_path = db_path
+        self.db = CounterDatabase(db_path)
+        self.init_database()
+
+        # Hot counting state lives in memory; stat changes are written behind
+        self.states: Dict[str, GuildCountState] = {}
+        self._state_loads: Dict[str, asyncio.Future] = {}
+        self._dirty_guilds: set = set()
+        self._pending_users: Dict[Tuple[str, str], UserCountDelta] = {}
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        # Newest message handled per counting channel, for offline catch-up
+        self.last_processed: Dict[str, int] = {}
+        self._dirty_channels: set = set()
+
+        # When a counting-channel message was last handled, so maintenance
+        # can wait for a lull
+        self.last_activity = time.monotonic()
+
+        # Count events waiting to be appended to the history log and rollups
+        self._pending_events: List[Tuple[int, int, int, int, int]] = []
+
+    # Schema migrations, applied in order; PRAGMA user_version records progress
+    MIGRATIONS = (
+        "_create_tables",
+        "_add_leaderboard_indexes",
+        "_add_channel_progress",
+        "_add_count_history",
+        "_enable_incremental_vacuum",
+    )
+
+    # Kinds recorded in the count_events log
+    EVENT_FAIL, EVENT_COUNT, EVENT_PRIME = range(3)
+
+    def init_database(self) -> None:
+        """Initialize the database, migrating older schemas in place."""
+        self.db.submit(self._migrate).result()
+
+    def _migrate(self, db: sqlite3.Connection) -> None:
+        """Apply any migrations newer than the database's schema version."""
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        for number, name in enumerate(self.MIGRATIONS[version:], version + 1):
+            getattr(self, name)(db)
+            db.execute(f"PRAGMA user_version = {number}")
+
+    @staticmethod
+    def _create_tables(db: sqlite3.Connection) -> None:
+        """Create the counting tables on the writer connection."""
+        cursor = db.cursor()
+
+        # Create server settings table
         cursor.execute(
             """
-            UPDATE mathematicians 
-            SET fails = fails + 1,
-                last_fail = ?,
-                last_fail_date = ?,
-                delta_fail = 0
-            WHERE ID = ? AND serverID = ?
-        """,
-            (current_count, time.time(), user_id, guild_id),
+            CREATE TABLE IF NOT EXISTS server (
+                serverID TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 1,
+                last_counter TEXT,
+                high_score INTEGER NOT NULL DEFAULT 0,
+                fails INTEGER NOT NULL DEFAULT 0,
+                counts INTEGER NOT NULL DEFAULT 0,
+                primes INTEGER NOT NULL DEFAULT 0
+            )
+        """
         )
 
-        # Update server stats
+        # Create user stats table
         cursor.execute(
             """
-            UPDATE server 
-            SET count = 1,
-                fails = fails + 1,
-                last_counter = ?
-            WHERE serverID = ?
-        """,
-            (user_id, guild_id),
+            CREATE TABLE IF NOT EXISTS mathematicians (
+                ID TEXT,
+                serverID TEXT,
+                fails INTEGER DEFAULT 0,
+                counts INTEGER DEFAULT 0,
+                high_score INTEGER DEFAULT 0,
+                last_fail INTEGER DEFAULT 0,
+                last_fail_date TEXT,
+                last_count INTEGER DEFAULT 0,
+                delta_fail INTEGER DEFAULT 0,
+                primes INTEGER DEFAULT 0,
+                PRIMARY KEY (ID, serverID)
+            )
+        """
+        )
+
+    @staticmethod
+    def _add_leaderboard_indexes(db: sqlite3.Connection) -> None:
+        """Covering indexes so each leaderboard is a short index-only scan."""
+        for category in ("counts", "primes", "fails"):
+            db.execute(
+                f"""
+                CREATE INDEX IF NOT EXISTS mathematicians_{category}
+                ON mathematicians (serverID, {category} DESC, ID)
+            """
+            )
+
+    @staticmethod
+    def _add_channel_progress(db: sqlite3.Connection) -> None:
+        """Track the last processed message in each counting channel."""
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS channel_progress (
+                channelID TEXT PRIMARY KEY,
+                last_message_id INTEGER NOT NULL
+            )
+        """
         )
 
-    def _handle_successful_count(
+    @staticmethod
+    def _add_count_history(db: sqlite3.Connection) -> None:
+        """Count event log, hourly/daily rollups and per-user streaks."""
+        db.execute("ALTER TABLE mathematicians ADD COLUMN streak INTEGER DEFAULT 0")
+        db.execute(
+            "ALTER TABLE mathematicians ADD COLUMN best_streak INTEGER DEFAULT 0"
+        )
+        # Append-only and kept compact: integer IDs, seconds and a kind code
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS count_events (
+                serverID INTEGER NOT NULL,
+                ID INTEGER NOT NULL,
+                at INTEGER NOT NULL,
+                number INTEGER NOT NULL,
+                kind INTEGER NOT NULL
+            )
+        """
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS count_events_at ON count_events (at)")
+        for table, bucket in (("count_hourly", "hour"), ("count_daily", "day")):
+            db.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    serverID TEXT,
+                    ID TEXT,
+                    {bucket} INTEGER,
+                    counts INTEGER DEFAULT 0,
+                    fails INTEGER DEFAULT 0,
+                    primes INTEGER DEFAULT 0,
+                    PRIMARY KEY (serverID, ID, {bucket})
+                ) WITHOUT ROWID
+            """
+            )
+
+    @staticmethod
+    def _enable_incremental_vacuum(db: sqlite3.Connection) -> None:
+        """Ask for incremental auto-vacuum.
+
+        Only a VACUUM applies it to an existing database, and that would
+        hold up startup for as long as it takes to copy the file, so
+        maintenance runs it in an idle period instead
+        (CounterDatabase.enable_incremental_vacuum).
+        """
+        db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    async def load_progress(self) -> None:
+        """Load the last processed message ID of every counting channel."""
+
+        def query(db: sqlite3.Connection) -> List[Tuple[str, int]]:
+            cursor = db.cursor()
+            cursor.execute("SELECT channelID, last_message_id FROM channel_progress")
+            return cursor.fetchall()
+
+        for channel_id, message_id in await self.db.read(query):
+            if message_id > self.last_processed.get(channel_id, 0):
+                self.last_processed[channel_id] = message_id
+
+    def mark_processed(self, channel_id: str, message_id: int) -> bool:
+        """Record a handled message; False if it was already processed."""
+        if message_id <= self.last_processed.get(channel_id, 0):
+            return False
+        self.last_activity = time.monotonic()
+        self.last_processed[channel_id] = message_id
+        self._dirty_channels.add(channel_id)
+        return True
+
+    async def get_state(self, guild_id: str) -> GuildCountState:
+        """Return the guild's counting state, loading it on first use."""
+        state = self.states.get(guild_id)
+        if state is not None:
+            return state
+
+        # Concurrent first messages share one load instead of racing
+        pending = self._state_loads.get(guild_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load_state(guild_id))
+            self._state_loads[guild_id] = pending
+        try:
+            return await asyncio.shield(pending)
+        finally:
+            if pending.done():
+                self._state_loads.pop(guild_id, None)
+
+    async def _load_state(self, guild_id: str) -> GuildCountState:
+        """Read a guild's ``server`` row and user scores into a GuildCountState."""
+
+        def query(db: sqlite3.Connection) -> Tuple[Optional[tuple], List[tuple]]:
+            cursor = db.cursor()
+            cursor.execute(
+                """
+                SELECT count, last_counter, high_score, fails, counts, primes
+                FROM server
+                WHERE serverID = ?
+            """,
+                (guild_id,),
+            )
+            row = cursor.fetchone()
+            cursor.execute(
+                "SELECT ID, counts, primes, fails FROM mathematicians WHERE serverID = ?",
+                (guild_id,),
+            )
+            return row, cursor.fetchall()
+
+        row, users = await self.db.read(query)
+        state = GuildCountState(guild_id, *row) if row else GuildCountState(guild_id)
+        for column, category in enumerate(("counts", "primes", "fails"), 1):
+            state.leaderboards[category].load(
+                {user[0]: user[column] or 0 for user in users}
+            )
+        return self.states.setdefault(guild_id, state)
+
+    async def validate_count(
         self,
-        cursor: sqlite3.Cursor,
+        expression: Union[str, EvaluationResult],
         guild_id: str,
         user_id: str,
+    ) -> Tuple[bool, bool, bool]:
+        """
+        Validate a count attempt and update statistics.
+        Accepts raw message text or an already computed EvaluationResult.
+        Returns: (is_valid, is_prime, should_remove_role)
+        """
+        try:
+            # Try to evaluate the expression
+            if not isinstance(expression, EvaluationResult):
+                expression = self.evaluate(expression)
+            if expression is None:
+                return False, False, False
+
+            state = await self.get_state(guild_id)
+            is_valid, is_prime = self.apply_count(state, expression.value, user_id)
+            return is_valid, is_prime, False
+
+        except Exception as e:
+            print(f"Error validating count: {e}")
+            return False, False, False
+
+    def apply_count(
+        self,
+        state: GuildCountState,
         number: int,
-        is_prime: bool,
+        user_id: str,
+        at: Optional[float] = None,
+    ) -> Tuple[bool, bool]:
+        """Accept or reject a count in memory and queue the stat changes.
+
+        ``at`` is when the count was sent; defaults to now.
+        Returns: (is_valid, is_prime)
+        """
+        if at is None:
+            at = time.time()
+        self.last_activity = time.monotonic()
+        key = (state.guild_id, user_id)
+        delta = self._pending_users.get(key)
+        if delta is None:
+            delta = self._pending_users[key] = UserCountDelta()
+        self._dirty_guilds.add(state.guild_id)
+
+        # Check if count is valid and user isn't counting twice
+        if number != state.count or user_id == state.last_counter:
+            delta.fails += 1
+            delta.last_fail = state.count
+            delta.last_fail_date = at
+            delta.break_streak()
+            # Logged at the number that was due, like last_fail
+            self._record_event(
+                state.guild_id, user_id, at, state.count, self.EVENT_FAIL
+            )
+
+            state.count = 1
+            state.fails += 1
+            state.last_counter = user_id
+            state.leaderboards["fails"].add(user_id)
+            return False, False
+
+        is_prime = self.is_prime(number)
+        delta.counts += 1
+        delta.primes += is_prime
+        delta.high_score = max(delta.high_score, number)
+        delta.last_count = number
+        delta.extend_streak()
+        self._record_event(
+            state.guild_id,
+            user_id,
+            at,
+            number,
+            self.EVENT_PRIME if is_prime else self.EVENT_COUNT,
+        )
+
+        state.count = number + 1
+        state.high_score = max(state.high_score, number)
+        state.counts += 1
+        state.primes += is_prime
+        state.last_counter = user_id
+        state.leaderboards["counts"].add(user_id)
+        if is_prime:
+            state.leaderboards["primes"].add(user_id)
+        return True, is_prime
+
+    def _record_event(
+        self, guild_id: str, user_id: str, at: float, number: int, kind: int
     ) -> None:
-        """Handle a successful count."""
-        # Update user stats
-        cursor.execute(
+        self._pending_events.append(
+            (int(guild_id), int(user_id), int(at), number, kind)
+        )
+
+    async def flush(self) -> None:
+        """Write all pending counting changes in a single transaction."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if (
+                not self._dirty_guilds
+                and not self._pending_users
+                and not self._dirty_channels
+            ):
+                return
+
+            dirty, self._dirty_guilds = self._dirty_guilds, set()
+            users, self._pending_users = self._pending_users, {}
+            channels, self._dirty_channels = self._dirty_channels, set()
+            events, self._pending_events = self._pending_events, []
+            server_rows = [self.states[guild_id].as_row() for guild_id in dirty]
+            progress_rows = [
+                (channel_id, self.last_processed[channel_id]) for channel_id in channels
+            ]
+
+            try:
+                await self.db.write(
+                    lambda db: self._write_batch(
+                        db, server_rows, users, progress_rows, events
+                    )
+                )
+            except Exception:
+                # Put the changes back so the next flush retries them
+                self._dirty_guilds |= dirty
+                self._dirty_channels |= channels
+                self._pending_events[:0] = events
+                for key, delta in users.items():
+                    newer = self._pending_users.get(key)
+                    if newer is not None:
+                        delta.merge(newer)
+                    self._pending_users[key] = delta
+                raise
+
+    @staticmethod
+    def _write_batch(
+        db: sqlite3.Connection,
+        server_rows: List[tuple],
+        users: Dict[Tuple[str, str], UserCountDelta],
+        progress_rows: List[Tuple[str, int]],
+        events: List[Tuple[int, int, int, int, int]],
+    ) -> None:
+        """Apply a coalesced batch of counting changes (writer thread)."""
+        cursor = db.cursor()
+        cursor.executemany(
             """
-            UPDATE mathematicians 
-            SET counts = counts + 1,
-                high_score = MAX(high_score, ?),
-                last_count = ?,
-                primes = primes + ?
-            WHERE ID = ? AND serverID = ?
+            INSERT INTO server (serverID, count, last_counter, high_score, fails, counts, primes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(serverID) DO UPDATE SET
+                count = excluded.count,
+                last_counter = excluded.last_counter,
+                high_score = excluded.high_score,
+                fails = excluded.fails,
+                counts = excluded.counts,
+                primes = excluded.primes
         """,
-            (number, number, 1 if is_prime else 0, user_id, guild_id),
+            server_rows,
         )
-
-        # Update server stats
-        cursor.execute(
+        cursor.executemany(
             """
-            UPDATE server 
-            SET count = ?,
-                high_score = MAX(high_score, ?),
-                counts = counts + 1,
-                primes = primes + ?,
-                last_counter = ?
-            WHERE serverID = ?
+            INSERT INTO mathematicians (ID, serverID, fails, counts, high_score,
+                                        last_fail, last_fail_date, last_count, primes,
+                                        streak, best_streak)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(ID, serverID) DO UPDATE SET
+                fails = fails + excluded.fails,
+                counts = counts + excluded.counts,
+                high_score = MAX(high_score, excluded.high_score),
+                last_fail = CASE WHEN excluded.last_fail_date IS NULL
+                                 THEN last_fail ELSE excluded.last_fail END,
+                last_fail_date = COALESCE(excluded.last_fail_date, last_fail_date),
+                last_count = CASE WHEN excluded.counts > 0
+                                  THEN excluded.last_count ELSE last_count END,
+                delta_fail = CASE WHEN excluded.fails > 0 THEN 0 ELSE delta_fail END,
+                primes = primes + excluded.primes,
+                streak = CASE WHEN ? THEN excluded.streak
+                              ELSE streak + excluded.streak END,
+                best_streak = MAX(best_streak, streak + ?, excluded.best_streak)
         """,
-            (number + 1, number, 1 if is_prime else 0, user_id, guild_id),
+            [
+                (
+                    user_id,
+                    guild_id,
+                    delta.fails,
+                    delta.counts,
+                    delta.high_score,
+                    delta.last_fail or 0,
+                    delta.last_fail_date,
+                    delta.last_count or 0,
+                    delta.primes,
+                    delta.streak_run,
+                    max(delta.streak_lead, delta.streak_best),
+                    delta.streak_reset,
+                    delta.streak_lead,
+                )
+                for (guild_id, user_id), delta in users.items()
+            ],
         )
+        cursor.executemany(
+            """
+            INSERT INTO channel_progress (channelID, last_message_id)
+            VALUES (?, ?)
+            ON CONFLICT(channelID) DO UPDATE SET
+                last_message_id = MAX(last_message_id, excluded.last_message_id)
+        """,
+            progress_rows,
+        )
+
+        # Log the events and fold them into the hourly and daily rollups
+        cursor.executemany(
+            "INSERT INTO count_events (serverID, ID, at, number, kind) VALUES (?, ?, ?, ?, ?)",
+            events,
+        )
+        for table, bucket, width in (
+            ("count_hourly", "hour", 3600),
+            ("count_daily", "day", 86400),
+        ):
+            rollup: Dict[Tuple[str, str, int], List[int]] = {}
+            for guild_id, user_id, at, _, kind in events:
+                key = (str(guild_id), str(user_id), at // width)
+                totals = rollup.get(key)
+                if totals is None:
+                    totals = rollup[key] = [0, 0, 0]
+                totals[0] += kind != CounterUtils.EVENT_FAIL
+                totals[1] += kind == CounterUtils.EVENT_FAIL
+                totals[2] += kind == CounterUtils.EVENT_PRIME
+            cursor.executemany(
+                f"""
+                INSERT INTO {table} (serverID, ID, {bucket}, counts, fails, primes)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(serverID, ID, {bucket}) DO UPDATE SET
+                    counts = counts + excluded.counts,
+                    fails = fails + excluded.fails,
+                    primes = primes + excluded.primes
+            """,
+                [key + tuple(totals) for key, totals in rollup.items()],
+            )
+
+    async def prune_history(
+        self, event_days: float, hourly_days: float, daily_days: float
+    ) -> None:
+        """Drop history older than the retention windows (0 keeps forever)."""
+
+        def prune(db: sqlite3.Connection) -> None:
+            now = int(time.time())
+            if event_days:
+                db.execute(
+                    "DELETE FROM count_events WHERE at < ?",
+                    (now - int(event_days * 86400),),
+                )
+            if hourly_days:
+                db.execute(
+                    "DELETE FROM count_hourly WHERE hour < ?",
+                    ((now - int(hourly_days * 86400)) // 3600,),
+                )
+            if daily_days:
+                db.execute(
+                    "DELETE FROM count_daily WHERE day < ?",
+                    ((now - int(daily_days * 86400)) // 86400,),
+                )
+
+        await self.db.write(prune)
+
+    async def backup(self, directory: str, keep: int) -> str:
+        """Write a timestamped snapshot into ``directory``, keeping ``keep``.
+
+        Returns a short description of the snapshot for logging.
+        """
+        os.makedirs(directory, exist_ok=True)
+        name = pathlib.Path(self.db_path).stem
+        target = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.db")
+        pages = await self.db.backup(target)
+
+        snapshots = sorted(pathlib.Path(directory).glob(f"{name}-*.db"))
+        for old in snapshots[: max(len(snapshots) - keep, 0)]:
+            old.unlink()
+        return f"{target}, {pages} pages"
 
     @staticmethod
     def is_prime(n: int) -> bool:
         """Check if a number is prime."""
-        if n < 2:
-            return False
-        for i in range(2, int(math.sqrt(n)) + 1):
-            if n % i == 0:
-                return False
-        return True
+        return PRIMES.is_prime(n)
 
-    def get_next_prime(self, guild_id: str) -> int:
+    async def get_next_prime(self, guild_id: str) -> int:
         """Get the next prime number after current count."""
-        with sqlite3.connect(self.db_path) as db:
-            cursor = db.cursor()
-            cursor.execute("SELECT count FROM server WHERE serverID = ?", (guild_id,))
-            current = cursor.fetchone()[0]
+        return PRIMES.next_prime((await self.get_state(guild_id)).count)
 
-        number = current
-        while not self.is_prime(number):
-            number += 1
-        return number
-
-    def get_leaderboard(
+    async def get_leaderboard(
         self, guild_id: str, category: str = "counts", limit: int = 10
     ) -> List[Tuple[int, str]]:
         """Get leaderboard for specified category."""
@@ -463,54 +1951,90 @@ class CounterUtils:
                 f"Invalid category. Must be one of: {list(valid_categories.keys())}"
             )
 
-        with sqlite3.connect(self.db_path) as db:
+        if limit <= GuildCountState.LEADERBOARD_SIZE:
+            state = await self.get_state(guild_id)
+            return state.leaderboards[category].top(limit)
+
+        await self.flush()
+
+        def query(db: sqlite3.Connection) -> List[Tuple[int, str]]:
             cursor = db.cursor()
             cursor.execute(
                 f"""
                 SELECT {valid_categories[category]}, ID 
                 FROM mathematicians 
-                WHERE serverID = ? 
-                ORDER BY {valid_categories[category]} DESC 
+                WHERE serverID = ? AND {valid_categories[category]} > 0
+                ORDER BY {valid_categories[category]} DESC, ID ASC
                 LIMIT ?
             """,
                 (guild_id, limit),
             )
             return cursor.fetchall()
 
-    def get_user_stats(self, guild_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.db.read(query)
+
+    async def get_user_stats(
+        self, guild_id: str, user_id: str
+    ) -> Optional[Dict[str, Any]]:
         """Get statistics for a user."""
-        with sqlite3.connect(self.db_path) as db:
+        await self.flush()
+
+        def query(db: sqlite3.Connection) -> Optional[tuple]:
             cursor = db.cursor()
             cursor.execute(
                 """
                 SELECT last_count, counts, fails, high_score, 
-                       last_fail, last_fail_date, primes 
+                       last_fail, last_fail_date, primes, best_streak
                 FROM mathematicians 
                 WHERE serverID = ? AND ID = ?
             """,
                 (guild_id, user_id),
             )
-            result = cursor.fetchone()
-
-            if not result:
+            row = cursor.fetchone()
+            if not row:
                 return None
 
-            return {
-                "last_count": result[0],
-                "total_counts": result[1],
-                "total_fails": result[2],
-                "highest_count": result[3],
-                "last_fail_number": result[4],
-                "last_fail_date": result[5],
-                "prime_counts": result[6],
-            }
-
-    def get_user_last_count(self, guild_id: str) -> Optional[str]:
+            # Windows are answered from the rollups, a few rows each
+            now = int(time.time())
+            windows = []
+            for table, bucket, start in (
+                ("count_hourly", "hour", now // 3600 - 23),
+                ("count_daily", "day", now // 86400 - 6),
+            ):
+                cursor.execute(
+                    f"""
+                    SELECT COALESCE(SUM(counts), 0), COALESCE(SUM(fails), 0)
+                    FROM {table}
+                    WHERE serverID = ? AND ID = ? AND {bucket} >= ?
+                """,
+                    (guild_id, user_id, start),
+                )
+                windows.append(cursor.fetchone())
+            return row + tuple(windows)
+
+        result = await self.db.read(query)
+        if not result:
+            return None
+
+        return {
+            "last_count": result[0],
+            "total_counts": result[1],
+            "total_fails": result[2],
+            "highest_count": result[3],
+            "last_fail_number": result[4],
+            "last_fail_date": result[5],
+            "prime_counts": result[6],
+            "best_streak": result[7] or 0,
+            "counts_24h": result[8][0],
+            "fails_24h": result[8][1],
+            "counts_7d": result[9][0],
+            "fails_7d": result[9][1],
+        }
+
+    async def get_user_last_count(self, guild_id: str) -> Optional[str]:
         """Get the user who made the last count."""
-        with sqlite3.connect(self.db_path) as db:
-            cursor = db.cursor()
-            cursor.execute(
-                "SELECT last_counter FROM server WHERE serverID = ?", (guild_id,)
-            )
-            result = cursor.fetchone()
-            return result[0] if result else None
+        return (await self.get_state(guild_id)).last_counter
+
+    def close(self) -> None:
+        """Flush outstanding writes and release the database connections."""
+        self.db.close()
@@ -0,0 +1,265 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import asyncio
+import itertools
+import multiprocessing
+import threading
+import time
+import yt_dlp
+
+
+# Warm YoutubeDL instances, one per options profile in each worker thread
+# (or process). Instances are not thread-safe, so they are never shared.
+_local = threading.local()
+
+
+class ExtractionError(Exception):
+    """yt-dlp failed; carries only the message so it crosses processes."""
+
+
+def _init_worker(options: Dict[str, dict]) -> None:
+    _local.options = options
+
+
+def _instance(profile: str) -> yt_dlp.YoutubeDL:
+    """This worker's YoutubeDL for a profile, built on first use."""
+    instances = getattr(_local, "instances", None)
+    if instances is None:
+        instances = _local.instances = {}
+    ydl = instances.get(profile)
+    if ydl is None:
+        ydl = instances[profile] = yt_dlp.YoutubeDL(_local.options[profile])
+    return ydl
+
+
+def _extract(profile: str, target: str) -> Tuple[dict, float]:
+    """Run one extraction on this worker's YoutubeDL (worker side).
+
+    Returns the JSON-safe info dict and the seconds spent extracting.
+    """
+    ydl = _instance(profile)
+    start = time.perf_counter()
+    try:
+        info = ydl.extract_info(target, download=False)
+    except Exception as e:
+        # yt-dlp errors hold references that can't be pickled
+        raise ExtractionError(str(e)) from None
+    return ydl.sanitize_info(info), time.perf_counter() - start
+
+
+def _warm(profile: str) -> None:
+    _instance(profile)
+
+
+def video_id(url: str) -> Optional[str]:
+    """The YouTube video ID in a watch, youtu.be or shorts URL, if any."""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.endswith("youtu.be"):
+        return parsed.path.lstrip("/").split("/")[0] or None
+    if host.endswith("youtube.com"):
+        if parsed.path.startswith("/shorts/"):
+            return parsed.path.split("/")[2] or None
+        return parse_qs(parsed.query).get("v", [None])[0]
+    return None
+
+
+class SingleFlight:
+    """Let concurrent callers with the same key share one in-flight call."""
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.joined = 0
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()``, or the call already running for ``key``."""
+        future = self.calls.get(key)
+        if future is None:
+            self.started += 1
+            future = self.calls[key] = asyncio.ensure_future(fn())
+
+            def finished(done: asyncio.Future) -> None:
+                if self.calls.get(key) is done:
+                    del self.calls[key]
+
+            future.add_done_callback(finished)
+        else:
+            self.joined += 1
+        # A caller giving up must not cancel the call for everyone else
+        return await asyncio.shield(future)
+
+    def info(self) -> Dict[str, Any]:
+        """How many calls ran and how many callers joined one instead."""
+        return {
+            "started": self.started,
+            "saved": self.joined,
+            "in_flight": len(self.calls),
+        }
+
+
+class ExtractionService:
+    """Bounded pool of warm yt-dlp extractors with priority lanes.
+
+    Every worker keeps its own YoutubeDL per options profile, so extractor
+    setup is paid once per worker rather than once per request. At most
+    ``workers`` extractions run at a time; queued interactive requests
+    always start before queued background ones. Workers are threads by
+    default, or processes to keep extraction off the bot's GIL entirely.
+    """
+
+    INTERACTIVE, BACKGROUND = 0, 1
+    LANES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+    STAGES = ("queue_wait", "extract", "total")
+
+    def __init__(
+        self, options: Dict[str, dict], workers: int = 2, processes: bool = False
+    ):
+        self.options = options
+        self.workers = workers
+        self.processes = processes
+        self._executor: Optional[Executor] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._dispatchers = []
+        self._order = itertools.count()
+
+        # lane -> stage -> [count, total seconds, max seconds]
+        self.timings: Dict[str, Dict[str, list]] = {
+            lane: {stage: [0, 0.0, 0.0] for stage in self.STAGES}
+            for lane in self.LANES.values()
+        }
+        self.failures = 0
+
+    def _new_executor(self) -> Executor:
+        if self.processes:
+            # Forking the bot would copy its loop and open sockets into workers
+            methods = multiprocessing.get_all_start_methods()
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(
+                    "forkserver" if "forkserver" in methods else "spawn"
+                ),
+                initializer=_init_worker,
+                initargs=(self.options,),
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="yt-dlp",
+            initializer=_init_worker,
+            initargs=(self.options,),
+        )
+
+    def _replace_executor(self, broken: Executor) -> None:
+        """Start a fresh pool after a worker died (OOM, crash).
+
+        Every dispatcher waiting on the broken pool sees the failure, but
+        only the first one replaces it.
+        """
+        if self._executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._new_executor()
+
+    def _start(self) -> None:
+        """Create the pool and dispatchers on the running loop."""
+        self._executor = self._new_executor()
+        self._queue = asyncio.PriorityQueue()
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch()) for _ in range(self.workers)
+        ]
+
+    async def warm(self) -> None:
+        """Build each worker's extractors ahead of the first request."""
+        if self._executor is None:
+            self._start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, _warm, profile)
+                for profile in self.options
+                for _ in range(self.workers)
+            ),
+            return_exceptions=True,
+        )
+
+    async def extract(
+        self, profile: str, target: str, priority: int = INTERACTIVE
+    ) -> dict:
+        """Extract info for ``target`` with the ``profile`` options.
+
+        Raises ExtractionError if yt-dlp fails.
+        """
+        if self._executor is None:
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(
+            (priority, next(self._order), profile, target, time.perf_counter(), future)
+        )
+        return await future
+
+    async def _dispatch(self) -> None:
+        """Feed queued requests to the pool, one at a time per dispatcher."""
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, _, profile, target, queued, future = await self._queue.get()
+            if future.cancelled():
+                continue
+
+            started = time.perf_counter()
+            executor = self._executor
+            try:
+                info, extract_time = await loop.run_in_executor(
+                    executor, _extract, profile, target
+                )
+            except Exception as e:
+                self.failures += 1
+                if isinstance(e, BrokenProcessPool):
+                    self._replace_executor(executor)
+                if not future.done():
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            lane = self.timings[self.LANES[priority]]
+            for stage, seconds in (
+                ("queue_wait", started - queued),
+                ("extract", extract_time),
+                ("total", finished - queued),
+            ):
+                timing = lane[stage]
+                timing[0] += 1
+                timing[1] += seconds
+                timing[2] = max(timing[2], seconds)
+            if not future.done():
+                future.set_result(info)
+
+    def info(self) -> Dict[str, Any]:
+        """Average and worst milliseconds per stage for each lane."""
+        return {
+            "workers": self.workers,
+            "processes": self.processes,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "failures": self.failures,
+            **{
+                lane: {
+                    stage: {
+                        "count": count,
+                        "avg_ms": total / count * 1000 if count else 0.0,
+                        "max_ms": worst * 1000,
+                    }
+                    for stage, (count, total, worst) in stages.items()
+                }
+                for lane, stages in self.timings.items()
+            },
+        }
+
+    async def close(self) -> None:
+        """Stop dispatching and shut the pool down."""
+        for task in self._dispatchers:
+            task.cancel()
+        self._dispatchers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,194 @@
+from collections import deque
+from itertools import count, islice
+from typing import Any, Awaitable, Callable, Iterable, Iterator, List, Optional, Set
+import asyncio
+import random
+
+WATCH_URL = "https://www.youtube.com/watch?v="
+
+
+class Track:
+    """A queued track: just enough to resolve and display it at play time.
+
+    Slotted, and the watch URL is derived from the video ID unless it
+    differs, so long playlists stay small.
+    """
+
+    __slots__ = ("entry_id", "id", "title", "duration", "_url")
+
+    def __init__(
+        self,
+        video_id: Optional[str],
+        title: Optional[str],
+        duration: Any = None,
+        webpage_url: Optional[str] = None,
+    ):
+        self.entry_id = 0
+        self.id = video_id
+        self.title = title
+        self.duration = duration
+        self._url = (
+            None if webpage_url in (None, f"{WATCH_URL}{video_id}") else webpage_url
+        )
+
+    @classmethod
+    def from_info(cls, info: dict) -> "Track":
+        """Build a track from a yt-dlp result or playlist entry."""
+        return cls(
+            info.get("id"),
+            info.get("title"),
+            info.get("duration"),
+            info.get("webpage_url"),
+        )
+
+    @property
+    def webpage_url(self) -> str:
+        return self._url or f"{WATCH_URL}{self.id}"
+
+    def __repr__(self) -> str:
+        return f"<Track #{self.entry_id} {self.id} {self.title!r}>"
+
+
+class TrackQueue:
+    """Deque of tracks with positional edits and stable entry IDs.
+
+    Appending and taking the next track are O(1); positional edits and
+    pages only walk the deque in C. Every appended track gets a new entry
+    ID, which stays the same while other tracks move around it. Like the
+    rest of the player it is only used from the event loop, so it takes
+    no locks. Positions are 0-based.
+    """
+
+    def __init__(self, tracks: Iterable[Track] = ()):
+        self._tracks: deque = deque()
+        self._ids = count(1)
+        self.extend(tracks)
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __iter__(self) -> Iterator[Track]:
+        return iter(self._tracks)
+
+    def __getitem__(self, position: int) -> Track:
+        return self._tracks[position]
+
+    def append(self, track: Track) -> Track:
+        track.entry_id = next(self._ids)
+        self._tracks.append(track)
+        return track
+
+    def extend(self, tracks: Iterable[Track]) -> int:
+        """Append several tracks; returns how many were added."""
+        before = len(self._tracks)
+        for track in tracks:
+            self.append(track)
+        return len(self._tracks) - before
+
+    def pop(self) -> Track:
+        """Take the next track. Raises IndexError if the queue is empty."""
+        return self._tracks.popleft()
+
+    def remove(self, position: int) -> Track:
+        """Remove and return the track at ``position``."""
+        track = self._tracks[position]
+        del self._tracks[position]
+        return track
+
+    def move(self, source: int, target: int) -> Track:
+        """Move the track at ``source`` so it ends up at ``target``."""
+        track = self._tracks[source]
+        # Validate before changing anything
+        self._tracks[target]
+        del self._tracks[source]
+        self._tracks.insert(target, track)
+        return track
+
+    def shuffle(self) -> None:
+        tracks = list(self._tracks)
+        random.shuffle(tracks)
+        self._tracks = deque(tracks)
+
+    def clear(self) -> None:
+        self._tracks.clear()
+
+    def find(self, entry_id: int) -> Optional[int]:
+        """The current position of an entry, or None if it left the queue."""
+        for position, track in enumerate(self._tracks):
+            if track.entry_id == entry_id:
+                return position
+        return None
+
+    def peek(self, limit: int) -> List[Track]:
+        """The next ``limit`` tracks, without dequeuing them."""
+        return list(islice(self._tracks, limit))
+
+    def page(self, number: int, size: int = 10) -> List[Track]:
+        """Tracks on 1-based page ``number`` of ``size`` tracks each."""
+        start = (number - 1) * size
+        return list(islice(self._tracks, start, start + size))
+
+    def pages(self, size: int = 10) -> int:
+        return max(1, -(-len(self._tracks) // size))
+
+
+class GuildPlayer:
+    """Queue and playback state for one guild's voice session.
+
+    MusicFeature creates one per guild on its first music command there and
+    drops it when the session ends or sits idle, so guilds never share a
+    queue, volume or loop setting.
+    """
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.queue = TrackQueue()
+        self.current_track: Optional[Track] = None
+        self.volume = 1.0
+        self.loop = False
+        self.channel = None
+        self.prefetches: Set[asyncio.Task] = set()
+        self.closed = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._idle: Optional[asyncio.Task] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Serializes track changes; created lazily on the bot's loop."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def track_prefetch(self, task: asyncio.Task) -> None:
+        self.prefetches.add(task)
+        task.add_done_callback(self.prefetches.discard)
+
+    def start_idle_timer(
+        self, timeout: float, on_idle: Callable[[], Awaitable[None]]
+    ) -> None:
+        """Await ``on_idle`` after ``timeout`` seconds unless cancelled first."""
+        self.cancel_idle_timer()
+
+        async def wait():
+            await asyncio.sleep(timeout)
+            # Cleared first so on_idle can close the player without
+            # cancelling itself
+            self._idle = None
+            await on_idle()
+
+        self._idle = asyncio.create_task(wait())
+
+    def cancel_idle_timer(self) -> None:
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+
+    def close(self) -> None:
+        """Drop queued tracks and stop this player's background tasks."""
+        self.closed = True
+        self.cancel_idle_timer()
+        for task in list(self.prefetches):
+            task.cancel()
+        self.queue.clear()
+        self.current_track = None
+        self.channel = None
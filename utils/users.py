@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+import asyncio
+import time
+import discord
+
+
+class UserResolver:
+    """Resolve user IDs to Discord users with as few REST calls as possible.
+
+    Lookups try the guild member cache, then the client's user cache, then a
+    TTL'd LRU of earlier REST results. Anything left is fetched concurrently,
+    at most ``concurrency`` requests at a time, and concurrent lookups of the
+    same ID share one request. Unknown users are cached too so a deleted
+    account on a leaderboard is not re-fetched on every call.
+    """
+
+    def __init__(
+        self, bot, ttl: float = 3600.0, maxsize: int = 1024, concurrency: int = 5
+    ):
+        self.bot = bot
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # user ID -> (expiry, user or None if the account doesn't exist)
+        self.entries: OrderedDict = OrderedDict()
+        self.pending: Dict[int, asyncio.Future] = {}
+
+        self.member_hits = 0
+        self.user_hits = 0
+        self.cache_hits = 0
+        self.fetches = 0
+        self.not_found = 0
+
+    @staticmethod
+    def parse_id(user_id) -> int:
+        """Accept an int, a numeric string, or a ``<@id>`` mention."""
+        if isinstance(user_id, str):
+            user_id = user_id.strip("<@!>")
+        return int(user_id)
+
+    async def resolve(
+        self, user_id, guild: Optional[discord.Guild] = None
+    ) -> Optional[discord.abc.User]:
+        """Return the member or user for an ID, or None if it doesn't exist."""
+        user_id = self.parse_id(user_id)
+
+        if guild is not None:
+            member = guild.get_member(user_id)
+            if member is not None:
+                self.member_hits += 1
+                return member
+
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.user_hits += 1
+            return user
+
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            expires, user = entry
+            if expires > time.monotonic():
+                self.entries.move_to_end(user_id)
+                self.cache_hits += 1
+                return user
+            del self.entries[user_id]
+
+        future = self.pending.get(user_id)
+        if future is None:
+            future = self.pending[user_id] = asyncio.ensure_future(self._fetch(user_id))
+            future.add_done_callback(lambda _: self.pending.pop(user_id, None))
+        return await asyncio.shield(future)
+
+    async def resolve_many(
+        self, user_ids: Iterable, guild: Optional[discord.Guild] = None
+    ) -> Dict[int, Optional[discord.abc.User]]:
+        """Resolve several IDs at once; REST fetches run concurrently."""
+        user_ids = [self.parse_id(user_id) for user_id in user_ids]
+        users = await asyncio.gather(
+            *(self.resolve(user_id, guild) for user_id in user_ids)
+        )
+        return dict(zip(user_ids, users))
+
+    async def _fetch(self, user_id: int) -> Optional[discord.abc.User]:
+        # Created lazily so it binds to the loop the bot actually runs on
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            self.fetches += 1
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                self.not_found += 1
+                user = None
+
+        self.entries[user_id] = (time.monotonic() + self.ttl, user)
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return user
+
+    def info(self) -> Dict[str, Any]:
+        """Where lookups were answered from."""
+        lookups = self.member_hits + self.user_hits + self.cache_hits + self.fetches
+        hits = lookups - self.fetches
+        return {
+            "member_hits": self.member_hits,
+            "user_hits": self.user_hits,
+            "cache_hits": self.cache_hits,
+            "fetches": self.fetches,
+            "not_found": self.not_found,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }